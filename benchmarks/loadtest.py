@@ -0,0 +1,265 @@
+"""
+Drive the whole ASGI app with a mix of requests and report how it holds up.
+
+    python -m benchmarks.loadtest [--target asgi|uvicorn|URL] [--concurrency N]
+                                  [--duration S] [--mix generate=80,upload=10,...]
+
+`asgi` (default) calls src.main:app in-process without a socket, `uvicorn`
+serves it on a local port in a background thread, and a URL targets a
+server that is already running. Workers pick operations by weight until the
+duration is up; the report gives throughput, latency percentiles and a
+histogram per operation, and counts 429s from the rate limiter apart from
+other errors. Login and register use throwaway accounts in the configured
+database; uploads made through a local target are deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from PIL import Image
+
+from benchmarks.render_pipeline import percentile
+from src.schemas.qrcode import QRCodeFormat
+
+OPERATIONS = ("generate", "upload", "login", "register")
+DEFAULT_MIX = "generate=85,upload=5,login=5,register=5"
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+PASSWORD = "loadtest-password"
+
+
+def _mix(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Dict[int, int]] = field(
+        default_factory=lambda: defaultdict(lambda: defaultdict(int))
+    )
+    uploads: List[str] = field(default_factory=list)
+
+    def record(self, operation: str, status: int, elapsed_ms: float) -> None:
+        self.latencies[operation].append(elapsed_ms)
+        self.statuses[operation][status] += 1
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.results = Results()
+        self.random = random.Random(args.seed)
+        self.email = f"loadtest-{uuid.uuid4().hex[:12]}@example.com"
+        self.logo = self._logo_bytes()
+
+    @staticmethod
+    def _logo_bytes() -> bytes:
+        buffer = BytesIO()
+        Image.radial_gradient("L").convert("RGB").resize((128, 128)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    async def setup(self) -> None:
+        """Account that login requests sign in with, and a render to start the pool"""
+        await self._register(self.email)
+        await self._request("generate")
+
+    def _register(self, email: str):
+        return self.client.post(
+            "/api/v1/auth/register",
+            json={"email": email, "first_name": "Load", "last_name": "Test", "password": PASSWORD},
+        )
+
+    def _request(self, operation: str):
+        if operation == "generate":
+            content = f"https://windsurf.dev/load/{self.random.randrange(self.args.distinct)}"
+            return self.client.post(
+                "/api/v1/qrcode/generate",
+                json={
+                    "content": content,
+                    "format": self.random.choice(self.args.formats),
+                    "size": self.random.choice(self.args.sizes),
+                },
+            )
+        if operation == "upload":
+            return self.client.post(
+                "/api/v1/upload/",
+                files={"file": ("logo.png", self.logo, "image/png")},
+            )
+        if operation == "login":
+            return self.client.post(
+                "/api/v1/auth/login", json={"email": self.email, "password": PASSWORD}
+            )
+        return self._register(f"loadtest-{uuid.uuid4().hex}@example.com")
+
+    async def worker(self, deadline: float) -> None:
+        operations = list(self.args.mix)
+        weights = list(self.args.mix.values())
+        while time.perf_counter() < deadline:
+            operation = self.random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await self._request(operation)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0  # Connection-level failure
+            self.results.record(operation, status, (time.perf_counter() - start) * 1000)
+            if operation == "upload" and status == 200:
+                self.results.uploads.append(response.json()["filename"])
+
+    async def run(self) -> float:
+        await self.setup()
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        await asyncio.gather(*(self.worker(deadline) for _ in range(self.args.concurrency)))
+        return time.perf_counter() - start
+
+
+def _histogram(latencies: List[float]) -> List[int]:
+    counts = [0] * len(BUCKETS)
+    for ms in latencies:
+        counts[next(i for i, bound in enumerate(BUCKETS) if ms <= bound)] += 1
+    return counts
+
+
+def summarize(results: Results, elapsed: float) -> Dict[str, dict]:
+    summary = {}
+    for operation, latencies in sorted(results.latencies.items()):
+        statuses = results.statuses[operation]
+        limited = statuses.get(429, 0)
+        errors = sum(n for status, n in statuses.items() if not 200 <= status < 300) - limited
+        summary[operation] = {
+            "requests": len(latencies),
+            "throughput": round(len(latencies) / elapsed, 2),
+            "rate_limited": limited,
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+            "histogram": _histogram(latencies),
+        }
+    return summary
+
+
+def print_report(summary: Dict[str, dict], elapsed: float) -> None:
+    total = sum(op["requests"] for op in summary.values())
+    print(f"{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s")
+    print(
+        f"{'operation':<10} {'reqs':>6} {'req/s':>7} {'429':>5} {'errors':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for name, op in summary.items():
+        print(
+            f"{name:<10} {op['requests']:>6} {op['throughput']:>7.1f} {op['rate_limited']:>5} "
+            f"{op['errors']:>6} {op['p50']:>8.1f} {op['p95']:>8.1f} {op['p99']:>8.1f} {op['max']:>8.1f}"
+        )
+    for name, op in summary.items():
+        print(f"\n{name} latency histogram")
+        lower = 0
+        most = max(op["histogram"]) or 1
+        for bound, count in zip(BUCKETS, op["histogram"]):
+            label = f"{lower:g}-{bound:g} ms" if bound != float("inf") else f">{lower:g} ms"
+            print(f"  {label:>14} {count:>6} {'#' * round(40 * count / most)}")
+            lower = bound
+
+
+def _serve_uvicorn(app) -> str:
+    """Start uvicorn on a free local port in a daemon thread; return its base URL"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, dict]:
+    app = None
+    if args.target == "asgi":
+        from src.main import app
+
+        # No lifespan: the render pool starts on first use
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+    else:
+        if args.target == "uvicorn":
+            from src.main import app
+
+            base_url = _serve_uvicorn(app)
+        else:
+            base_url = args.target
+        limits = httpx.Limits(max_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout)
+
+    async with client:
+        test = LoadTest(client, args)
+        elapsed = await test.run()
+
+    summary = summarize(test.results, elapsed)
+    print_report(summary, elapsed)
+    if app is not None:
+        from src.api.endpoints.upload import UPLOAD_DIR
+
+        for filename in test.results.uploads:
+            (UPLOAD_DIR / filename).unlink(missing_ok=True)
+    if args.target == "asgi":
+        from src.services.logo_fetcher import logo_fetcher
+        from src.services.render_executor import render_executor
+
+        render_executor.shutdown()
+        await logo_fetcher.aclose()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", default="asgi", help="asgi, uvicorn or a base URL")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", type=_mix, default=_mix(DEFAULT_MIX))
+    parser.add_argument(
+        "--formats",
+        type=lambda v: v.split(","),
+        default=[f.value for f in QRCodeFormat],
+    )
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")], default=[300, 600, 1000])
+    parser.add_argument("--distinct", type=int, default=1000, help="distinct contents to generate")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="write the summary to this JSON file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main_async(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"buckets_ms": BUCKETS[:-1], "operations": summary}, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Time generate_qr across the rendering option matrix.
+
+    python -m benchmarks.render_pipeline [--repeat N] [--output run.json]
+                                         [--baseline base.json --threshold 0.2]
+
+Every combination of format, body style, eye style, size, content length and
+extra (none, logo, sticker) is rendered `--repeat` times after one warm-up,
+with the render cache cleared and the disk cache off so each run does the
+full work. Prints total and per-stage latency percentiles and output sizes
+grouped by format and extra; `--output` writes every case to JSON for use as
+a baseline, and `--baseline` exits with status 1 when a case's median got
+slower than the threshold allows. Runs offline: the logo is a local file read the way
+/uploads/ logos are, stickers come from STICKER_DIR.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from src.core.timing import record_stages
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services import logo_fetcher, qrcode_service
+from src.services.disk_cache import DiskRenderCache
+from src.services.qrcode_service import (
+    EYE_DRAWERS,
+    MODULE_DRAWERS,
+    generate_qr,
+    logo_cache,
+    matrix_cache,
+    render_cache,
+)
+from src.services.sticker_frames import sticker_frames
+
+EXTRAS = ("none", "logo", "sticker")
+PERCENTILES = (50, 90, 99)
+
+
+def _csv(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {f"p{q}": round(percentile(samples, q), 3) for q in PERCENTILES}
+
+
+def case_key(payload: QRCodeRequest, extra: str) -> str:
+    return "/".join(
+        [
+            payload.format.value,
+            payload.body_style,
+            payload.eye_style,
+            str(payload.size),
+            str(len(payload.content)),
+            extra,
+        ]
+    )
+
+
+def _local_logo(path: Optional[str]) -> str:
+    """URL of a logo that the fetcher reads from disk like an /uploads/ file"""
+    if path is None:
+        directory = Path(tempfile.mkdtemp(prefix="qr-bench-"))
+        logo = directory / "logo.png"
+        Image.radial_gradient("L").convert("RGBA").resize((400, 400)).save(logo)
+    else:
+        logo = Path(path).resolve()
+    logo_fetcher.UPLOAD_DIR = logo.parent
+    return f"http://localhost/uploads/{logo.name}"
+
+
+def _payloads(args: argparse.Namespace, logo_url: str, sticker: Optional[str]):
+    for format, body, eye, size, length, extra in product(
+        args.formats, args.bodies, args.eyes, args.sizes, args.lengths, args.extras
+    ):
+        if extra == "sticker" and sticker is None:
+            continue
+        payload = QRCodeRequest(
+            content="https://windsurf.dev/" + "x" * max(0, length - 21),
+            format=QRCodeFormat(format),
+            size=size,
+            body_style=body,
+            eye_style=eye,
+            logo_url=logo_url if extra == "logo" else None,
+            sticker_type=sticker if extra == "sticker" else None,
+        )
+        yield case_key(payload, extra), payload
+
+
+def run_case(payload: QRCodeRequest, repeat: int, cold: bool) -> Dict[str, object]:
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    size = 0
+    for run in range(repeat + 1):
+        render_cache.clear()
+        if cold:
+            matrix_cache.clear()
+            logo_cache.clear()
+        with record_stages() as timings:
+            start = time.perf_counter()
+            _, payload_bytes, _ = generate_qr(payload)
+            elapsed = (time.perf_counter() - start) * 1000
+        if run == 0:
+            continue  # Warm-up
+        totals.append(elapsed)
+        for name, ms in timings.items():
+            stages[name].append(ms)
+        size = len(payload_bytes)
+    return {
+        "total": _summary(totals),
+        "stages": {name: _summary(samples) for name, samples in stages.items()},
+        "bytes": size,
+        "samples": [round(ms, 3) for ms in totals],
+    }
+
+
+def print_report(cases: Dict[str, dict]) -> None:
+    """Percentiles over every sample of each (format, extra) group"""
+    groups: Dict[tuple, dict] = defaultdict(lambda: {"total": [], "bytes": [], "stages": defaultdict(list)})
+    for key, case in cases.items():
+        format, *_, extra = key.split("/")
+        group = groups[(format, extra)]
+        group["total"].extend(case["samples"])
+        group["bytes"].append(case["bytes"])
+        for name, summary in case["stages"].items():
+            group["stages"][name].append(summary["p50"])
+
+    print(
+        f"{'format':<6} {'extra':<8} {'cases':>5} {'p50 ms':>8} {'p90 ms':>8} "
+        f"{'p99 ms':>8} {'mean B':>9}  stage p50 ms"
+    )
+    for (format, extra), group in sorted(groups.items()):
+        total = _summary(group["total"])
+        stages = " ".join(
+            f"{name}={percentile(values, 50):.2f}" for name, values in group["stages"].items()
+        )
+        print(
+            f"{format:<6} {extra:<8} {len(group['bytes']):>5} {total['p50']:>8.2f} "
+            f"{total['p90']:>8.2f} {total['p99']:>8.2f} "
+            f"{sum(group['bytes']) / len(group['bytes']):>9.0f}  {stages}"
+        )
+
+
+def compare(
+    cases: Dict[str, dict], baseline: Dict[str, dict], threshold: float, min_delta_ms: float
+) -> List[str]:
+    """Cases whose median got slower than `threshold` (a fraction) and `min_delta_ms`"""
+    regressions = []
+    for key, case in sorted(cases.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        before, after = base["total"]["p50"], case["total"]["p50"]
+        if after > before * (1 + threshold) and after - before > min_delta_ms:
+            regressions.append(
+                f"{key}: p50 {before:.2f} -> {after:.2f} ms ({after / before - 1:+.0%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--formats", type=_csv, default=[f.value for f in QRCodeFormat])
+    parser.add_argument("--bodies", type=_csv, default=sorted(MODULE_DRAWERS))
+    parser.add_argument("--eyes", type=_csv, default=sorted(EYE_DRAWERS))
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in _csv(v)], default=[300, 1000])
+    parser.add_argument("--lengths", type=lambda v: [int(s) for s in _csv(v)], default=[30, 300])
+    parser.add_argument("--extras", type=_csv, default=list(EXTRAS))
+    parser.add_argument("--logo", help="logo image file (default: a generated gradient)")
+    parser.add_argument("--sticker", help="sticker frame (default: the first available)")
+    parser.add_argument("--cold", action="store_true", help="clear matrix and logo caches on every run")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown (fraction)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns below this")
+    args = parser.parse_args()
+
+    # A DISK_CACHE_DIR would serve every run after the first from disk
+    qrcode_service.disk_cache = DiskRenderCache("", 0)
+    logo_url = _local_logo(args.logo)
+    available = sticker_frames.available()
+    sticker = args.sticker or (available[0] if available else None)
+    if "sticker" in args.extras and sticker is None:
+        print("No sticker frame available (STICKER_DIR, cairosvg): sticker cases skipped")
+
+    cases = {}
+    for key, payload in _payloads(args, logo_url, sticker):
+        cases[key] = run_case(payload, args.repeat, args.cold)
+    print_report(cases)
+
+    if args.output:
+        meta = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "cold": args.cold,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        Path(args.output).write_text(json.dumps({"meta": meta, "cases": cases}, indent=1))
+        print(f"Wrote {len(cases)} cases to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["cases"]
+        regressions = compare(cases, baseline, args.threshold, args.min_delta_ms)
+        shared = len(cases.keys() & baseline.keys())
+        print(f"{len(regressions)} regressions over {shared} cases shared with {args.baseline}")
+        for line in regressions:
+            print("  " + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
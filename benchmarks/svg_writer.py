@@ -0,0 +1,71 @@
+"""
+Compare the direct SVG writer with the previous SvgPathImage + regex route.
+
+    python -m benchmarks.svg_writer [--repeat N]
+
+Prints output size and median generation time per QR version, from the
+smallest symbol up to version 40.
+"""
+import argparse
+import re
+import statistics
+import time
+
+from qrcode.constants import ERROR_CORRECT_M
+from qrcode.image.svg import SvgPathImage
+
+from src.services.matrix_cache import encode_matrix
+from src.services.svg_writer import write_svg
+
+# Byte-mode contents spanning versions 1 to 40 at error correction M
+CONTENT_LENGTHS = (10, 80, 200, 600, 1200, 2300)
+SIZE = 1000
+
+
+def legacy_svg(matrix, size: int) -> bytes:
+    """The SVG branch of render_qr before the direct writer"""
+    svg_content = (
+        matrix.to_qr(box_size=10)
+        .make_image(image_factory=SvgPathImage, fill_color="#000000", back_color="#FFFFFF")
+        .to_string()
+    )
+    if isinstance(svg_content, bytes):
+        svg_content = svg_content.decode("utf-8")
+    svg_content = re.sub(r'width="[^"]*"', f'width="{size}px"', svg_content)
+    svg_content = re.sub(r'height="[^"]*"', f'height="{size}px"', svg_content)
+    return svg_content.encode("utf-8")
+
+
+def direct_svg(matrix, size: int) -> bytes:
+    return write_svg(matrix, size, "#000000", "#FFFFFF")
+
+
+def _median_ms(render, matrix, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(matrix, SIZE)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'version':>7} {'legacy B':>10} {'direct B':>10} {'legacy ms':>10} {'direct ms':>10} {'speedup':>8}")
+    for length in CONTENT_LENGTHS:
+        matrix = encode_matrix("x" * length, ERROR_CORRECT_M, 4)
+        legacy_bytes = len(legacy_svg(matrix, SIZE))
+        direct_bytes = len(direct_svg(matrix, SIZE))
+        legacy_ms = _median_ms(legacy_svg, matrix, args.repeat)
+        direct_ms = _median_ms(direct_svg, matrix, args.repeat)
+        print(
+            f"{matrix.version:>7} {legacy_bytes:>10} {direct_bytes:>10} "
+            f"{legacy_ms:>10.2f} {direct_ms:>10.2f} {legacy_ms / direct_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
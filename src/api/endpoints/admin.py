@@ -0,0 +1,49 @@
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from src.core.profiler import profiler
+from src.core.security import get_admin_user
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_admin_user)],
+)
+
+PROFILE_NAME = re.compile(r"[\w.-]+\.collapsed")
+
+
+@router.get("/profiler")
+async def profiler_status() -> dict:
+    return profiler.status()
+
+
+@router.post("/profiler/start")
+async def start_profiler() -> dict:
+    if not profiler.start():
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Le profileur est déjà démarré")
+    return profiler.status()
+
+
+@router.post("/profiler/dump")
+async def dump_profiler() -> dict:
+    """Write the samples collected so far without stopping"""
+    return {"file": profiler.dump().name, **profiler.status()}
+
+
+@router.post("/profiler/stop")
+async def stop_profiler() -> dict:
+    if not profiler.running:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Le profileur n'est pas démarré")
+    profiler.stop()
+    return {"file": profiler.dump().name, **profiler.status()}
+
+
+@router.get("/profiler/profiles/{name}")
+async def download_profile(name: str) -> FileResponse:
+    path = profiler.directory / name
+    if not PROFILE_NAME.fullmatch(name) or not path.is_file():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Profil introuvable")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
@@ -1,26 +1,260 @@
+import asyncio
+import time
+from time import perf_counter
 from typing import Optional
-from fastapi import APIRouter, Depends, Header, Response, status, HTTPException
+from urllib.parse import urlencode
+from fastapi import APIRouter, Depends, Header, Query, Response, status, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from qrcode.exceptions import DataOverflowError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from src.core.config import settings
+from src.core.metrics import observe_stages
 from src.core.rate_limiter import limiter
-from src.core.security import get_current_user, get_optional_current_user
-from src.schemas.qrcode import QRCodeRequest
-from src.services.qrcode_service import generate_qr
+from src.core.timing import record_stages, server_timing_header, span_log
+from src.core.security import (
+    get_current_user,
+    get_optional_current_user,
+    is_admin,
+    render_signature,
+    verify_render_signature,
+)
+from src.schemas.qrcode import (
+    QRCodeBatchRequest,
+    QRCodeFormat,
+    QRCodeRequest,
+    QRCodeSignedURL,
+    QRCodeSignRequest,
+)
+from src.services.batch_service import stream_batch_zip
+from src.services.qrcode_service import (
+    content_etag,
+    disk_cache,
+    render_cache,
+    render_etag,
+    sticker_missing,
+)
+from src.services.render_cache import render_key
+from src.services.render_executor import render_executor
 
 router = APIRouter(prefix="/api/v1/qrcode", tags=["qrcode"])
 
 
+def _overflow(exc: DataOverflowError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=str(exc) or "Contenu trop long pour un QR code",
+    )
+
+
 @router.post("/generate")
 async def generate_qrcode(
     payload: QRCodeRequest,
     current_user: Optional[dict] = Depends(get_optional_current_user),
     user_agent: str | None = Header(None),
+    x_qrcode_profile: str | None = Header(None),
 ):
-    request_id, payload_bytes, content_type = generate_qr(payload)
+    profiled = bool(x_qrcode_profile) and is_admin(current_user)
+    sampled = span_log.sampled()
+    start = perf_counter()
+    timed = settings.server_timing or settings.metrics_render_stages or sampled
+    try:
+        with record_stages(timed) as timings:
+            if profiled:
+                request_id, payload_bytes, content_type, profile = (
+                    await render_executor.render_profiled(payload)
+                )
+            else:
+                request_id, payload_bytes, content_type = await render_executor.render(payload)
+    except DataOverflowError as exc:
+        raise _overflow(exc)
+    total_ms = (perf_counter() - start) * 1000
+    if settings.metrics_render_stages:
+        observe_stages(timings)
+
     headers = {
         "X-QRCode-Request-ID": request_id,
         "X-QRCode-Size": str(len(payload_bytes)),
         "Content-Type": content_type,
     }
+    if settings.server_timing:
+        headers["Server-Timing"] = server_timing_header(timings, total_ms)
+        headers["Timing-Allow-Origin"] = "*"
+    if profiled:
+        # Download from /api/v1/admin/profiler/profiles/{name}
+        headers["X-QRCode-Profile"] = profile.name
+    if sampled:
+        span_log.write(
+            {
+                "request_id": request_id,
+                "format": payload.format.value,
+                "size": payload.size,
+                "body_style": payload.body_style,
+                "eye_style": payload.eye_style,
+                "logo": bool(payload.logo_url),
+                "sticker": payload.sticker_type,
+                "bytes": len(payload_bytes),
+                "total_ms": round(total_ms, 3),
+                "stages": {name: round(ms, 3) for name, ms in timings.items()},
+            }
+        )
+    return Response(content=payload_bytes, headers=headers, media_type=content_type)
+
+
+@router.post("/batch")
+async def generate_qrcode_batch(
+    payload: QRCodeBatchRequest,
+    current_user: Optional[dict] = Depends(get_optional_current_user),
+):
+    return StreamingResponse(
+        stream_batch_zip(payload.expand(), render_executor),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="qrcodes.zip"'},
+    )
+
+
+def _query_payload(
+    format: QRCodeFormat,
+    content: str = Query(...),
+    size: Optional[int] = None,
+    color: Optional[str] = None,
+    background: Optional[str] = None,
+    margin: Optional[int] = None,
+    error_correction: Optional[str] = None,
+    logo_url: Optional[str] = None,
+    body_style: Optional[str] = None,
+    eye_style: Optional[str] = None,
+    sticker_type: Optional[str] = None,
+    version: Optional[int] = None,
+    mask_pattern: Optional[int] = None,
+) -> QRCodeRequest:
+    """QRCodeRequest from query parameters; omitted ones keep the model defaults"""
+    fields = {
+        "format": format,
+        "content": content,
+        "size": size,
+        # "#" starts a URL fragment, so colors may be given as bare hex
+        "color": f"#{color}" if color and not color.startswith("#") else color,
+        "background": (
+            f"#{background}" if background and not background.startswith("#") else background
+        ),
+        "margin": margin,
+        "error_correction": error_correction,
+        "logo_url": logo_url,
+        "body_style": body_style,
+        "eye_style": eye_style,
+        "sticker_type": sticker_type,
+        "version": version,
+        "mask_pattern": mask_pattern,
+    }
+    try:
+        return QRCodeRequest(**{name: value for name, value in fields.items() if value is not None})
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_context=False)
+        raise RequestValidationError(
+            [{**error, "loc": ("query", *error["loc"])} for error in errors]
+        )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in tags)
+
+
+@router.post("/sign", response_model=QRCodeSignedURL)
+async def sign_render_url(
+    payload: QRCodeSignRequest,
+    current_user: dict = Depends(get_current_user),
+) -> QRCodeSignedURL:
+    """Mint a GET render URL whose parameters are signed, optionally expiring"""
+    request = payload.render_request()
+    expires = int(time.time()) + payload.expires_in if payload.expires_in else None
+    # Only what differs from the defaults: the route parses it back to the same request
+    params = request.model_dump(mode="json", exclude_defaults=True, exclude={"format"})
+    if expires is not None:
+        params["exp"] = expires
+    params["sig"] = render_signature(render_key(request), expires)
+    url = f"{settings.api_base_url}{router.prefix}/{request.format.value}?{urlencode(params)}"
+    return QRCodeSignedURL(url=url, expires=expires)
+
+
+def _check_signature(payload: QRCodeRequest, sig: Optional[str], exp: Optional[int]) -> None:
+    if sig is None:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Signature requise")
+    if exp is not None and exp < time.time():
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Lien expiré")
+    if not verify_render_signature(render_key(payload), exp, sig):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Signature invalide")
+
+
+@router.get("/{format}")
+async def render_qrcode(
+    payload: QRCodeRequest = Depends(_query_payload),
+    sig: Optional[str] = None,
+    exp: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Cacheable render: deterministic output, a strong ETag derived from the
+    normalized request and a long max-age, so browsers, proxies and CDNs keep
+    it. A matching If-None-Match is answered 304 without rendering. With a
+    remote logo the ETag comes from the rendered bytes and the max-age
+    follows the logo cache TTL.
+
+    Signed URLs (`sig`, optional `exp`) are checked before anything else and
+    cached no longer than they are valid; unsigned requests are refused when
+    RENDER_REQUIRE_SIGNATURE is set. A sticker that is not available is
+    rendered as the bare code and sent with `no-store`.
+    """
+    if sig is not None or settings.render_require_signature:
+        _check_signature(payload, sig, exp)
+
+    if sticker_missing(payload):
+        # Rendered without its frame: no cache may keep it as the sticker
+        try:
+            _, payload_bytes, content_type = await render_executor.render(payload)
+        except DataOverflowError as exc:
+            raise _overflow(exc)
+        return Response(
+            content=payload_bytes, headers={"Cache-Control": "no-store"}, media_type=content_type
+        )
+
+    etag = render_etag(payload)
+    max_age = settings.render_max_age if etag is not None else int(settings.logo_cache_ttl)
+    cache_control = f"public, max-age={max_age}"
+    if exp is not None:
+        cache_control = f"public, max-age={max(0, min(max_age, exp - int(time.time())))}"
+    elif etag is not None:
+        cache_control += ", immutable"
+
+    if etag is not None and _etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": cache_control},
+        )
+
+    try:
+        _, payload_bytes, content_type = await render_executor.render(payload)
+    except DataOverflowError as exc:
+        raise _overflow(exc)
+
+    if etag is None:
+        etag = content_etag(payload_bytes)
+        if _etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": cache_control},
+            )
+    headers = {"ETag": etag, "Cache-Control": cache_control}
     return Response(content=payload_bytes, headers=headers, media_type=content_type)
+
+
+@router.get("/cache/stats")
+async def render_cache_stats() -> dict:
+    return {**render_cache.stats(), "disk": await asyncio.to_thread(disk_cache.stats)}
@@ -14,6 +14,40 @@ class AppSettings(BaseSettings):
     jwt_algorithm: str = "HS256"
     token_expire_minutes: int = 1440
     rate_limit: int = 1000
+    render_cache_max_bytes: int = 64 * 1024 * 1024
+    disk_cache_dir: str = ""  # empty = disabled
+    disk_cache_max_bytes: int = 1024 * 1024 * 1024
+    render_max_age: int = 365 * 24 * 3600  # Cache-Control of GET renders, seconds
+    render_require_signature: bool = False  # reject unsigned GET renders
+    render_url_secret: str = ""  # empty = jwt_secret_key
+    matrix_cache_size: int = 4096
+    render_engine: str = "numpy"  # numpy, pil
+    qr_encoder: str = "numpy"  # numpy, qrcode
+    raster_antialias: bool = True
+    render_executor: str = "process"  # process, thread, inline
+    render_workers: int = 0  # 0 = one per CPU
+    batch_max_items: int = 5000
+    batch_concurrency: int = 16
+    logo_fetch_deadline: float = 3.0
+    logo_negative_ttl: float = 60.0
+    logo_max_bytes: int = 5 * 1024 * 1024
+    logo_cache_max_bytes: int = 32 * 1024 * 1024
+    logo_cache_ttl: float = 300.0
+    sticker_dir: str = "../frontend/public/stickers"
+    sticker_cache_max_bytes: int = 32 * 1024 * 1024
+    png_compression_level: int = 6  # zlib, 0-9
+    png_filter: str = "none"  # none, sub, up
+    webp_quality: int = 80  # lossy composites, 0-100
+    webp_method: int = 4  # 0 (fast) - 6 (smallest)
+    server_timing: bool = True
+    span_log_path: str = ""  # empty = disabled
+    span_log_sample_rate: float = 0.01
+    metrics_render_stages: bool = True
+    prometheus_multiproc_dir: str = ""  # required with several uvicorn workers
+    admin_users: str = ""  # comma-separated usernames allowed on /api/v1/admin
+    profiler_enabled: bool = False  # sample from startup
+    profiler_hz: float = 97.0  # off round numbers so samples do not lock onto periodic work
+    profiler_dir: str = "profiles"
 
 
 settings = AppSettings()
@@ -0,0 +1,105 @@
+import os
+from typing import Dict, Tuple
+
+from src.core.config import settings
+
+# prometheus_client picks its value storage when imported: with a multiprocess
+# directory every process (uvicorn workers, render pool workers) writes its
+# samples to mmap files there and /metrics adds them up
+if settings.prometheus_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.prometheus_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds; renders range from sub-millisecond cache hits to multi-second logos
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HTTP_REQUESTS = Counter(
+    "qrcode_http_requests_total",
+    "HTTP requests by route, method and status code",
+    ["route", "method", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "qrcode_http_request_duration_seconds",
+    "HTTP request latency by route and method",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_LATENCY = Histogram(
+    "qrcode_render_duration_seconds",
+    "Uncached render latency by output format and style",
+    ["format", "body_style", "eye_style"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_STAGE_LATENCY = Histogram(
+    "qrcode_render_stage_duration_seconds",
+    "Time spent in each render stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDERS_IN_FLIGHT = Gauge(
+    "qrcode_renders_in_flight",
+    "Renders currently running or queued for the render pool",
+    multiprocess_mode="livesum",
+)
+LOGO_FETCHES = Counter(
+    "qrcode_logo_fetches_total",
+    "Remote logo fetches by outcome (ok, not_modified, skipped, timeout, rejected, error)",
+    ["outcome"],
+)
+RATE_LIMITED = Counter(
+    "qrcode_rate_limited_total",
+    "Requests rejected by the rate limiter",
+    ["route"],
+)
+CACHE_LOOKUPS = Counter(
+    "qrcode_cache_lookups_total",
+    "Cache lookups by cache and result (hit, miss)",
+    ["cache", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "qrcode_cache_evictions_total",
+    "Entries evicted from each cache",
+    ["cache"],
+)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def cache_eviction(cache: str) -> None:
+    CACHE_EVICTIONS.labels(cache).inc()
+
+
+def observe_stages(stages: Dict[str, float]) -> None:
+    """Record stage durations measured in milliseconds by src.core.timing"""
+    for name, ms in stages.items():
+        RENDER_STAGE_LATENCY.labels(name).observe(ms / 1000)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition of every metric, summed over processes in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this process's live gauges when it exits in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
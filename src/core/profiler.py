@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+from src.core.config import settings
+
+T = TypeVar("T")
+
+# A single render lasts milliseconds: sample it far more often than the
+# background profiler does
+REQUEST_HZ = 1000.0
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def collapse(stacks: Counter) -> str:
+    """Collapsed-stack text (one "root;...;leaf count" per line), as flamegraph tools read"""
+    return "".join(
+        f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items())
+    )
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a daemon thread reads every thread's current stack
+    through `sys._current_frames()` `hz` times per second and counts
+    identical stacks. Nothing is traced between samples, so the profiled code
+    runs at full speed. `thread_ids` restricts sampling to those threads.
+    """
+
+    def __init__(
+        self,
+        hz: float,
+        directory: Path,
+        thread_ids: Optional[Iterable[int]] = None,
+    ):
+        self.interval = 1.0 / hz
+        self.directory = Path(directory)
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self._stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            with self._lock:
+                self._sample()
+            next_tick += self.interval
+            # Skip ticks rather than burst when a sample ran late
+            delay = next_tick - time.perf_counter()
+            if delay < 0:
+                next_tick = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self) -> bool:
+        """Start sampling; False if already running"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> Counter:
+        """Stop sampling and return the collected stacks"""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self._thread = None
+        with self._lock:
+            return Counter(self._stacks)
+
+    def dump(self, name: Optional[str] = None) -> Path:
+        """Write the stacks collected so far to a .collapsed file in `directory`"""
+        with self._lock:
+            text = collapse(self._stacks)
+        if name is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+            name = f"{stamp}-{os.getpid()}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.collapsed"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "hz": round(1.0 / self.interval, 2),
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "started_at": self.started_at,
+        }
+
+
+def profile_call(func: Callable[..., T], *args, name: str) -> Tuple[T, Path]:
+    """
+    Run `func` in the calling thread while sampling only that thread, and
+    dump its profile under `name`. Meant to be run in a worker thread.
+    """
+    profiler = SamplingProfiler(
+        REQUEST_HZ,
+        Path(settings.profiler_dir),
+        thread_ids=[threading.get_ident()],
+    )
+    profiler.start()
+    try:
+        result = func(*args)
+    finally:
+        profiler.stop()
+    return result, profiler.dump(name)
+
+
+profiler = SamplingProfiler(settings.profiler_hz, Path(settings.profiler_dir))
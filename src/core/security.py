@@ -1,3 +1,6 @@
+import base64
+import hashlib
+import hmac
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
@@ -83,3 +86,31 @@ def get_optional_current_user(
     user = fake_users_db.get(username)
     return user
 
+
+
+def is_admin(user: Optional[Dict[str, str]]) -> bool:
+    admins = {name.strip() for name in settings.admin_users.split(",") if name.strip()}
+    return user is not None and user["username"] in admins
+
+
+def get_admin_user(user: Dict[str, str] = Depends(get_current_user)) -> Dict[str, str]:
+    if not is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs",
+        )
+    return user
+
+
+def render_signature(key: str, expires: Optional[int]) -> str:
+    """URL-safe HMAC-SHA256 of a normalized render request key and its optional expiry"""
+    secret = (settings.render_url_secret or settings.jwt_secret_key).encode("utf-8")
+    message = f"{key}:{'' if expires is None else expires}".encode("ascii")
+    digest = hmac.new(secret, message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def verify_render_signature(key: str, expires: Optional[int], signature: str) -> bool:
+    # Bytes: compare_digest rejects str arguments with non-ASCII characters
+    expected = render_signature(key, expires).encode("ascii")
+    return hmac.compare_digest(expected, signature.encode("utf-8"))
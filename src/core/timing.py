@@ -0,0 +1,113 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterator, Optional
+
+from src.core.config import settings
+
+# Stage durations (ms) of the render being measured in this context, if any
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("render_stages", default=None)
+
+# Time spent in stages nested inside the current one, which it does not own
+_nested: ContextVar[Optional[list]] = ContextVar("render_stage_nested", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to stage `name`; free when nothing
+    records. Stages are exclusive: a stage opened inside another one is
+    subtracted from it, so stages add up to at most the total.
+    """
+    timings = _stages.get()
+    if timings is None:
+        yield
+        return
+    parent = _nested.get()
+    children = [0.0]
+    token = _nested.set(children)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (perf_counter() - start) * 1000
+        _nested.reset(token)
+        timings[name] = timings.get(name, 0.0) + elapsed - children[0]
+        if parent is not None:
+            parent[0] += elapsed
+
+
+@contextmanager
+def record_stages(enabled: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """
+    Collect the stages timed inside the block, in milliseconds, in call
+    order. Yields None and records nothing when not `enabled`.
+    """
+    if not enabled:
+        yield None
+        return
+    timings: Dict[str, float] = {}
+    token = _stages.set(timings)
+    try:
+        yield timings
+    finally:
+        _stages.reset(token)
+
+
+def is_recording() -> bool:
+    return _stages.get() is not None
+
+
+def add_stages(stages: Dict[str, float]) -> None:
+    """Merge stages measured elsewhere (e.g. in a pool worker) into the current recording"""
+    timings = _stages.get()
+    if timings is None:
+        return
+    for name, ms in stages.items():
+        timings[name] = timings.get(name, 0.0) + ms
+
+
+def server_timing_header(stages: Dict[str, float], total_ms: float) -> str:
+    """Server-Timing header value listing every stage, then the total"""
+    metrics = [f"{name};dur={ms:.2f}" for name, ms in stages.items()]
+    metrics.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(metrics)
+
+
+class SpanLog:
+    """
+    Sampled JSON-lines log of request spans. Disabled when `path` is empty;
+    otherwise `sample_rate` of requests (0 to 1) are written, one object per
+    line, appended from any thread.
+    """
+
+    def __init__(self, path: str, sample_rate: float):
+        self.path = Path(path) if path else None
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._file = None
+
+    def sampled(self) -> bool:
+        return self.path is not None and random.random() < self.sample_rate
+
+    def write(self, span: dict) -> None:
+        line = json.dumps({"timestamp": round(time.time(), 3), **span}, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("a", encoding="utf-8", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+span_log = SpanLog(settings.span_log_path, settings.span_log_sample_rate)
@@ -1,4 +1,6 @@
-from fastapi import Depends, FastAPI, Request
+import time
+
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -6,11 +8,23 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from fastapi.staticfiles import StaticFiles
+from src.api.endpoints.admin import router as admin_router
 from src.api.endpoints.auth import router as auth_router
 from src.api.endpoints.qrcode import router as qrcode_router
 from src.api.endpoints.upload import router as upload_router
 from src.core.config import settings
+from src.core.metrics import (
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    RATE_LIMITED,
+    mark_process_dead,
+    render_metrics,
+)
+from src.core.profiler import profiler
 from src.core.rate_limiter import limiter
+from src.core.timing import span_log
+from src.services.logo_fetcher import logo_fetcher
+from src.services.render_executor import render_executor
 
 
 app = FastAPI(
@@ -45,6 +59,22 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 app.include_router(auth_router)
 app.include_router(qrcode_router)
 app.include_router(upload_router)
+app.include_router(admin_router)
+
+
+def _route_label(request: Request) -> str:
+    # Route templates, not raw paths, keep label cardinality bounded
+    return getattr(request.scope.get("route"), "path", "unmatched")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = _route_label(request)
+    HTTP_LATENCY.labels(route, request.method).observe(time.perf_counter() - start)
+    HTTP_REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    return response
 
 
 @app.get("/health", tags=["health"])
@@ -55,8 +85,15 @@ def health_check() -> JSONResponse:
     )
 
 
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+def metrics() -> Response:
+    data, content_type = render_metrics()
+    return Response(content=data, media_type=content_type)
+
+
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    RATE_LIMITED.labels(_route_label(request)).inc()
     return JSONResponse(
         status_code=429,
         content={
@@ -77,6 +114,12 @@ async def startup_event():
         init_db()
     except Exception as e:
         print(f"Database initialization: {e}")
+
+    # Spawn render workers now so the first requests do not pay for it
+    render_executor.start()
+
+    if settings.profiler_enabled:
+        profiler.start()
         
     # Cleanup old uploads (> 24h)
     try:
@@ -96,3 +139,14 @@ async def startup_event():
                 print(f"Cleaned up {count} old upload files")
     except Exception as e:
         print(f"Cleanup error: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    render_executor.shutdown()
+    await logo_fetcher.aclose()
+    span_log.close()
+    mark_process_dead()
+    if profiler.running:
+        profiler.stop()
+        profiler.dump()
@@ -1,6 +1,8 @@
 from enum import Enum
-from typing import Optional, Set
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, List, Optional, Set
+from pydantic import BaseModel, Field, model_validator, validator
+
+from src.core.config import settings
 
 
 class QRCodeFormat(str, Enum):
@@ -8,10 +10,12 @@ class QRCodeFormat(str, Enum):
     jpeg = "jpeg"
     svg = "svg"
     pdf = "pdf"
+    webp = "webp"
 
 
-class QRCodeRequest(BaseModel):
-    content: str = Field(..., min_length=1, max_length=1000)
+class QRCodeStyle(BaseModel):
+    """Every rendering option of a QR code except its content"""
+
     format: QRCodeFormat = QRCodeFormat.png
     size: int = Field(300, ge=100, le=1000)
     color: str = Field("#000000", pattern=r"^#([A-Fa-f0-9]{6})$")
@@ -22,6 +26,9 @@ class QRCodeRequest(BaseModel):
     body_style: str = Field("square")  # square, circle, rounded, gapped, vertical, horizontal
     eye_style: str = Field("square")   # square, circle, rounded
     sticker_type: Optional[str] = None  # grid, bubble, film, book, beer
+    # Pin the symbol version / mask to skip fitting and mask scoring
+    version: Optional[int] = Field(None, ge=1, le=40)
+    mask_pattern: Optional[int] = Field(None, ge=0, le=7)
 
     @validator("error_correction")
     def check_error_correction(cls, value: str) -> str:
@@ -31,6 +38,49 @@ class QRCodeRequest(BaseModel):
         return value
 
 
+class QRCodeRequest(QRCodeStyle):
+    content: str = Field(..., min_length=1, max_length=1000)
+
+
+class QRCodeSignRequest(QRCodeRequest):
+    expires_in: Optional[int] = Field(None, ge=1)  # seconds; None = never expires
+
+    def render_request(self) -> QRCodeRequest:
+        return QRCodeRequest(**self.model_dump(exclude={"expires_in"}))
+
+
+class QRCodeSignedURL(BaseModel):
+    url: str
+    expires: Optional[int] = None
+
+
+class QRCodeBatchRequest(BaseModel):
+    """Either explicit `items`, or one shared `style` applied to each of `contents`"""
+
+    items: List[QRCodeRequest] = Field(default_factory=list)
+    style: Optional[QRCodeStyle] = None
+    contents: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(
+        default_factory=list
+    )
+
+    @model_validator(mode="after")
+    def check_item_count(self) -> "QRCodeBatchRequest":
+        count = len(self.items) + len(self.contents)
+        if count == 0:
+            raise ValueError("Le lot est vide (items ou contents attendus)")
+        if count > settings.batch_max_items:
+            raise ValueError(
+                f"Lot trop volumineux (maximum {settings.batch_max_items} éléments)"
+            )
+        return self
+
+    def expand(self) -> List[QRCodeRequest]:
+        style = (self.style or QRCodeStyle()).model_dump()
+        return self.items + [
+            QRCodeRequest(content=content, **style) for content in self.contents
+        ]
+
+
 class QRCodeResponse(BaseModel):
     request_id: str
     format: QRCodeFormat
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.core.config import settings
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.render_cache import render_key
+from src.services.render_executor import RenderExecutor
+
+MANIFEST_NAME = "manifest.json"
+
+# Raster formats are already compressed; deflating them again only costs CPU
+COMPRESSION = {
+    QRCodeFormat.svg: zipfile.ZIP_DEFLATED,
+}
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that hands written bytes back in chunks"""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
+
+
+def entry_name(index: int, payload: QRCodeRequest) -> str:
+    return f"{index + 1:05d}.{payload.format.value}"
+
+
+async def stream_batch_zip(
+    payloads: List[QRCodeRequest],
+    executor: RenderExecutor,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Render a batch and yield a ZIP archive chunk by chunk as renders complete.
+
+    Identical requests are rendered once and written under every index that
+    asked for them. At most `concurrency` renders are in flight, so memory
+    stays bounded by that window rather than by the batch size. Failures are
+    recorded in manifest.json instead of aborting the archive.
+    """
+    concurrency = max(1, concurrency or settings.batch_concurrency)
+    groups: Dict[str, List[int]] = {}
+    for index, payload in enumerate(payloads):
+        groups.setdefault(render_key(payload), []).append(index)
+    pending_groups = iter(groups.values())
+
+    manifest: List[dict] = [{} for _ in payloads]
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w")
+    date_time = time.localtime()[:6]
+
+    async def render(indexes: List[int]):
+        try:
+            _, payload_bytes, _ = await executor.render(payloads[indexes[0]])
+            return indexes, payload_bytes, None
+        except Exception as e:
+            return indexes, None, e
+
+    in_flight = set()
+
+    def schedule() -> None:
+        while len(in_flight) < concurrency:
+            indexes = next(pending_groups, None)
+            if indexes is None:
+                return
+            in_flight.add(asyncio.ensure_future(render(indexes)))
+
+    try:
+        schedule()
+        while in_flight:
+            done, _ = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                in_flight.discard(task)
+                indexes, payload_bytes, error = task.result()
+                for index in indexes:
+                    payload = payloads[index]
+                    record = {
+                        "index": index,
+                        "content": payload.content,
+                        "format": payload.format.value,
+                    }
+                    if error is not None:
+                        message = str(error) or type(error).__name__
+                        record.update(status="error", error=message)
+                    else:
+                        name = entry_name(index, payload)
+                        info = zipfile.ZipInfo(name, date_time=date_time)
+                        info.compress_type = COMPRESSION.get(
+                            payload.format, zipfile.ZIP_STORED
+                        )
+                        archive.writestr(info, payload_bytes)
+                        record.update(status="ok", file=name, bytes=len(payload_bytes))
+                        if index != indexes[0]:
+                            record["duplicate_of"] = indexes[0]
+                    manifest[index] = record
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            schedule()
+
+        summary = {
+            "total": len(payloads),
+            "rendered": len(groups),
+            "failed": sum(1 for record in manifest if record["status"] == "error"),
+            "items": manifest,
+        }
+        info = zipfile.ZipInfo(MANIFEST_NAME, date_time=date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        archive.writestr(info, json.dumps(summary, ensure_ascii=False, indent=2))
+        archive.close()
+        yield sink.drain()
+    finally:
+        for task in in_flight:
+            task.cancel()
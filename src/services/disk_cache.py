@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.core.metrics import cache_eviction, cache_lookup
+from src.services.render_cache import CachedRender
+
+INDEX_NAME = "index.sqlite3"
+
+# Hits refresh an entry's access time at most this often (seconds), so hot
+# entries do not turn every read into an index write
+TOUCH_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, bytes) VALUES (0, 0);
+"""
+
+
+class DiskRenderCache:
+    """
+    Render outputs on disk, shared by every worker process and kept across
+    restarts.
+
+    Each output lives at `<directory>/<key[:2]>/<key[2:4]>/<key>`, written to a
+    temporary file and renamed into place so readers never see a partial file.
+    A SQLite index (WAL mode, one connection per thread) records size,
+    content type and last access of every entry plus the running total;
+    writers update it in IMMEDIATE transactions and evict least recently used
+    entries beyond `max_bytes`. An indexed file that went missing is a miss
+    and drops its row. The cache is best-effort: I/O and database errors
+    count as misses or skipped writes (`errors` in stats).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.max_bytes > 0
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None or getattr(self._local, "pid", None) != os.getpid():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(
+                self.directory / INDEX_NAME, timeout=10.0, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """IMMEDIATE transaction, rolled back on error so the connection stays usable"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+
+    def _error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key[2:4] / key
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        cache_lookup("disk", hit=hit)
+
+    def get(self, key: str) -> Optional[CachedRender]:
+        if not self.enabled:
+            return None
+        try:
+            return self._get(key)
+        except (OSError, sqlite3.Error):
+            self._error()
+            return None
+
+    def put(self, key: str, data: bytes, content_type: str) -> bool:
+        """Store an output; returns False if it is over budget or could not be written"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return False
+        try:
+            self._put(key, data, content_type)
+            return True
+        except (OSError, sqlite3.Error):
+            self._error()
+            return False
+
+    def _get(self, key: str) -> Optional[CachedRender]:
+        db = self._db()
+        row = db.execute(
+            "SELECT content_type, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count(hit=False)
+            return None
+        content_type, accessed = row
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            self._forget(key)
+            self._count(hit=False)
+            return None
+        now = time.time()
+        if now - accessed > TOUCH_INTERVAL:
+            db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count(hit=True)
+        return CachedRender(data=data, content_type=content_type)
+
+    def _put(self, key: str, data: bytes, content_type: str) -> None:
+        size = len(data)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+        with self._transaction() as db:
+            previous = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, content_type, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, size, content_type, time.time()),
+            )
+            delta = size - (previous[0] if previous else 0)
+            db.execute("UPDATE totals SET bytes = bytes + ? WHERE id = 0", (delta,))
+            victims = self._evict(db)
+        # Files go after the commit: a reader that still finds the row and
+        # loses the race simply sees a miss
+        for victim in victims:
+            self._path(victim).unlink(missing_ok=True)
+
+    def _evict(self, db: sqlite3.Connection) -> List[str]:
+        """Drop least recently used rows until the total fits; returns their keys"""
+        (total,) = db.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()
+        excess = total - self.max_bytes
+        victims = []
+        if excess <= 0:
+            return victims
+        oldest = db.execute("SELECT key, size FROM entries ORDER BY accessed")
+        for key, size in oldest:
+            if excess <= 0:
+                break
+            victims.append(key)
+            excess -= size
+        oldest.close()
+        freed = 0
+        for key in victims:
+            (size,) = db.execute(
+                "DELETE FROM entries WHERE key = ? RETURNING size", (key,)
+            ).fetchone()
+            freed += size
+            cache_eviction("disk")
+        db.execute("UPDATE totals SET bytes = bytes - ? WHERE id = 0", (freed,))
+        with self._lock:
+            self.evictions += len(victims)
+        return victims
+
+    def _forget(self, key: str) -> None:
+        with self._transaction() as db:
+            row = db.execute(
+                "DELETE FROM entries WHERE key = ? RETURNING size", (key,)
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE totals SET bytes = bytes - ? WHERE id = 0", (row[0],))
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._transaction() as db:
+                keys = [key for (key,) in db.execute("SELECT key FROM entries")]
+                db.execute("DELETE FROM entries")
+                db.execute("UPDATE totals SET bytes = 0 WHERE id = 0")
+            for key in keys:
+                self._path(key).unlink(missing_ok=True)
+        except (OSError, sqlite3.Error):
+            self._error()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Counters, plus entries and bytes from the index (None if it cannot be read)"""
+        if not self.enabled:
+            return {"enabled": False}
+        entries = total = None
+        try:
+            db = self._db()
+            (entries,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            (total,) = db.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()
+        except (OSError, sqlite3.Error):
+            self._error()
+        with self._lock:
+            return {
+                "enabled": True,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+            }
@@ -0,0 +1,257 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+from src.core.config import settings
+from src.core.metrics import cache_eviction, cache_lookup
+from src.services.logo_fetcher import LogoFetcher, RemoteLogo, local_upload, logo_fetcher
+
+_versions = itertools.count(1)
+
+
+@dataclass
+class _Source:
+    """Raw logo bytes plus what is needed to tell whether they are still current"""
+
+    data: bytes
+    version: int
+    checked_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    mtime_ns: Optional[int] = None
+    undecodable: bool = False
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class _Bitmap:
+    image: Image.Image
+    version: int
+
+    @property
+    def nbytes(self) -> int:
+        return self.image.width * self.image.height * len(self.image.getbands())
+
+
+EntryKey = Union[Tuple[str, str], Tuple[str, str, int, str]]
+
+
+class LogoCache:
+    """
+    LRU of decoded logos already resized to their target pixel size, keyed by
+    (source, size, mode), plus the raw bytes they were decoded from.
+
+    Remote sources are trusted for `ttl` seconds, then revalidated with a
+    conditional request (ETag / Last-Modified); files under uploads/ are
+    revalidated by mtime on every lookup. A bitmap is only reused while the
+    source version it was decoded from is still current. Sources and bitmaps
+    share one byte budget.
+    """
+
+    def __init__(self, fetcher: LogoFetcher, max_bytes: int, ttl: float):
+        self.fetcher = fetcher
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries: "OrderedDict[EntryKey, Union[_Source, _Bitmap]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def _get(self, key: EntryKey):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: EntryKey, entry: Union[_Source, _Bitmap]) -> None:
+        if entry.nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous.nbytes
+        self._entries[key] = entry
+        self.current_bytes += entry.nbytes
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+            cache_eviction("logo")
+
+    def _local_source(self, url: str, path: Path) -> Optional[_Source]:
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            source = self._get(("source", url))
+            if source is not None and source.mtime_ns == mtime_ns:
+                return source
+        source = _Source(
+            data=path.read_bytes(),
+            version=next(_versions),
+            checked_at=time.monotonic(),
+            mtime_ns=mtime_ns,
+        )
+        with self._lock:
+            self._put(("source", url), source)
+        return source
+
+    def _cached_remote(self, url: str) -> Tuple[Optional[_Source], bool]:
+        """Cached source for a URL and whether it is still within its TTL"""
+        with self._lock:
+            source = self._get(("source", url))
+        if source is None:
+            return None, False
+        return source, time.monotonic() - source.checked_at < self.ttl
+
+    def _store_remote(
+        self, url: str, cached: Optional[_Source], result: Optional[RemoteLogo]
+    ) -> Optional[_Source]:
+        now = time.monotonic()
+        if result is None:
+            # Serve a stale copy rather than nothing while the origin is failing
+            return cached
+        if result.not_modified and cached is not None:
+            with self._lock:
+                cached.checked_at = now
+                self.revalidations += 1
+            return cached
+        if result.data is None:
+            return None
+        source = _Source(
+            data=result.data,
+            version=next(_versions),
+            checked_at=now,
+            etag=result.etag,
+            last_modified=result.last_modified,
+        )
+        with self._lock:
+            self._put(("source", url), source)
+        return source
+
+    def _cached_bitmap(
+        self, url: str, size: int, mode: str, source: _Source
+    ) -> Optional[Image.Image]:
+        """Bitmap decoded from the current version of `source`, counting the lookup"""
+        with self._lock:
+            bitmap = self._get(("bitmap", url, size, mode))
+            if bitmap is not None and bitmap.version == source.version:
+                self.hits += 1
+                cache_lookup("logo", hit=True)
+                return bitmap.image
+            self.misses += 1
+            cache_lookup("logo", hit=False)
+        return None
+
+    def _decode(
+        self, url: str, size: int, mode: str, source: _Source
+    ) -> Optional[Image.Image]:
+        """Decode and resize `source`, then cache the bitmap"""
+        if source.undecodable:
+            return None
+        key = ("bitmap", url, size, mode)
+        try:
+            image = Image.open(BytesIO(source.data))
+            if image.format == "JPEG":
+                # Let libjpeg downscale while decoding
+                image.draft("RGB", (size, size))
+            image = image.convert(mode).resize((size, size), Image.LANCZOS)
+        except Exception as e:
+            print(f"Failed to load logo: {e}")
+            source.undecodable = True
+            return None
+
+        with self._lock:
+            self._put(key, _Bitmap(image=image, version=source.version))
+        return image
+
+    def _bitmap(
+        self, url: str, size: int, mode: str, source: _Source
+    ) -> Optional[Image.Image]:
+        image = self._cached_bitmap(url, size, mode, source)
+        if image is None:
+            image = self._decode(url, size, mode, source)
+        return image
+
+    async def get(self, url: str, size: int, mode: str = "RGBA") -> Optional[Image.Image]:
+        """
+        Logo decoded and resized to `size` x `size`, or None if unavailable.
+        File reads and decoding run in a worker thread; only cache lookups
+        and remote fetches stay on the event loop.
+        """
+        path = local_upload(url)
+        if path is not None:
+            source = await asyncio.to_thread(self._local_source, url, path)
+        else:
+            source, fresh = self._cached_remote(url)
+            if not fresh:
+                result = await self.fetcher.fetch(
+                    url,
+                    etag=source.etag if source else None,
+                    last_modified=source.last_modified if source else None,
+                )
+                source = self._store_remote(url, source, result)
+        if source is None:
+            return None
+        image = self._cached_bitmap(url, size, mode, source)
+        if image is None:
+            image = await asyncio.to_thread(self._decode, url, size, mode, source)
+        return image
+
+    def get_blocking(
+        self, url: str, size: int, mode: str = "RGBA"
+    ) -> Optional[Image.Image]:
+        """Synchronous variant of `get` for callers outside the event loop"""
+        path = local_upload(url)
+        if path is not None:
+            source = self._local_source(url, path)
+        else:
+            source, fresh = self._cached_remote(url)
+            if not fresh:
+                result = self.fetcher.fetch_blocking(
+                    url,
+                    etag=source.etag if source else None,
+                    last_modified=source.last_modified if source else None,
+                )
+                source = self._store_remote(url, source, result)
+        if source is None:
+            return None
+        return self._bitmap(url, size, mode, source)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
+
+
+logo_cache = LogoCache(
+    fetcher=logo_fetcher,
+    max_bytes=settings.logo_cache_max_bytes,
+    ttl=settings.logo_cache_ttl,
+)
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from src.core.config import settings
+from src.core.metrics import LOGO_FETCHES
+
+UPLOAD_DIR = Path("uploads")
+
+# Failed URLs remembered at once; the ones expiring first are forgotten first
+NEGATIVE_CACHE_SIZE = 10_000
+
+
+class LogoFetchError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RemoteLogo:
+    """Result of a (possibly conditional) logo download"""
+
+    data: Optional[bytes]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+
+
+def local_upload(url: str) -> Optional[Path]:
+    """Files served from our own /uploads/ mount are read from disk, not over HTTP"""
+    if "/uploads/" not in url:
+        return None
+    path = UPLOAD_DIR / Path(url.split("/uploads/")[-1]).name
+    return path if path.is_file() else None
+
+
+def _failure_outcome(error: Exception) -> str:
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(error, LogoFetchError):
+        return "rejected"
+    return "error"
+
+
+def _conditional_headers(
+    etag: Optional[str], last_modified: Optional[str]
+) -> Dict[str, str]:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class LogoFetcher:
+    """
+    Downloads remote logos for the render pipeline.
+
+    Downloads go through one pooled `httpx.AsyncClient`. Every fetch runs
+    under a single overall deadline (retries included), concurrent requests
+    for the same URL share one download, and URLs that failed are not retried
+    for `negative_ttl` seconds. Passing the validators of a cached copy turns
+    the request into a conditional one.
+    """
+
+    def __init__(
+        self,
+        deadline: float,
+        negative_ttl: float,
+        max_bytes: int,
+        retries: int = 1,
+    ):
+        self.deadline = deadline
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[Tuple, "asyncio.Task[RemoteLogo]"] = {}
+        # URL -> expiry, in expiry order (every entry lives negative_ttl)
+        self._failures: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        # An AsyncClient's connection pool belongs to the loop that opened it
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.deadline,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+            self._loop = loop
+            self._inflight = {}
+        return self._client
+
+    def _recently_failed(self, url: str) -> bool:
+        with self._lock:
+            expiry = self._failures.get(url)
+            if expiry is None:
+                return False
+            if expiry > time.monotonic():
+                return True
+            del self._failures[url]
+            return False
+
+    def _remember_failure(self, url: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._failures.pop(url, None)
+            self._failures[url] = now + self.negative_ttl
+            # URLs come from clients: drop expired entries and keep the size bounded
+            while self._failures:
+                expiry = next(iter(self._failures.values()))
+                if expiry > now and len(self._failures) <= NEGATIVE_CACHE_SIZE:
+                    break
+                self._failures.popitem(last=False)
+
+    def _result(self, response: httpx.Response, data: Optional[bytes]) -> RemoteLogo:
+        return RemoteLogo(
+            data=data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            not_modified=response.status_code == 304,
+        )
+
+    async def _download(self, url: str, headers: Dict[str, str]) -> RemoteLogo:
+        client = self._client_for_loop()
+        async with asyncio.timeout(self.deadline):
+            for attempt in range(self.retries + 1):
+                try:
+                    async with client.stream("GET", url, headers=headers) as response:
+                        if response.status_code == 304:
+                            return self._result(response, None)
+                        response.raise_for_status()
+                        data = bytearray()
+                        async for chunk in response.aiter_bytes():
+                            data += chunk
+                            if len(data) > self.max_bytes:
+                                raise LogoFetchError(
+                                    f"Logo larger than {self.max_bytes} bytes"
+                                )
+                        return self._result(response, bytes(data))
+                except (httpx.RequestError, httpx.HTTPStatusError):
+                    if attempt == self.retries:
+                        raise
+                    await asyncio.sleep(0.1 * (attempt + 1))
+        raise LogoFetchError(url)  # pragma: no cover
+
+    async def fetch(
+        self,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Optional[RemoteLogo]:
+        """Download result, or None if the logo cannot be retrieved in time"""
+        if self._recently_failed(url):
+            LOGO_FETCHES.labels("skipped").inc()
+            return None
+
+        self._client_for_loop()
+        key = (url, etag, last_modified)
+        task = self._inflight.get(key)
+        if task is None:
+            headers = _conditional_headers(etag, last_modified)
+            task = asyncio.ensure_future(self._download(url, headers))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            # Shielded so that one cancelled caller does not abort the
+            # download the other callers are waiting on
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGO_FETCHES.labels(_failure_outcome(e)).inc()
+            self._remember_failure(url)
+            print(f"Failed to load logo: {e!r}")
+            return None
+        LOGO_FETCHES.labels("not_modified" if result.not_modified else "ok").inc()
+        return result
+
+    def fetch_blocking(
+        self,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Optional[RemoteLogo]:
+        """Synchronous variant for callers outside the event loop"""
+        if self._recently_failed(url):
+            LOGO_FETCHES.labels("skipped").inc()
+            return None
+        deadline = time.monotonic() + self.deadline
+        try:
+            with httpx.stream(
+                "GET",
+                url,
+                headers=_conditional_headers(etag, last_modified),
+                timeout=self.deadline,
+                follow_redirects=True,
+            ) as response:
+                if response.status_code == 304:
+                    LOGO_FETCHES.labels("not_modified").inc()
+                    return self._result(response, None)
+                response.raise_for_status()
+                data = bytearray()
+                # httpx timeouts are per read: enforce the overall deadline here
+                for chunk in response.iter_bytes():
+                    data += chunk
+                    if len(data) > self.max_bytes:
+                        raise LogoFetchError(f"Logo larger than {self.max_bytes} bytes")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Logo not received within {self.deadline}s")
+            LOGO_FETCHES.labels("ok").inc()
+            return self._result(response, bytes(data))
+        except (httpx.HTTPError, LogoFetchError, TimeoutError) as e:
+            LOGO_FETCHES.labels(_failure_outcome(e)).inc()
+            self._remember_failure(url)
+            print(f"Failed to load logo: {e!r}")
+            return None
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+logo_fetcher = LogoFetcher(
+    deadline=settings.logo_fetch_deadline,
+    negative_ttl=settings.logo_negative_ttl,
+    max_bytes=settings.logo_max_bytes,
+)
@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import qrcode
+
+from src.core.config import settings
+from src.core.metrics import cache_eviction, cache_lookup
+from src.services import qr_encoder
+
+
+@dataclass(frozen=True)
+class ModuleMatrix:
+    """
+    Encoded QR symbol stored as a row-major packed bitset (one bit per module).
+
+    The quiet zone is not part of the bitset; `border` records how many
+    modules of it renderers should add around the symbol.
+    """
+
+    version: int
+    error_correction: int
+    border: int
+    modules_count: int
+    bits: bytes
+
+    @classmethod
+    def from_array(
+        cls, dense: np.ndarray, version: int, error_correction: int, border: int
+    ) -> "ModuleMatrix":
+        return cls(
+            version=version,
+            error_correction=error_correction,
+            border=border,
+            modules_count=dense.shape[0],
+            bits=np.packbits(dense, axis=None).tobytes(),
+        )
+
+    @classmethod
+    def from_qr(cls, qr: qrcode.QRCode) -> "ModuleMatrix":
+        dense = np.array(qr.modules, dtype=bool)
+        return cls.from_array(dense, qr.version, qr.error_correction, qr.border)
+
+    def to_array(self) -> np.ndarray:
+        """Unpack into a boolean (modules_count x modules_count) array"""
+        count = self.modules_count
+        flat = np.unpackbits(
+            np.frombuffer(self.bits, dtype=np.uint8), count=count * count
+        )
+        return flat.reshape(count, count).astype(bool)
+
+    def to_modules(self) -> list[list[bool]]:
+        return self.to_array().tolist()
+
+    def to_qr(self, box_size: int = 10) -> qrcode.QRCode:
+        """Hydrate a `qrcode.QRCode` whose image factories skip encoding entirely"""
+        qr = qrcode.QRCode(
+            version=self.version,
+            error_correction=self.error_correction,
+            box_size=box_size,
+            border=self.border,
+        )
+        qr.modules = self.to_modules()
+        qr.modules_count = self.modules_count
+        # make_image() only re-encodes when data_cache is None
+        qr.data_cache = []
+        return qr
+
+
+MatrixKey = Tuple[str, int, int, Optional[int], Optional[int]]
+
+
+class MatrixCache:
+    """LRU of encoded module matrices keyed by (content, error_correction, margin, version, mask_pattern)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[MatrixKey, ModuleMatrix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: MatrixKey) -> Optional[ModuleMatrix]:
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is None:
+                self.misses += 1
+                cache_lookup("matrix", hit=False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cache_lookup("matrix", hit=True)
+            return matrix
+
+    def put(self, key: MatrixKey, matrix: ModuleMatrix) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = matrix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                cache_eviction("matrix")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def encode_matrix(
+    content: str,
+    error_correction: int,
+    border: int,
+    version: Optional[int] = None,
+    mask_pattern: Optional[int] = None,
+) -> ModuleMatrix:
+    """
+    Encode `content`, fitting the smallest version and scoring every mask
+    unless `version` / `mask_pattern` pin them. Content that overflows a
+    pinned version raises DataOverflowError before any encoding work.
+    """
+    if version is not None:
+        qr_encoder.check_capacity(content, error_correction, version)
+    if settings.qr_encoder == "numpy":
+        dense, version = qr_encoder.encode(content, error_correction, version, mask_pattern)
+        return ModuleMatrix.from_array(dense, version, error_correction, border)
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=error_correction,
+        border=border,
+        mask_pattern=mask_pattern,
+    )
+    qr.add_data(content)
+    qr.make(fit=version is None)
+    return ModuleMatrix.from_qr(qr)
@@ -0,0 +1,191 @@
+import zlib
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.services.matrix_cache import ModuleMatrix
+from src.services.raster import padded_grid
+from src.services.stamp_atlas import _eye_mask
+from src.services.vector_shapes import Outline, shape_groups
+
+# Raster PDFs were written at 300 dpi, keep the same physical page size
+RESOLUTION = 300
+
+# Content streams are mostly repeated path templates: fast levels already
+# shrink them 4x, higher ones cost several times more for little gain
+COMPRESSION_LEVEL = 3
+
+# Paths are drawn in integer units of 1/100 of a module
+UNITS = 100
+
+PDF_OPERATORS = {"M": "m", "L": "l", "C": "c", "Z": "h"}
+
+
+def _num(value: float, digits: int = 3) -> str:
+    text = f"{value:.{digits}f}".rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
+
+
+def _color(rgb: Tuple[int, int, int]) -> str:
+    return " ".join(_num(channel / 255) for channel in rgb)
+
+
+@lru_cache(maxsize=1024)
+def _template(shape: Outline) -> Tuple[str, np.ndarray, np.ndarray]:
+    """
+    PDF path operators of an outline as a %-format string, its integer
+    coordinates at the origin, and whether each coordinate is an x (1), a
+    y (0) or a size (-1) that placements must not offset
+    """
+    if shape.is_rectangle:
+        x0, y0, x1, y1 = shape.box
+        coords = [x0, y0, x1 - x0, y1 - y0]
+        return "%d %d %d %d re", _units(coords), np.array([1, 0, -1, -1])
+
+    ops = []
+    coords = []
+    for op, *values in shape.segments:
+        ops.append(" ".join(["%d"] * len(values) + [PDF_OPERATORS[op]]))
+        coords.extend(values)
+    axes = np.tile([1, 0], len(coords) // 2)
+    return "\n".join(ops), _units(coords), axes
+
+
+def _units(values: List[float]) -> np.ndarray:
+    return np.round(np.array(values, dtype=np.float64) * UNITS).astype(np.int64)
+
+
+def _paths(grid: np.ndarray, mask: np.ndarray, style: str) -> Iterator[str]:
+    """Path operators covering the modules of `mask` drawn with `style`"""
+    for shape, origins in shape_groups(grid, mask, style).items():
+        template, base, axes = _template(shape)
+        coords = np.tile(base, (len(origins), 1))
+        coords[:, axes == 1] += origins[:, :1] * UNITS
+        coords[:, axes == 0] += origins[:, 1:] * UNITS
+        # One format call for every placement of the same outline
+        yield "\n".join([template] * len(coords)) % tuple(coords.ravel().tolist())
+
+
+def _image_objects(logo: Image.Image) -> Tuple[bytes, Optional[bytes]]:
+    """Flate-compressed image XObject bodies: the RGB samples and an alpha SMask"""
+    rgb = logo.convert("RGB")
+    width, height = rgb.size
+    smask = None
+    if "A" in logo.getbands():
+        alpha = zlib.compress(logo.getchannel("A").tobytes())
+        smask = _stream(
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode",
+            alpha,
+        )
+    image = zlib.compress(rgb.tobytes())
+    return image, smask
+
+
+def _stream(dictionary: str, data: bytes) -> bytes:
+    return (
+        f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode("ascii")
+        + data
+        + b"\nendstream"
+    )
+
+
+def _document(objects: List[bytes]) -> bytes:
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("ascii")
+    return bytes(out)
+
+
+def write_pdf(
+    matrix: ModuleMatrix,
+    size: int,
+    body_style: str,
+    eye_style: str,
+    fill: Tuple[int, int, int],
+    back: Tuple[int, int, int],
+    logo: Optional[Image.Image] = None,
+) -> bytes:
+    """
+    Single-page vector PDF of the symbol, at the page size the 300 dpi
+    raster PDFs had.
+
+    Square modules are merged into one rectangle per horizontal run and bars
+    into one shape per run; other styles place one precomputed shape per
+    module and neighbour context. Everything is filled in a single operation
+    from one Flate-compressed content stream. The logo, if any, is embedded
+    once as an image XObject.
+    """
+    grid = padded_grid(matrix)
+    modules = grid.shape[0]
+    page = size * 72 / RESOLUTION
+    unit = page / (modules * UNITS)
+
+    eyes = _eye_mask(matrix)
+    paths = [
+        *_paths(grid, grid & ~eyes, body_style),
+        *_paths(grid, grid & eyes, eye_style),
+    ]
+
+    content = [
+        f"{_color(back)} rg 0 0 {_num(page)} {_num(page)} re f",
+        # Path units with the origin at the top-left, y pointing down. All
+        # shapes go into one path so touching edges are filled without seams
+        f"q {_num(unit, 8)} 0 0 {_num(-unit, 8)} 0 {_num(page)} cm",
+        f"{_color(fill)} rg",
+        *paths,
+        "f Q",
+    ]
+
+    # Objects 1-4 are the catalog, page tree, page and content stream
+    objects: List[bytes] = []
+    resources = ""
+    if logo is not None:
+        # Same placement as the raster renderers: 20% of the width, centered
+        logo_px = int(size * 0.2)
+        position = (size - logo_px) // 2
+        scale = 72 / RESOLUTION
+        content.append(
+            f"q {_num(logo_px * scale)} 0 0 {_num(logo_px * scale)} "
+            f"{_num(position * scale)} {_num(page - (position + logo_px) * scale)} cm "
+            f"/Logo Do Q"
+        )
+        image, smask = _image_objects(logo)
+        smask_ref = " /SMask 6 0 R" if smask is not None else ""
+        objects.append(
+            _stream(
+                f"/Type /XObject /Subtype /Image /Width {logo.width} "
+                f"/Height {logo.height} /ColorSpace /DeviceRGB "
+                f"/BitsPerComponent 8 /Filter /FlateDecode{smask_ref}",
+                image,
+            )
+        )
+        if smask is not None:
+            objects.append(smask)
+        resources = "/XObject << /Logo 5 0 R >>"
+
+    stream = zlib.compress("\n".join(content).encode("ascii"), COMPRESSION_LEVEL)
+    return _document(
+        [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(page)} {_num(page)}] "
+                f"/Resources << {resources} >> /Contents 4 0 R >>"
+            ).encode("ascii"),
+            _stream("/Filter /FlateDecode", stream),
+            *objects,
+        ]
+    )
@@ -0,0 +1,104 @@
+import struct
+import zlib
+from typing import Tuple
+
+import numpy as np
+
+from src.services.matrix_cache import ModuleMatrix
+from src.services.raster import grid_coverage, padded_grid
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG filter type bytes. Unfiltered rows usually compress best: each module
+# row repeats over several pixel rows, which zlib already matches whole
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2}
+
+# Antialiased edges are quantized to this many levels between the two colors
+ANTIALIAS_LEVELS = 4
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def _palette(
+    fill: Tuple[int, int, int], back: Tuple[int, int, int], levels: int
+) -> bytes:
+    """`levels` colors going from the background to the fill color"""
+    steps = np.linspace(0.0, 1.0, levels)[:, None]
+    back_rgb = np.asarray(back, dtype=np.float64)
+    fill_rgb = np.asarray(fill, dtype=np.float64)
+    return np.rint(back_rgb + steps * (fill_rgb - back_rgb)).astype(np.uint8).tobytes()
+
+
+def _pack(indices: np.ndarray, bit_depth: int) -> np.ndarray:
+    """Palette indices packed into PNG scanlines, leftmost pixel in the high bits"""
+    if bit_depth == 1:
+        return np.packbits(indices.astype(bool), axis=1)
+    per_byte = 8 // bit_depth
+    height, width = indices.shape
+    padded = np.zeros((height, -(-width // per_byte) * per_byte), dtype=np.uint8)
+    padded[:, :width] = indices
+    groups = padded.reshape(height, -1, per_byte)
+    packed = np.zeros(groups.shape[:2], dtype=np.uint8)
+    for slot in range(per_byte):
+        packed |= groups[:, :, slot] << (8 - bit_depth * (slot + 1))
+    return packed
+
+
+def _filter(rows: np.ndarray, strategy: str) -> bytes:
+    """Scanlines prefixed with their filter type byte, filtered as a whole"""
+    filtered = rows.copy()
+    if strategy == "sub":
+        # Sub-byte depths filter against the previous byte
+        filtered[:, 1:] -= rows[:, :-1]
+    elif strategy == "up":
+        filtered[1:] -= rows[:-1]
+    prefix = np.full((rows.shape[0], 1), PNG_FILTERS[strategy], dtype=np.uint8)
+    return np.hstack([prefix, filtered]).tobytes()
+
+
+def write_png(
+    matrix: ModuleMatrix,
+    size: int,
+    fill: Tuple[int, int, int],
+    back: Tuple[int, int, int],
+    antialias: bool = True,
+    compression_level: int = 6,
+    filter_strategy: str = "none",
+) -> bytes:
+    """
+    Indexed PNG of the symbol at `size` x `size` pixels, encoded straight
+    from the module matrix without any image allocation.
+
+    Codes that land on whole pixels are 1-bit with a two-color palette.
+    Antialiased codes at fractional scales are 2-bit: their edge pixels take
+    the nearest of `ANTIALIAS_LEVELS` blends of the two colors.
+    """
+    if filter_strategy not in PNG_FILTERS:
+        raise ValueError(f"Unknown PNG filter: {filter_strategy}")
+
+    coverage = grid_coverage(padded_grid(matrix), size, antialias=antialias)
+    if coverage.dtype == bool:
+        bit_depth, levels = 1, 2
+        indices = coverage
+    else:
+        bit_depth, levels = 2, ANTIALIAS_LEVELS
+        indices = np.rint(coverage * (levels - 1)).astype(np.uint8)
+
+    scanlines = _filter(_pack(indices, bit_depth), filter_strategy)
+    header = struct.pack(">IIBBBBB", size, size, bit_depth, 3, 0, 0, 0)
+    return b"".join(
+        [
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", header),
+            _chunk(b"PLTE", _palette(fill, back, levels)),
+            _chunk(b"IDAT", zlib.compress(scanlines, compression_level)),
+            _chunk(b"IEND", b""),
+        ]
+    )
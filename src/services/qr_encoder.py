@@ -0,0 +1,412 @@
+"""
+QR encoder producing the same symbols as `qrcode.QRCode(...).make(fit=True)`.
+
+The library scores the eight mask candidates with pure-Python loops over
+lists of lists, which dominates encoding time for long contents. Here the
+function patterns and the data placement order are computed once per
+version, Reed-Solomon blocks are divided together through a per-generator
+multiplication table, and the four penalty rules are evaluated with NumPy
+over all eight masks at once. Segmentation, version fitting, penalties and
+tie-breaking follow qrcode 7.4 exactly, so both encoders are interchangeable;
+the spec tables (RS blocks, alignment positions, BCH codes) are the library's.
+"""
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from qrcode import exceptions, util
+from qrcode.base import rs_blocks
+
+MODE_NUMBER = util.MODE_NUMBER
+MODE_ALPHA_NUM = util.MODE_ALPHA_NUM
+MODE_8BIT_BYTE = util.MODE_8BIT_BYTE
+
+ALPHA_NUM = util.ALPHA_NUM
+_ALPHA_VALUES = {char: value for value, char in enumerate(ALPHA_NUM)}
+
+# Chunks shorter than this stay in the surrounding mode (qrcode's `optimize`)
+OPTIMIZE_MINIMUM = 20
+
+Segment = Tuple[int, bytes]
+
+
+def _exp_log_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """GF(256) antilog (doubled, to skip a modulo) and log tables for x^8+x^4+x^3+x^2+1"""
+    exp = np.zeros(512, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    value = 1
+    for power in range(255):
+        exp[power] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= 0x11D
+    exp[255:510] = exp[:255]
+    return exp, log
+
+
+GF_EXP, GF_LOG = _exp_log_tables()
+
+
+def segments(content: str, minimum: int = OPTIMIZE_MINIMUM) -> List[Segment]:
+    """(mode, bytes) chunks, split exactly like `util.optimal_data_chunks`"""
+    data = content.encode("utf-8")
+    num_pattern = rb"\d"
+    alpha_pattern = b"[" + re.escape(ALPHA_NUM) + b"]"
+    if len(data) <= minimum:
+        num_re = re.compile(b"^" + num_pattern + b"+$")
+        alpha_re = re.compile(b"^" + alpha_pattern + b"+$")
+    else:
+        repeat = b"{" + str(minimum).encode("ascii") + b",}"
+        num_re = re.compile(num_pattern + repeat)
+        alpha_re = re.compile(alpha_pattern + repeat)
+
+    chunks: List[Segment] = []
+    for is_num, chunk in _split(data, num_re):
+        if is_num:
+            chunks.append((MODE_NUMBER, chunk))
+            continue
+        for is_alpha, sub_chunk in _split(chunk, alpha_re):
+            chunks.append((MODE_ALPHA_NUM if is_alpha else MODE_8BIT_BYTE, sub_chunk))
+    return chunks
+
+
+def _split(data: bytes, pattern: "re.Pattern[bytes]"):
+    while data:
+        match = pattern.search(data)
+        if not match:
+            break
+        start, end = match.start(), match.end()
+        if start:
+            yield False, data[:start]
+        yield True, data[start:end]
+        data = data[end:]
+    if data:
+        yield False, data
+
+
+def _segment_bits(mode: int, data: bytes) -> Tuple[int, int]:
+    """Payload of one segment as (value, bit length)"""
+    value = 0
+    length = 0
+    if mode == MODE_NUMBER:
+        for i in range(0, len(data), 3):
+            chars = data[i : i + 3]
+            bits = util.NUMBER_LENGTH[len(chars)]
+            value = (value << bits) | int(chars)
+            length += bits
+    elif mode == MODE_ALPHA_NUM:
+        for i in range(0, len(data) - 1, 2):
+            value = (value << 11) | (_ALPHA_VALUES[data[i]] * 45 + _ALPHA_VALUES[data[i + 1]])
+            length += 11
+        if len(data) % 2:
+            value = (value << 6) | _ALPHA_VALUES[data[-1]]
+            length += 6
+    else:
+        value = int.from_bytes(data, "big")
+        length = 8 * len(data)
+    return value, length
+
+
+def _bit_stream(chunks: List[Tuple[int, bytes, int, int]], version: int) -> Tuple[int, int]:
+    mode_sizes = util.mode_sizes_for_version(version)
+    value = 0
+    length = 0
+    for mode, data, payload, payload_length in chunks:
+        count_bits = mode_sizes[mode]
+        value = (value << 4) | mode
+        value = (value << count_bits) | (len(data) & ((1 << count_bits) - 1))
+        value = (value << payload_length) | payload
+        length += 4 + count_bits + payload_length
+    return value, length
+
+
+def best_version(chunks: List[Tuple[int, bytes, int, int]], error_correction: int) -> int:
+    """Smallest version holding the data, searched like `QRCode.best_fit`"""
+    start = 1
+    while True:
+        _, needed = _bit_stream(chunks, start)
+        version = bisect_left(util.BIT_LIMIT_TABLE[error_correction], needed, start)
+        if version == 41:
+            raise exceptions.DataOverflowError()
+        if util.mode_sizes_for_version(version) is util.mode_sizes_for_version(start):
+            return version
+        start = version
+
+
+@lru_cache(maxsize=None)
+def _generator_table(ec_count: int) -> np.ndarray:
+    """(256, ec_count) products of every byte with the generator's non-leading terms"""
+    generator = np.array([1], dtype=np.int32)
+    for i in range(ec_count):
+        # generator * (x + a^i)
+        shifted = np.append(generator, 0)
+        scaled = np.zeros_like(shifted)
+        nonzero = generator != 0
+        scaled[1:][nonzero] = GF_EXP[GF_LOG[generator[nonzero]] + i]
+        generator = shifted ^ scaled
+    terms = generator[1:]
+    table = np.zeros((256, ec_count), dtype=np.int32)
+    factors = np.arange(1, 256)
+    table[1:] = GF_EXP[GF_LOG[factors][:, None] + GF_LOG[terms][None, :]]
+    return table
+
+
+def codewords(data: bytes, version: int, error_correction: int) -> np.ndarray:
+    """Data and error correction codewords, interleaved across blocks"""
+    blocks = rs_blocks(version, error_correction)
+    data_counts = np.array([block.data_count for block in blocks])
+    ec_count = blocks[0].total_count - blocks[0].data_count
+    longest = int(data_counts.max())
+    stream = np.frombuffer(data, dtype=np.uint8).astype(np.int32)
+
+    # Blocks left-padded with zeros so every division runs in lockstep;
+    # leading zero coefficients leave the remainder unchanged
+    work = np.zeros((len(blocks), longest + ec_count), dtype=np.int32)
+    filled = np.zeros((len(blocks), longest), dtype=bool)
+    offsets = np.concatenate(([0], np.cumsum(data_counts)))
+    for index, count in enumerate(data_counts):
+        work[index, longest - count : longest] = stream[offsets[index] : offsets[index + 1]]
+        filled[index, :count] = True
+    table = _generator_table(ec_count)
+    for i in range(longest):
+        work[:, i + 1 : i + 1 + ec_count] ^= table[work[:, i]]
+
+    data_blocks = np.zeros((len(blocks), longest), dtype=np.int32)
+    data_blocks[filled] = stream
+    interleaved_data = data_blocks.T[filled.T]
+    interleaved_ec = work[:, longest:].T.ravel()
+    return np.concatenate((interleaved_data, interleaved_ec)).astype(np.uint8)
+
+
+def _chunks(content: str) -> List[Tuple[int, bytes, int, int]]:
+    return [(mode, data, *_segment_bits(mode, data)) for mode, data in segments(content)]
+
+
+def _overflow(version: int, needed: int, limit: int) -> exceptions.DataOverflowError:
+    return exceptions.DataOverflowError(
+        f"Contenu trop long pour la version {version} avec ce niveau de correction : "
+        f"{needed} bits pour {limit} disponibles"
+    )
+
+
+def check_capacity(content: str, error_correction: int, version: int) -> None:
+    """Raise DataOverflowError when `content` does not fit a pinned `version`"""
+    _, needed = _bit_stream(_chunks(content), version)
+    limit = util.BIT_LIMIT_TABLE[error_correction][version]
+    if needed > limit:
+        raise _overflow(version, needed, limit)
+
+
+def _data_bytes(
+    content: str, error_correction: int, version: Optional[int]
+) -> Tuple[bytes, int]:
+    chunks = _chunks(content)
+    if version is None:
+        version = best_version(chunks, error_correction)
+    value, length = _bit_stream(chunks, version)
+    limit = util.BIT_LIMIT_TABLE[error_correction][version]
+    if length > limit:
+        raise _overflow(version, length, limit)
+    # Terminator, then zeros up to a byte boundary
+    terminator = min(limit - length, 4)
+    value <<= terminator
+    length += terminator
+    value <<= -length % 8
+    length += -length % 8
+    payload = value.to_bytes(length // 8, "big")
+    pad_count = (limit - length) // 8
+    return payload + (bytes((util.PAD0, util.PAD1)) * (pad_count // 2 + 1))[:pad_count], version
+
+
+def _format_positions(count: int) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Coordinates of format bit i, in the vertical and horizontal copies"""
+    vertical = []
+    horizontal = []
+    for i in range(15):
+        if i < 6:
+            vertical.append((i, 8))
+        elif i < 8:
+            vertical.append((i + 1, 8))
+        else:
+            vertical.append((count - 15 + i, 8))
+        if i < 8:
+            horizontal.append((8, count - i - 1))
+        elif i < 9:
+            horizontal.append((8, 15 - i))
+        else:
+            horizontal.append((8, 15 - i - 1))
+    return vertical, horizontal
+
+
+def _version_positions(count: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    return [((i // 3, i % 3 + count - 11), (i % 3 + count - 11, i // 3)) for i in range(18)]
+
+
+@lru_cache(maxsize=None)
+def _template(version: int) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    Function patterns of a version with format and version information left
+    light (as qrcode scores masks), the data module coordinates in placement
+    order, and the eight masks evaluated at those coordinates.
+    """
+    count = version * 4 + 17
+    dark = np.zeros((count, count), dtype=bool)
+    reserved = np.zeros((count, count), dtype=bool)
+
+    finder = np.zeros((7, 7), dtype=bool)
+    finder[[0, 6], :] = finder[:, [0, 6]] = True
+    finder[2:5, 2:5] = True
+    for row, col in ((0, 0), (count - 7, 0), (0, count - 7)):
+        reserved[max(row - 1, 0) : row + 8, max(col - 1, 0) : col + 8] = True
+        dark[row : row + 7, col : col + 7] = finder
+
+    alignment = np.zeros((5, 5), dtype=bool)
+    alignment[[0, 4], :] = alignment[:, [0, 4]] = True
+    alignment[2, 2] = True
+    positions = util.pattern_position(version)
+    for row in positions:
+        for col in positions:
+            if reserved[row, col]:
+                continue
+            reserved[row - 2 : row + 3, col - 2 : col + 3] = True
+            dark[row - 2 : row + 3, col - 2 : col + 3] = alignment
+
+    timing = np.arange(8, count - 8)
+    free = ~reserved[timing, 6]
+    dark[timing[free], 6] = timing[free] % 2 == 0
+    reserved[timing, 6] = True
+    free = ~reserved[6, timing]
+    dark[6, timing[free]] = timing[free] % 2 == 0
+    reserved[6, timing] = True
+
+    vertical, horizontal = _format_positions(count)
+    for row, col in vertical + horizontal + [(count - 8, 8)]:
+        reserved[row, col] = True
+    if version >= 7:
+        for first, second in _version_positions(count):
+            reserved[first] = reserved[second] = True
+
+    # Two-column zigzag from the bottom right, skipping the vertical timing column
+    rows: List[int] = []
+    cols: List[int] = []
+    upward = True
+    for right in range(count - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        for row in range(count - 1, -1, -1) if upward else range(count):
+            for col in (right, right - 1):
+                if not reserved[row, col]:
+                    rows.append(row)
+                    cols.append(col)
+        upward = not upward
+    i = np.array(rows)
+    j = np.array(cols)
+    masks = np.stack(
+        [
+            (i + j) % 2 == 0,
+            i % 2 == 0,
+            j % 3 == 0,
+            (i + j) % 3 == 0,
+            (i // 2 + j // 3) % 2 == 0,
+            (i * j) % 2 + (i * j) % 3 == 0,
+            ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+            ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+        ]
+    )
+    for array in (dark, i, j, masks):
+        array.flags.writeable = False
+    return dark, (i, j), masks
+
+
+def warm_up() -> None:
+    """Build every version's template (about 0.2 s) so no request pays for one"""
+    for version in range(1, 41):
+        _template(version)
+
+
+def _run_penalty(candidates: np.ndarray) -> np.ndarray:
+    """
+    Rule 1 along rows: each run of 5+ same-colour modules scores length - 2,
+    i.e. one per 5-module window inside it plus two for the run itself.
+    """
+    same = candidates[:, :, 1:] == candidates[:, :, :-1]
+    windows = same[:, :, :-3] & same[:, :, 1:-2] & same[:, :, 2:-1] & same[:, :, 3:]
+    starts = windows.copy()
+    starts[:, :, 1:] &= ~same[:, :, :-4]
+    return windows.sum(axis=(1, 2)) + 2 * starts.sum(axis=(1, 2))
+
+
+def _finder_penalty(candidates: np.ndarray) -> np.ndarray:
+    """Rule 3 along rows: 40 per 1011101 pattern with four light modules on one side"""
+    width = candidates.shape[2] - 10
+    m = [candidates[:, :, offset : offset + width] for offset in range(11)]
+    core = ~m[1] & m[4] & ~m[5] & m[6] & ~m[9]
+    light_after = m[0] & m[2] & m[3] & ~m[7] & ~m[8] & ~m[10]
+    light_before = ~m[0] & ~m[2] & ~m[3] & m[7] & m[8] & m[10]
+    return 40 * (core & (light_after | light_before)).sum(axis=(1, 2))
+
+
+def penalties(candidates: np.ndarray) -> List[int]:
+    """`util.lost_point` of each (mask, row, col) candidate"""
+    count = candidates.shape[1]
+    columns = candidates.transpose(0, 2, 1)
+    score = _run_penalty(candidates) + _run_penalty(columns)
+
+    corner = candidates[:, :-1, :-1]
+    blocks = (
+        (corner == candidates[:, 1:, :-1])
+        & (corner == candidates[:, :-1, 1:])
+        & (corner == candidates[:, 1:, 1:])
+    )
+    score += 3 * blocks.sum(axis=(1, 2))
+    score += _finder_penalty(candidates) + _finder_penalty(columns)
+
+    result = []
+    for base, dark_count in zip(score.tolist(), candidates.sum(axis=(1, 2)).tolist()):
+        percent = float(dark_count) / (count**2)
+        result.append(base + int(abs(percent * 100 - 50) / 5) * 10)
+    return result
+
+
+def encode(
+    content: str,
+    error_correction: int,
+    version: Optional[int] = None,
+    mask_pattern: Optional[int] = None,
+) -> Tuple[np.ndarray, int]:
+    """
+    Boolean module matrix (without quiet zone) and version of `content`.
+    A pinned `version` skips fitting and a pinned `mask_pattern` skips mask
+    scoring, like `QRCode(version=..., mask_pattern=...).make(fit=False)`.
+    """
+    data, version = _data_bytes(content, error_correction, version)
+    dark, (rows, cols), masks = _template(version)
+    bits = np.unpackbits(codewords(data, version, error_correction))
+    placed = np.zeros(len(rows), dtype=bool)
+    placed[: len(bits)] = bits[: len(rows)]
+
+    if mask_pattern is None:
+        candidates = np.repeat(dark[None], 8, axis=0)
+        candidates[:, rows, cols] = placed ^ masks
+        scores = penalties(candidates)
+        mask = scores.index(min(scores))
+        modules = candidates[mask]
+    else:
+        mask = mask_pattern
+        modules = dark.copy()
+        modules[rows, cols] = placed ^ masks[mask]
+    count = modules.shape[0]
+    format_bits = util.BCH_type_info((error_correction << 3) | mask)
+    vertical, horizontal = _format_positions(count)
+    for i in range(15):
+        bit = bool((format_bits >> i) & 1)
+        modules[vertical[i]] = modules[horizontal[i]] = bit
+    modules[count - 8, 8] = True
+    if version >= 7:
+        version_bits = util.BCH_type_number(version)
+        for i, (first, second) in enumerate(_version_positions(count)):
+            modules[first] = modules[second] = bool((version_bits >> i) & 1)
+    return modules, version
@@ -1,9 +1,9 @@
+import hashlib
+import threading
 from io import BytesIO
 from uuid import uuid4
-import httpx
 from PIL import Image
 
-import qrcode
 from qrcode.constants import (
     ERROR_CORRECT_L,
     ERROR_CORRECT_M,
@@ -11,7 +11,6 @@ from qrcode.constants import (
     ERROR_CORRECT_H,
 )
 from qrcode.image.pil import PilImage
-from qrcode.image.svg import SvgImage
 from qrcode.image.styledpil import StyledPilImage
 from qrcode.image.styles.moduledrawers import (
     SquareModuleDrawer,
@@ -22,8 +21,22 @@ from qrcode.image.styles.moduledrawers import (
     HorizontalBarsDrawer,
 )
 from qrcode.image.styles.colormasks import SolidFillColorMask
+from qrcode.image.styles.moduledrawers.base import QRModuleDrawer
 
+from src.core.config import settings
+from src.core.timing import stage
 from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services import qr_encoder
+from src.services.disk_cache import DiskRenderCache
+from src.services.logo_cache import logo_cache
+from src.services.matrix_cache import MatrixCache, ModuleMatrix, encode_matrix
+from src.services.pdf_writer import write_pdf
+from src.services.png_writer import write_png
+from src.services.raster import render_square
+from src.services.stamp_atlas import render_styled, stamp_set
+from src.services.svg_writer import write_svg
+from src.services.sticker_frames import sticker_frames
+from src.services.render_cache import CachedRender, RenderCache, render_key
 
 ERROR_CORRECTION_MAP = {
     "L": ERROR_CORRECT_L,
@@ -37,31 +50,76 @@ CONTENT_TYPES = {
     QRCodeFormat.jpeg: "image/jpeg",
     QRCodeFormat.svg: "image/svg+xml",
     QRCodeFormat.pdf: "application/pdf",
+    QRCodeFormat.webp: "image/webp",
 }
 
+# Drawer factories: instances are bound to one image by initialize(), so each
+# render thread gets its own through _get_drawer()
 MODULE_DRAWERS = {
-    "square": SquareModuleDrawer(),
-    "gapped": GappedSquareModuleDrawer(),
-    "circle": CircleModuleDrawer(),
-    "rounded": RoundedModuleDrawer(),
-    "vertical": VerticalBarsDrawer(),
-    "horizontal": HorizontalBarsDrawer(),
+    "square": SquareModuleDrawer,
+    "gapped": GappedSquareModuleDrawer,
+    "circle": CircleModuleDrawer,
+    "rounded": RoundedModuleDrawer,
+    "vertical": VerticalBarsDrawer,
+    "horizontal": HorizontalBarsDrawer,
 }
 
 EYE_DRAWERS = {
-    "square": SquareModuleDrawer(),
-    "circle": CircleModuleDrawer(),
-    "rounded": RoundedModuleDrawer(),
+    "square": SquareModuleDrawer,
+    "circle": CircleModuleDrawer,
+    "rounded": RoundedModuleDrawer,
 }
 
+_thread_drawers = threading.local()
 
-def _build_qr(payload: QRCodeRequest) -> qrcode.QRCode:
-    return qrcode.QRCode(
-        version=None,
-        error_correction=ERROR_CORRECTION_MAP[payload.error_correction],
-        box_size=10,
-        border=payload.margin,
+
+def _get_drawer(kind: str, style: str) -> QRModuleDrawer:
+    """Drawer instance ("module" or "eye") private to the calling thread"""
+    drawers = getattr(_thread_drawers, "drawers", None)
+    if drawers is None:
+        drawers = _thread_drawers.drawers = {}
+    drawer = drawers.get((kind, style))
+    if drawer is None:
+        factories = MODULE_DRAWERS if kind == "module" else EYE_DRAWERS
+        drawer = factories.get(style, SquareModuleDrawer)()
+        drawers[(kind, style)] = drawer
+    return drawer
+
+
+render_cache = RenderCache(max_bytes=settings.render_cache_max_bytes)
+disk_cache = DiskRenderCache(settings.disk_cache_dir, settings.disk_cache_max_bytes)
+matrix_cache = MatrixCache(max_entries=settings.matrix_cache_size)
+
+
+def _get_matrix(payload: QRCodeRequest) -> ModuleMatrix:
+    error_correction = ERROR_CORRECTION_MAP[payload.error_correction]
+    key = (
+        payload.content,
+        error_correction,
+        payload.margin,
+        payload.version,
+        payload.mask_pattern,
     )
+    with stage("matrix"):
+        matrix = matrix_cache.get(key)
+        if matrix is None:
+            matrix = encode_matrix(
+                payload.content,
+                error_correction,
+                payload.margin,
+                payload.version,
+                payload.mask_pattern,
+            )
+            matrix_cache.put(key, matrix)
+    return matrix
+
+
+def check_capacity(payload: QRCodeRequest) -> None:
+    """Reject content that overflows a pinned version before fetching or rendering anything"""
+    if payload.version is not None:
+        qr_encoder.check_capacity(
+            payload.content, ERROR_CORRECTION_MAP[payload.error_correction], payload.version
+        )
 
 
 def _hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
@@ -69,40 +127,21 @@ def _hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
     return tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
 
 
-from pathlib import Path
-
-def _get_logo_image(url: str) -> Image.Image | None:
-    try:
-        # Check if it's a local upload (simple check based on URL structure)
-        # Assumes running from project root where 'uploads' dir exists
-        if "/uploads/" in url:
-            filename = url.split("/uploads/")[-1]
-            local_path = Path("uploads") / filename
-            if local_path.exists():
-                return Image.open(local_path)
-        
-        # Fallback to HTTP fetch for external URLs with retry
-        retries = 2
-        for attempt in range(retries + 1):
-            try:
-                response = httpx.get(url, timeout=10.0) # Increased timeout
-                response.raise_for_status()
-                return Image.open(BytesIO(response.content))
-            except (httpx.RequestError, httpx.HTTPStatusError):
-                if attempt == retries:
-                    raise
-                import time
-                time.sleep(0.5 * (attempt + 1)) # Backoff
-                
-    except Exception as e:
-        print(f"Failed to load logo: {e}")
-        return None
+def logo_size(payload: QRCodeRequest) -> int:
+    """Pixel size the logo is pasted at: 20% of the width of the image it lands on"""
+    if settings.render_engine == "numpy":
+        return int(payload.size * 0.2)
+    matrix = _get_matrix(payload)
+    return int((matrix.modules_count + 2 * matrix.border) * 10 * 0.2)
 
 
-def _render_pil(payload: QRCodeRequest) -> Image.Image:
-    qr = _build_qr(payload)
-    qr.add_data(payload.content)
-    qr.make(fit=True)
+def _render_pil(
+    payload: QRCodeRequest,
+    logo: Image.Image | None = None,
+    matrix: ModuleMatrix | None = None,
+) -> Image.Image:
+    if matrix is None:
+        matrix = _get_matrix(payload)
 
     # If default styles and no logo, use standard generation for speed
     if (
@@ -110,16 +149,39 @@ def _render_pil(payload: QRCodeRequest) -> Image.Image:
         and payload.eye_style == "square"
         and not payload.logo_url
     ):
+        if settings.render_engine == "numpy":
+            return render_square(
+                matrix,
+                payload.size,
+                _hex_to_rgb(payload.color),
+                _hex_to_rgb(payload.background),
+                antialias=settings.raster_antialias,
+            )
+
+        qr = matrix.to_qr(box_size=10)
         pil_img = qr.make_image(
             image_factory=PilImage,
             fill_color=payload.color,
             back_color=payload.background,
         ).get_image()
-        return pil_img.resize((payload.size, payload.size), Image.LANCZOS)
+        with stage("resize"):
+            return pil_img.resize((payload.size, payload.size), Image.LANCZOS)
 
     # Advanced styling
-    module_drawer = MODULE_DRAWERS.get(payload.body_style, SquareModuleDrawer())
-    eye_drawer = EYE_DRAWERS.get(payload.eye_style, SquareModuleDrawer())
+    if settings.render_engine == "numpy":
+        return render_styled(
+            matrix,
+            payload.size,
+            payload.body_style,
+            payload.eye_style,
+            _hex_to_rgb(payload.color),
+            _hex_to_rgb(payload.background),
+            logo=logo if payload.logo_url else None,
+        )
+
+    qr = matrix.to_qr(box_size=10)
+    module_drawer = _get_drawer("module", payload.body_style)
+    eye_drawer = _get_drawer("eye", payload.eye_style)
     
     rgb_front = _hex_to_rgb(payload.color)
     rgb_back = _hex_to_rgb(payload.background)
@@ -138,155 +200,253 @@ def _render_pil(payload: QRCodeRequest) -> Image.Image:
     
     pil_img = img.get_image() if hasattr(img, "get_image") else img
 
-    # Handle Logo
-    if payload.logo_url:
-        logo = _get_logo_image(payload.logo_url)
-        if logo:
-            # Resize logo to 20% of QR code size
-            qr_width, qr_height = pil_img.size
-            logo_size = int(qr_width * 0.2)
+    # Handle Logo (already resized to logo_size() by the logo cache)
+    if payload.logo_url and logo:
+        qr_width, qr_height = pil_img.size
+        logo_size = int(qr_width * 0.2)
+        if logo.size != (logo_size, logo_size):
             logo = logo.resize((logo_size, logo_size), Image.LANCZOS)
-            
-            # Calculate position
-            pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
-            
-            # Paste with mask if RGBA
-            mask = logo if logo.mode == "RGBA" else None
-            pil_img.paste(logo, pos, mask=mask)
 
-    return pil_img.resize((payload.size, payload.size), Image.LANCZOS)
+        # Calculate position
+        pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
+
+        # Paste with mask if RGBA
+        mask = logo if logo.mode == "RGBA" else None
+        pil_img.paste(logo, pos, mask=mask)
+
+    with stage("resize"):
+        return pil_img.resize((payload.size, payload.size), Image.LANCZOS)
+
+
+def _save_webp(image: Image.Image, buffer: BytesIO, composite: bool) -> None:
+    """
+    Codes alone are flat colors that lossless WebP packs tightly; logo and
+    sticker composites are photographic enough for the lossy mode to pay off
+    """
+    if composite:
+        image.save(
+            buffer,
+            format="WEBP",
+            quality=settings.webp_quality,
+            method=settings.webp_method,
+        )
+    else:
+        image.save(buffer, format="WEBP", lossless=True, method=settings.webp_method)
 
 
 def _composite_with_sticker(qr_img: Image.Image, sticker_type: str) -> Image.Image:
-    """Composite QR code with a ScanMe sticker frame - QR overlays on sticker"""
-    try:
-        from pathlib import Path
-        from cairosvg import svg2png
-        
-        # Path to sticker SVG
-        # Backend runs in 'windsurf' dir, so we need to go up one level to reach 'frontend'
-        sticker_path = Path("../frontend/public/stickers") / f"{sticker_type}.svg"
-        if not sticker_path.exists():
-            return qr_img  # Return original if sticker not found
-        
-        # Read SVG
-        svg_data = sticker_path.read_text(encoding="utf-8")
-        
-        # Sticker dimensions based on QR size
-        # Sticker should be larger to frame the QR code
-        sticker_scale = 1.4  # 40% larger than QR
-        sticker_width = int(qr_img.width * sticker_scale)
-        sticker_height = int(qr_img.width * sticker_scale * 1.15)  # Slightly taller for frames
-        
-        # Convert SVG to PNG
-        png_bytes = svg2png(
-            bytestring=svg_data.encode('utf-8'),
-            output_width=sticker_width,
-            output_height=sticker_height
+    """
+    Composite QR code with a ScanMe sticker frame - QR overlays on sticker.
+    An unknown sticker leaves the bare code (see `sticker_missing`); a frame
+    that fails to draw raises, so no stand-in is ever cached under its key.
+    """
+    composed = sticker_frames.composite(qr_img, sticker_type)
+    return composed if composed is not None else qr_img
+
+
+def warm_up() -> None:
+    """Preload encoder tables, drawer stamps and sticker frames in a fresh process"""
+    encode_matrix("warm-up", ERROR_CORRECT_M, 4)
+    if settings.qr_encoder == "numpy":
+        qr_encoder.warm_up()
+
+    for style in MODULE_DRAWERS:
+        _get_drawer("module", style)
+    for style in EYE_DRAWERS:
+        _get_drawer("eye", style)
+
+    # Stamp boxes used by the default 300px size with a 4-module margin
+    default_size = QRCodeRequest.model_fields["size"].default
+    for version in range(1, 11):
+        modules = version * 4 + 17 + 8
+        box = -(-default_size // modules)
+        for drawer in MODULE_DRAWERS:
+            stamp_set(drawer, box)
+
+    sticker_frames.load()
+
+
+def sticker_missing(payload: QRCodeRequest) -> bool:
+    """The request names a sticker that is not available: it renders without its frame"""
+    return bool(payload.sticker_type) and payload.sticker_type not in sticker_frames.available()
+
+
+def cache_key(payload: QRCodeRequest) -> str | None:
+    """Render cache key, or None when the request must not be cached"""
+    # Logos come from mutable external sources, so only self-contained
+    # requests are served from the render cache. A frameless stand-in for a
+    # missing sticker is not cached either.
+    if payload.logo_url or sticker_missing(payload):
+        return None
+    return render_key(payload)
+
+
+# Bump when a renderer change alters the bytes produced for an unchanged
+# request, so clients holding an old ETag fetch the new output
+RENDER_REVISION = 1
+
+
+def _output_fingerprint() -> str:
+    """Settings that change the bytes rendered for a given request"""
+    return "|".join(
+        str(value)
+        for value in (
+            RENDER_REVISION,
+            settings.render_engine,
+            settings.raster_antialias,
+            settings.png_compression_level,
+            settings.png_filter,
+            settings.webp_quality,
+            settings.webp_method,
+            sticker_frames.fingerprint(),
         )
-        
-        sticker_img = Image.open(BytesIO(png_bytes)).convert("RGBA")
-        
-        # Create canvas with sticker size
-        canvas = Image.new("RGB", (sticker_width, sticker_height), (255, 255, 255))
-        
-        # Paste sticker as background
-        canvas.paste(sticker_img, (0, 0), sticker_img if sticker_img.mode == "RGBA" else None)
-        
-        # Calculate position to center QR code on sticker
-        # Position depends on sticker type - adjust for each frame design
-        qr_positions = {
-            "grid": (int(sticker_width * 0.08), int(sticker_height * 0.17)),  # Below top banner
-            "bubble": (int(sticker_width * 0.08), int(sticker_height * 0.17)),  # Below bubble top
-            "film": (int(sticker_width * 0.08), int(sticker_height * 0.20)),  # Below clapperboard
-            "book": (int(sticker_width * 0.55), int(sticker_height * 0.17)),  # Right page
-            "beer": (int(sticker_width * 0.33), int(sticker_height * 0.44)),  # Center of cup
-        }
-        
-        qr_pos = qr_positions.get(sticker_type, (int((sticker_width - qr_img.width) / 2), int((sticker_height - qr_img.height) / 2)))
-        
-        # Paste QR code on top of sticker
-        if qr_img.mode == "RGBA":
-            canvas.paste(qr_img, qr_pos, qr_img)
-        else:
-            # Convert to RGBA if needed
-            qr_rgba = qr_img.convert("RGBA")
-            canvas.paste(qr_rgba, qr_pos, qr_rgba)
-        
-        return canvas
-        
-    except Exception as e:
-        print(f"Error compositing sticker: {e}")
-        import traceback
-        traceback.print_exc()
-        return qr_img  # Return original on error
+    )
+
+
+def output_key(key: str) -> str:
+    """Digest of a render key and the output settings: names the bytes themselves"""
+    return hashlib.sha256(f"{key}|{_output_fingerprint()}".encode("ascii")).hexdigest()
+
+
+def render_etag(payload: QRCodeRequest) -> str | None:
+    """
+    Strong ETag derived from the normalized request, or None when the output
+    also depends on a remote logo and can only be validated by its bytes, or
+    stands in for a missing sticker.
+    """
+    key = cache_key(payload)
+    if key is None:
+        return None
+    return f'"{output_key(key)[:32]}"'
+
+
+def content_etag(payload_bytes: bytes) -> str:
+    return f'"{hashlib.sha256(payload_bytes).hexdigest()[:32]}"'
 
 
+def cached_on_disk(key: str) -> CachedRender | None:
+    """Disk cache lookup (blocking I/O), promoting hits into memory"""
+    # Disk entries outlive deploys, so they are keyed by output settings too
+    cached = disk_cache.get(output_key(key))
+    if cached is not None:
+        render_cache.put(key, cached.data, cached.content_type)
+    return cached
+
+
+def cached_render(key: str) -> CachedRender | None:
+    """Memory first, then the disk cache"""
+    cached = render_cache.get(key)
+    if cached is None and disk_cache.enabled:
+        cached = cached_on_disk(key)
+    return cached
+
+
+def store_on_disk(key: str, payload_bytes: bytes, content_type: str) -> None:
+    disk_cache.put(output_key(key), payload_bytes, content_type)
+
 
 def generate_qr(payload: QRCodeRequest) -> tuple[str, bytes, str]:
     request_id = str(uuid4())
-    
-    # SVG Handling
+
+    key = cache_key(payload)
+    if key is not None:
+        with stage("cache"):
+            cached = cached_render(key)
+        if cached is not None:
+            return request_id, cached.data, cached.content_type
+
+    logo = None
+    if payload.logo_url:
+        with stage("logo"):
+            logo = logo_cache.get_blocking(payload.logo_url, logo_size(payload))
+    payload_bytes, content_type = render_qr(payload, logo)
+    if key is not None:
+        with stage("cache"):
+            render_cache.put(key, payload_bytes, content_type)
+            store_on_disk(key, payload_bytes, content_type)
+    return request_id, payload_bytes, content_type
+
+
+def render_qr(
+    payload: QRCodeRequest, logo: Image.Image | None = None
+) -> tuple[bytes, str]:
+    """
+    Run the full render pipeline, bypassing the render cache. The logo is
+    never fetched here: callers resolve `payload.logo_url` through the logo
+    cache at `logo_size(payload)`.
+    """
+    # Resolved up front so encoding is timed apart from drawing
+    matrix = _get_matrix(payload)
+
+    # SVG written straight from the module matrix
     if payload.format == QRCodeFormat.svg:
-        from qrcode.image.svg import SvgPathImage
-        
-        qr = _build_qr(payload)
-        qr.add_data(payload.content)
-        qr.make(fit=True)
-        
-        # SvgPathImage creates a single path for the QR code
-        # It handles colors via fill_color and back_color arguments
-        svg_img = qr.make_image(
-            image_factory=SvgPathImage,
-            fill_color=payload.color,
-            back_color=payload.background,
-        )
-        
-        svg_content = svg_img.to_string()
-        if isinstance(svg_content, bytes):
-            svg_content = svg_content.decode("utf-8")
-            
-        # Inject width and height to enforce requested size
-        # SvgPathImage usually produces <svg ... width="Xmm" height="Ymm" ...>
-        # We want to force pixels for web display consistency
-        import re
-        
-        # Replace existing width/height with requested pixel size
-        # Note: We use regex to safely replace existing attributes
-        if 'width="' in svg_content:
-            svg_content = re.sub(r'width="[^"]*"', f'width="{payload.size}px"', svg_content)
-        else:
-            svg_content = svg_content.replace('<svg', f'<svg width="{payload.size}px"', 1)
-            
-        if 'height="' in svg_content:
-            svg_content = re.sub(r'height="[^"]*"', f'height="{payload.size}px"', svg_content)
-        else:
-            svg_content = svg_content.replace('<svg', f'<svg height="{payload.size}px"', 1)
-            
-        # Ensure viewBox is preserved (it usually is)
-        
-        svg_bytes = svg_content.encode("utf-8")
-            
-        return request_id, svg_bytes, CONTENT_TYPES[payload.format]
+        with stage("render"):
+            svg_bytes = write_svg(
+                matrix,
+                payload.size,
+                payload.color,
+                payload.background,
+                payload.body_style,
+                payload.eye_style,
+                logo=logo if payload.logo_url else None,
+            )
+        return svg_bytes, CONTENT_TYPES[payload.format]
+
+    # Vector PDF straight from the module matrix; stickers are raster artwork
+    # so those still go through the PIL composition below
+    if payload.format == QRCodeFormat.pdf and not payload.sticker_type:
+        with stage("render"):
+            pdf_bytes = write_pdf(
+                matrix,
+                payload.size,
+                payload.body_style,
+                payload.eye_style,
+                _hex_to_rgb(payload.color),
+                _hex_to_rgb(payload.background),
+                logo=logo if payload.logo_url else None,
+            )
+        return pdf_bytes, CONTENT_TYPES[payload.format]
 
-    # PIL Generation (PNG, JPEG, PDF)
-    pil_image = _render_pil(payload)
+    # Plain two-color PNG encoded straight from the module matrix
+    if (
+        payload.format == QRCodeFormat.png
+        and payload.body_style == "square"
+        and payload.eye_style == "square"
+        and not payload.logo_url
+        and not payload.sticker_type
+        and settings.render_engine == "numpy"
+    ):
+        with stage("render"):
+            png_bytes = write_png(
+                matrix,
+                payload.size,
+                _hex_to_rgb(payload.color),
+                _hex_to_rgb(payload.background),
+                antialias=settings.raster_antialias,
+                compression_level=settings.png_compression_level,
+                filter_strategy=settings.png_filter,
+            )
+        return png_bytes, CONTENT_TYPES[payload.format]
+
+    # PIL Generation (PNG, JPEG, WebP, sticker PDF)
+    with stage("render"):
+        pil_image = _render_pil(payload, logo, matrix)
     
     # Add sticker if requested
     if payload.sticker_type:
-        pil_image = _composite_with_sticker(pil_image, payload.sticker_type)
+        with stage("sticker"):
+            pil_image = _composite_with_sticker(pil_image, payload.sticker_type)
     
+    with stage("encode"):
+        return _encode_pil(payload, pil_image)
+
+
+def _encode_pil(payload: QRCodeRequest, pil_image: Image.Image) -> tuple[bytes, str]:
+    """Save the composed image in the requested raster format"""
     buffer = BytesIO()
     
     if payload.format == QRCodeFormat.pdf:
-        # For PDF, we prefer vector if possible, but since we are using PIL for composition/styling
-        # (especially with stickers), we will save the high-res image as PDF.
-        # To ensure high quality, we might want to upscale if it's small, but _render_pil 
-        # already respects 'size' payload.
-        
-        # If no sticker and simple style, we COULD use vector PDF via cairosvg on the SVG output,
-        # but for consistency and sticker support, we'll use PIL's PDF save.
-        # It embeds the raster image in PDF.
+        # Sticker compositions are raster images, embedded as-is in the PDF
         if pil_image.mode == "RGBA":
             # PDF doesn't support RGBA, convert to RGB with white background
             bg = Image.new("RGB", pil_image.size, (255, 255, 255))
@@ -295,14 +455,16 @@ def generate_qr(payload: QRCodeRequest) -> tuple[str, bytes, str]:
         else:
             pil_image.convert("RGB").save(buffer, format="PDF", resolution=300)
             
-        return request_id, buffer.getvalue(), CONTENT_TYPES[payload.format]
+        return buffer.getvalue(), CONTENT_TYPES[payload.format]
         
     else:
-        # PNG / JPEG
+        # PNG / JPEG / WebP
         output_format = payload.format.value.upper()
         if output_format == "JPEG":
              pil_image.convert("RGB").save(buffer, format=output_format, quality=95)
+        elif output_format == "WEBP":
+             _save_webp(pil_image, buffer, composite=bool(payload.logo_url or payload.sticker_type))
         else:
              pil_image.save(buffer, format=output_format)
              
-    return request_id, buffer.getvalue(), CONTENT_TYPES[payload.format]
+    return buffer.getvalue(), CONTENT_TYPES[payload.format]
@@ -0,0 +1,84 @@
+import numpy as np
+from PIL import Image
+
+from src.services.matrix_cache import ModuleMatrix
+
+
+def padded_grid(matrix: ModuleMatrix) -> np.ndarray:
+    """Module matrix with its quiet zone, as a boolean array"""
+    return np.pad(matrix.to_array(), matrix.border, constant_values=False)
+
+
+def row_runs(mask: np.ndarray) -> np.ndarray:
+    """
+    (runs x 3) array of (row, start, end) for every horizontal run of set
+    cells, end exclusive, in reading order.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return np.stack([rows, starts, ends], axis=1)
+
+
+def _coverage_weights(size: int, modules: int) -> np.ndarray:
+    """
+    (size x modules) matrix whose entry [i, m] is the fraction of output
+    pixel i covered by module m along one axis. Interior pixels of a module
+    get a single weight of 1; only pixels straddling a module edge are split.
+    """
+    scale = modules / size
+    starts = np.arange(size, dtype=np.float64) * scale
+    ends = starts + scale
+    edges = np.arange(modules + 1, dtype=np.float64)
+    overlap = np.minimum(ends[:, None], edges[None, 1:]) - np.maximum(
+        starts[:, None], edges[None, :-1]
+    )
+    return (np.clip(overlap, 0.0, None) / scale).astype(np.float32)
+
+
+def grid_coverage(grid: np.ndarray, size: int, antialias: bool = True) -> np.ndarray:
+    """
+    Ink coverage of every output pixel, as a `size` x `size` array: booleans
+    when each pixel falls inside a single module, floats in [0, 1] when
+    antialiased pixels straddle module edges.
+    """
+    modules = grid.shape[0]
+    if antialias and size % modules:
+        weights = _coverage_weights(size, modules)
+        return weights @ grid.astype(np.float32) @ weights.T
+    index = ((np.arange(size) + 0.5) * modules / size).astype(np.intp)
+    # Widen the small module grid first, then repeat its rows
+    return grid.take(index, axis=1).take(index, axis=0)
+
+
+def rasterize(
+    grid: np.ndarray,
+    size: int,
+    fill: tuple[int, int, int],
+    back: tuple[int, int, int],
+    antialias: bool = True,
+) -> Image.Image:
+    """
+    Map a boolean module grid straight onto a `size` x `size` RGB image.
+
+    Without antialiasing every pixel takes the module under its centre (same
+    sampling as a NEAREST resize); with antialiasing, pixels on fractional
+    module edges are blended by their exact area coverage.
+    """
+    coverage = grid_coverage(grid, size, antialias=antialias).astype(np.float32)
+    fill_rgb = np.asarray(fill, dtype=np.float32)
+    back_rgb = np.asarray(back, dtype=np.float32)
+    pixels = back_rgb + coverage[..., None] * (fill_rgb - back_rgb)
+    return Image.fromarray(np.rint(pixels).astype(np.uint8))
+
+
+def render_square(
+    matrix: ModuleMatrix,
+    size: int,
+    fill: tuple[int, int, int],
+    back: tuple[int, int, int],
+    antialias: bool = True,
+) -> Image.Image:
+    return rasterize(padded_grid(matrix), size, fill, back, antialias=antialias)
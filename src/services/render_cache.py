@@ -0,0 +1,163 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.core.metrics import cache_eviction, cache_lookup
+from src.schemas.qrcode import QRCodeRequest
+
+
+@dataclass(frozen=True)
+class CachedRender:
+    data: bytes
+    content_type: str
+
+
+def render_key(payload: QRCodeRequest) -> str:
+    """Canonical hash of a normalized QR request (defaults filled, colors case-folded)"""
+    normalized = payload.model_dump(mode="json")
+    normalized["color"] = normalized["color"].lower()
+    normalized["background"] = normalized["background"].lower()
+    canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FrequencySketch:
+    """
+    Count-min sketch with 4-bit saturating counters used as the TinyLFU
+    admission filter. Counters are halved every `sample_size` increments so
+    that the popularity estimate follows recent traffic.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int = 4096, sample_size: Optional[int] = None):
+        self.width = max(16, 1 << (width - 1).bit_length())
+        self.mask = self.width - 1
+        self.sample_size = sample_size or self.width * 10
+        self.table = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self.additions = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return [
+            int.from_bytes(digest[i * 4 : i * 4 + 4], "little") & self.mask
+            for i in range(self.DEPTH)
+        ]
+
+    def increment(self, key: str) -> None:
+        changed = False
+        for row, index in zip(self.table, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+                changed = True
+        if changed:
+            self.additions += 1
+            if self.additions >= self.sample_size:
+                self._reset()
+
+    def frequency(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.table, self._indexes(key)))
+
+    def _reset(self) -> None:
+        for row in self.table:
+            for i in range(self.width):
+                row[i] >>= 1
+        self.additions //= 2
+
+
+class RenderCache:
+    """
+    In-process cache of encoded QR outputs.
+
+    Entries are bounded by their total size in bytes and evicted in LRU order.
+    When the cache is full, a candidate is only admitted if the frequency
+    sketch estimates it to be more popular than the entries it would evict,
+    so one-off requests cannot flush the hot set.
+    """
+
+    def __init__(self, max_bytes: int, sketch_width: int = 4096):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, CachedRender]" = OrderedDict()
+        self._sketch = FrequencySketch(width=sketch_width)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[CachedRender]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                cache_lookup("render", hit=False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cache_lookup("render", hit=True)
+            return entry
+
+    def put(self, key: str, data: bytes, content_type: str) -> bool:
+        """Store an output; returns False if admission was refused"""
+        size = len(data)
+        if not self.enabled or size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True
+
+            needed = self.current_bytes + size - self.max_bytes
+            if needed > 0:
+                victims = []
+                freed = 0
+                for victim_key, victim in self._entries.items():
+                    if freed >= needed:
+                        break
+                    victims.append(victim_key)
+                    freed += len(victim.data)
+                candidate_freq = self._sketch.frequency(key)
+                if any(
+                    self._sketch.frequency(victim_key) >= candidate_freq
+                    for victim_key in victims
+                ):
+                    self.rejections += 1
+                    return False
+                for victim_key in victims:
+                    victim = self._entries.pop(victim_key)
+                    self.current_bytes -= len(victim.data)
+                    self.evictions += 1
+                    cache_eviction("render")
+
+            self._entries[key] = CachedRender(data=data, content_type=content_type)
+            self.current_bytes += size
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "rejections": self.rejections,
+            }
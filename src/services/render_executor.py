@@ -0,0 +1,245 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, Optional, Set
+from uuid import uuid4
+
+from PIL import Image
+
+from src.core.config import settings
+from src.core.metrics import RENDER_LATENCY, RENDERS_IN_FLIGHT
+from src.core.profiler import profile_call
+from src.core.timing import add_stages, is_recording, record_stages, stage
+from src.schemas.qrcode import QRCodeRequest
+from src.services import qrcode_service
+from src.services.logo_cache import logo_cache
+
+
+# Renders waiting to be written to the disk cache; further ones are not stored
+DISK_WRITE_BACKLOG = 64
+
+
+def _init_worker() -> None:
+    """Process pool initializer: pay import and asset costs before the first request"""
+    qrcode_service.warm_up()
+
+
+def _ping() -> None:
+    pass
+
+
+def _style_label(style: str, drawers: Dict[str, object]) -> str:
+    """Styles are free-form strings: only known ones become metric labels"""
+    return style if style in drawers else "other"
+
+
+def _render_timed(
+    payload: QRCodeRequest, logo: Optional[Image.Image], timed: bool
+) -> tuple[bytes, str, Optional[Dict[str, float]]]:
+    """render_qr in a pool worker, with its stages when the caller records them"""
+    with record_stages(timed) as timings:
+        payload_bytes, content_type = qrcode_service.render_qr(payload, logo)
+    return payload_bytes, content_type, timings
+
+
+def _render_to_shared_memory(
+    payload: QRCodeRequest, logo: Optional[Image.Image], timed: bool
+) -> tuple[str, int, str, Optional[Dict[str, float]]]:
+    """
+    Render in a pool worker and hand the output back through a shared memory
+    segment, so only its name crosses the process boundary. The parent is
+    responsible for unlinking it.
+    """
+    payload_bytes, content_type, timings = _render_timed(payload, logo, timed)
+    segment = SharedMemory(create=True, size=len(payload_bytes))
+    try:
+        segment.buf[: len(payload_bytes)] = payload_bytes
+        return segment.name, len(payload_bytes), content_type, timings
+    finally:
+        segment.close()
+
+
+def _read_shared_memory(name: str, length: int) -> bytes:
+    segment = SharedMemory(name=name)
+    try:
+        return bytes(segment.buf[:length])
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def _discard_shared_memory(future: Future) -> None:
+    """Done-callback for renders nobody awaits any more: unlink their segment"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    name = future.result()[0]
+    try:
+        segment = SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+class RenderExecutor:
+    """
+    Runs `render_qr` off the event loop.
+
+    `mode` is "process" (a warm process pool, results returned through shared
+    memory), "thread" (a thread pool in this process; Pillow releases the GIL
+    while resizing and encoding) or "inline" (render on the event loop). The
+    render cache is consulted in the calling process so hits never leave it.
+    """
+
+    def __init__(self, mode: str = "process", workers: int = 0):
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[Executor] = None
+        self._disk_writer: Optional[ThreadPoolExecutor] = None
+        self._disk_writes: Set[Future] = set()
+
+    def start(self) -> None:
+        if self.mode == "process" and self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # Workers are spawned on demand; one task each brings them all up
+            for _ in range(self.workers):
+                self._pool.submit(_ping)
+        elif self.mode == "thread" and self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="qr-render",
+                initializer=qrcode_service.warm_up,
+            )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._disk_writer is not None:
+            # Pending disk writes are finished, not dropped
+            self._disk_writer.shutdown(wait=True)
+            self._disk_writer = None
+
+    def _store_on_disk(self, key: str, payload_bytes: bytes, content_type: str) -> None:
+        """Write a render to the disk cache in the background, if the backlog allows"""
+        if len(self._disk_writes) >= DISK_WRITE_BACKLOG:
+            return
+        if self._disk_writer is None:
+            # One writer: index updates are serialized by SQLite anyway
+            self._disk_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="qr-disk-cache"
+            )
+        future = self._disk_writer.submit(
+            qrcode_service.store_on_disk, key, payload_bytes, content_type
+        )
+        self._disk_writes.add(future)
+        future.add_done_callback(self._disk_writes.discard)
+
+    async def _render_uncached(self, payload: QRCodeRequest) -> tuple[bytes, str]:
+        qrcode_service.check_capacity(payload)
+        logo = None
+        if payload.logo_url:
+            with stage("logo"):
+                logo = await logo_cache.get(
+                    payload.logo_url, qrcode_service.logo_size(payload)
+                )
+
+        if self.mode == "inline":
+            return qrcode_service.render_qr(payload, logo)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        # Pool workers do not share our context: they time their own stages
+        # and the rest of the round trip is reported as dispatch
+        timed = is_recording()
+        start = time.perf_counter()
+        if self.mode == "thread":
+            payload_bytes, content_type, timings = await loop.run_in_executor(
+                self._pool, _render_timed, payload, logo, timed
+            )
+        else:
+            future = self._pool.submit(_render_to_shared_memory, payload, logo, timed)
+            try:
+                name, length, content_type, timings = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # The worker may still create a segment that we will never read
+                future.add_done_callback(_discard_shared_memory)
+                raise
+            except BrokenProcessPool:
+                # A crashed worker poisons the whole pool; start a fresh one next time
+                self._pool = None
+                raise
+            payload_bytes = _read_shared_memory(name, length)
+        if timings is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            add_stages({**timings, "dispatch": max(0.0, elapsed - sum(timings.values()))})
+        return payload_bytes, content_type
+
+    async def render(self, payload: QRCodeRequest) -> tuple[str, bytes, str]:
+        request_id = str(uuid4())
+
+        key = qrcode_service.cache_key(payload)
+        if key is not None:
+            with stage("cache"):
+                cached = qrcode_service.render_cache.get(key)
+                if cached is None and qrcode_service.disk_cache.enabled:
+                    # SQLite and file reads can block: keep them off the loop
+                    cached = await asyncio.to_thread(qrcode_service.cached_on_disk, key)
+            if cached is not None:
+                return request_id, cached.data, cached.content_type
+
+        start = time.perf_counter()
+        with RENDERS_IN_FLIGHT.track_inprogress():
+            payload_bytes, content_type = await self._render_uncached(payload)
+        RENDER_LATENCY.labels(
+            payload.format.value,
+            _style_label(payload.body_style, qrcode_service.MODULE_DRAWERS),
+            _style_label(payload.eye_style, qrcode_service.EYE_DRAWERS),
+        ).observe(time.perf_counter() - start)
+        if key is not None:
+            with stage("cache"):
+                qrcode_service.render_cache.put(key, payload_bytes, content_type)
+            if qrcode_service.disk_cache.enabled:
+                # The response does not wait for the disk
+                self._store_on_disk(key, payload_bytes, content_type)
+        return request_id, payload_bytes, content_type
+
+    async def render_profiled(self, payload: QRCodeRequest) -> tuple[str, bytes, str, Path]:
+        """
+        Render once, bypassing the render cache, in a thread that is sampled
+        on its own, and return the path of its profile with the output. Runs
+        in this process whatever the mode, since pool workers cannot be
+        sampled from here.
+        """
+        request_id = str(uuid4())
+        qrcode_service.check_capacity(payload)
+
+        def render() -> tuple[bytes, str]:
+            logo = None
+            if payload.logo_url:
+                with stage("logo"):
+                    logo = logo_cache.get_blocking(
+                        payload.logo_url, qrcode_service.logo_size(payload)
+                    )
+            return qrcode_service.render_qr(payload, logo)
+
+        # to_thread copies our context, so stages are still recorded
+        (payload_bytes, content_type), path = await asyncio.to_thread(
+            profile_call, render, name=f"request-{request_id}"
+        )
+        return request_id, payload_bytes, content_type, path
+
+
+render_executor = RenderExecutor(
+    mode=settings.render_executor,
+    workers=settings.render_workers,
+)
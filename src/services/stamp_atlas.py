@@ -0,0 +1,169 @@
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from src.core.timing import stage
+from src.services.matrix_cache import ModuleMatrix
+from src.services.raster import padded_grid
+
+# Stamps are drawn this many times larger and box-filtered down, like the
+# ANTIALIASING_FACTOR used by qrcode's StyledPil drawers
+SUPERSAMPLE = 4
+
+# Which neighbours change the shape of a module, per drawer. The context code
+# of a module is the bitfield of its active neighbours in this order.
+DRAWER_NEIGHBOURS = {
+    "square": "",
+    "gapped": "",
+    "circle": "",
+    "rounded": "NESW",
+    "vertical": "NS",
+    "horizontal": "WE",
+}
+
+
+def _draw_stamp(drawer: str, context: int, big: int) -> Image.Image:
+    """Coverage mask (255 = ink) of one module drawn at supersampled size"""
+    neighbours = {
+        side: bool(context >> bit & 1)
+        for bit, side in enumerate(DRAWER_NEIGHBOURS[drawer])
+    }
+    half = big // 2
+    last = big - 1
+    img = Image.new("L", (big, big), 0)
+    draw = ImageDraw.Draw(img)
+
+    if drawer == "gapped":
+        delta = round(big * 0.1)
+        draw.rectangle((delta, delta, last - delta, last - delta), fill=255)
+    elif drawer == "circle":
+        draw.ellipse((0, 0, last, last), fill=255)
+    elif drawer == "rounded":
+        # A corner is rounded when both neighbours touching it are inactive
+        draw.ellipse((0, 0, last, last), fill=255)
+        corners = {
+            (0, 0): ("N", "W"),
+            (half, 0): ("N", "E"),
+            (half, half): ("S", "E"),
+            (0, half): ("S", "W"),
+        }
+        for (x, y), sides in corners.items():
+            if any(neighbours[side] for side in sides):
+                draw.rectangle((x, y, x + half - 1, y + half - 1), fill=255)
+    elif drawer == "vertical":
+        inset = round(big * 0.1)
+        draw.ellipse((inset, 0, last - inset, last), fill=255)
+        if neighbours["N"]:
+            draw.rectangle((inset, 0, last - inset, half - 1), fill=255)
+        if neighbours["S"]:
+            draw.rectangle((inset, half, last - inset, last), fill=255)
+    elif drawer == "horizontal":
+        inset = round(big * 0.1)
+        draw.ellipse((0, inset, last, last - inset), fill=255)
+        if neighbours["W"]:
+            draw.rectangle((0, inset, half - 1, last - inset), fill=255)
+        if neighbours["E"]:
+            draw.rectangle((half, inset, last, last - inset), fill=255)
+    else:
+        draw.rectangle((0, 0, last, last), fill=255)
+    return img
+
+
+@lru_cache(maxsize=256)
+def stamp_set(drawer: str, box: int) -> np.ndarray:
+    """
+    Antialiased stamps for every neighbour context of a drawer, as a
+    read-only (contexts x box x box) uint8 coverage array.
+    """
+    if drawer not in DRAWER_NEIGHBOURS:
+        drawer = "square"
+    big = box * SUPERSAMPLE
+    stamps = np.stack(
+        [
+            np.asarray(_draw_stamp(drawer, context, big).reduce(SUPERSAMPLE))
+            for context in range(1 << len(DRAWER_NEIGHBOURS[drawer]))
+        ]
+    )
+    stamps.flags.writeable = False
+    return stamps
+
+
+def _context_codes(grid: np.ndarray, drawer: str) -> np.ndarray:
+    padded = np.pad(grid, 1, constant_values=False)
+    neighbours = {
+        "N": padded[:-2, 1:-1],
+        "S": padded[2:, 1:-1],
+        "W": padded[1:-1, :-2],
+        "E": padded[1:-1, 2:],
+    }
+    codes = np.zeros(grid.shape, dtype=np.intp)
+    for bit, side in enumerate(DRAWER_NEIGHBOURS.get(drawer, "")):
+        codes |= neighbours[side].astype(np.intp) << bit
+    return codes
+
+
+def _eye_mask(matrix: ModuleMatrix) -> np.ndarray:
+    count = matrix.modules_count
+    eyes = np.zeros((count, count), dtype=bool)
+    eyes[:7, :7] = True
+    eyes[:7, count - 7 :] = True
+    eyes[count - 7 :, :7] = True
+    return np.pad(eyes, matrix.border, constant_values=False)
+
+
+def render_styled(
+    matrix: ModuleMatrix,
+    size: int,
+    body_style: str,
+    eye_style: str,
+    fill: tuple[int, int, int],
+    back: tuple[int, int, int],
+    logo: Optional[Image.Image] = None,
+) -> Image.Image:
+    """
+    Composite the symbol from pre-rendered stamps, one per (drawer,
+    neighbour context, box size), and colorize it at the requested size.
+
+    Every module picks its stamp from a single lookup table (blank, body
+    stamps, eye stamps) and the tiles are laid out with one reshape.
+    """
+    grid = padded_grid(matrix)
+    modules = grid.shape[0]
+    box = max(1, -(-size // modules))
+
+    body = stamp_set(body_style, box)
+    eye = stamp_set(eye_style, box)
+    blank = np.zeros((1, box, box), dtype=np.uint8)
+    table = np.concatenate([blank, body, eye])
+
+    index = np.where(
+        _eye_mask(matrix),
+        1 + len(body) + _context_codes(grid, eye_style),
+        1 + _context_codes(grid, body_style),
+    )
+    index = np.where(grid, index, 0)
+
+    canvas = (
+        table[index].transpose(0, 2, 1, 3).reshape(modules * box, modules * box)
+    )
+    mask = Image.fromarray(canvas)
+    if mask.width != size:
+        with stage("resize"):
+            mask = mask.resize((size, size), Image.LANCZOS)
+
+    img = Image.composite(
+        Image.new("RGB", (size, size), fill),
+        Image.new("RGB", (size, size), back),
+        mask,
+    )
+
+    if logo is not None:
+        logo_size = int(size * 0.2)
+        if logo.size != (logo_size, logo_size):
+            logo = logo.resize((logo_size, logo_size), Image.LANCZOS)
+        pos = ((size - logo_size) // 2, (size - logo_size) // 2)
+        img.paste(logo, pos, mask=logo if logo.mode == "RGBA" else None)
+
+    return img
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from src.core.config import settings
+from src.core.metrics import cache_eviction, cache_lookup
+from src.core.timing import stage
+
+try:
+    from cairosvg.parser import Tree
+    from cairosvg.surface import PNGSurface
+except (ImportError, OSError):  # cairosvg missing or libcairo not installed
+    Tree = PNGSurface = None
+
+LAYOUTS_FILE = "layouts.json"
+
+# cairo stores ARGB32 as native-endian words of premultiplied alpha
+_CAIRO_RAW_MODE = "BGRa" if sys.byteorder == "little" else "aRGB"
+
+
+@dataclass(frozen=True)
+class StickerLayout:
+    """
+    Where the code sits on a sticker frame. The frame is `scale` times the
+    code's width and `aspect` times taller than wide; the code's top-left
+    corner is at (`qr_x`, `qr_y`) as fractions of the frame. A frame without
+    a position centers the code.
+    """
+
+    qr_x: Optional[float] = None
+    qr_y: Optional[float] = None
+    scale: float = 1.4  # 40% larger than QR
+    aspect: float = 1.15  # Slightly taller for frames
+
+    def frame_size(self, qr_width: int) -> Tuple[int, int]:
+        return int(qr_width * self.scale), int(qr_width * self.scale * self.aspect)
+
+    def qr_position(self, frame: Tuple[int, int], qr: Tuple[int, int]) -> Tuple[int, int]:
+        width, height = frame
+        if self.qr_x is None or self.qr_y is None:
+            return int((width - qr[0]) / 2), int((height - qr[1]) / 2)
+        return int(width * self.qr_x), int(height * self.qr_y)
+
+
+STICKER_LAYOUTS: Dict[str, StickerLayout] = {
+    "grid": StickerLayout(qr_x=0.08, qr_y=0.17),  # Below top banner
+    "bubble": StickerLayout(qr_x=0.08, qr_y=0.17),  # Below bubble top
+    "film": StickerLayout(qr_x=0.08, qr_y=0.20),  # Below clapperboard
+    "book": StickerLayout(qr_x=0.55, qr_y=0.17),  # Right page
+    "beer": StickerLayout(qr_x=0.33, qr_y=0.44),  # Center of cup
+}
+
+
+@dataclass
+class _Sticker:
+    tree: object
+    layout: StickerLayout
+    # cairosvg annotates the tree while drawing, so one rasterization at a time
+    lock: threading.Lock
+
+
+class StickerFrames:
+    """
+    Sticker frames parsed once from the sticker directory, and an LRU of their
+    rasterizations keyed by (sticker, width, height).
+
+    Rasterized frames are stored already flattened onto the white canvas, so
+    a request only copies one and pastes the code on top. Layouts come from
+    `STICKER_LAYOUTS`, overridden by an optional layouts.json next to the SVGs.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._stickers: Dict[str, _Sticker] = {}
+        self._frames: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._fingerprint = ""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_layouts(self) -> Dict[str, StickerLayout]:
+        layouts = dict(STICKER_LAYOUTS)
+        path = self.directory / LAYOUTS_FILE
+        if not path.is_file():
+            return layouts
+        try:
+            overrides = json.loads(path.read_text(encoding="utf-8"))
+            for name, fields in overrides.items():
+                layouts[name] = replace(layouts.get(name, StickerLayout()), **fields)
+        except (ValueError, TypeError) as e:
+            print(f"Invalid sticker layouts in {path}: {e}")
+        return layouts
+
+    def load(self) -> None:
+        """Parse every sticker SVG once; safe to call repeatedly"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if Tree is None or not self.directory.is_dir():
+                return
+            layouts = self._load_layouts()
+            digest = hashlib.sha256()
+            for path in sorted(self.directory.glob("*.svg")):
+                try:
+                    data = path.read_bytes()
+                    tree = Tree(bytestring=data)
+                except Exception as e:
+                    print(f"Failed to parse sticker {path.name}: {e}")
+                    continue
+                layout = layouts.get(path.stem, StickerLayout())
+                self._stickers[path.stem] = _Sticker(
+                    tree=tree, layout=layout, lock=threading.Lock()
+                )
+                digest.update(f"{path.stem}:{layout}:".encode("utf-8"))
+                digest.update(hashlib.sha256(data).digest())
+            if self._stickers:
+                self._fingerprint = digest.hexdigest()[:16]
+
+    def available(self) -> Tuple[str, ...]:
+        self.load()
+        return tuple(self._stickers)
+
+    def fingerprint(self) -> str:
+        """Digest of the loaded frames and layouts; empty when there are none"""
+        self.load()
+        return self._fingerprint
+
+    def _rasterize(self, sticker: _Sticker, width: int, height: int) -> Image.Image:
+        """Frame drawn at (width, height) and flattened onto white"""
+        with sticker.lock:
+            surface = PNGSurface(
+                sticker.tree, None, 96, output_width=width, output_height=height
+            )
+            surface.cairo.flush()
+            rgba = Image.frombuffer(
+                "RGBa",
+                (surface.width, surface.height),
+                bytes(surface.cairo.get_data()),
+                "raw",
+                _CAIRO_RAW_MODE,
+                surface.cairo.get_stride(),
+                1,
+            ).convert("RGBA")
+            # Only the pixels are needed: finish the cairo surface itself,
+            # not the PNG writer around it
+            surface.cairo.finish()
+        if rgba.size != (width, height):
+            rgba = rgba.resize((width, height), Image.LANCZOS)
+        canvas = Image.new("RGB", (width, height), (255, 255, 255))
+        canvas.paste(rgba, (0, 0), rgba)
+        return canvas
+
+    def _frame(self, name: str, sticker: _Sticker, size: Tuple[int, int]) -> Image.Image:
+        key = (name, *size)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                cache_lookup("sticker", hit=True)
+                return frame
+            self.misses += 1
+            cache_lookup("sticker", hit=False)
+
+        with stage("sticker_raster"):
+            frame = self._rasterize(sticker, *size)
+        nbytes = frame.width * frame.height * 3
+        if nbytes > self.max_bytes:
+            return frame
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = frame
+                self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self.current_bytes -= evicted.width * evicted.height * 3
+                self.evictions += 1
+                cache_eviction("sticker")
+        return frame
+
+    def composite(self, qr_img: Image.Image, sticker_type: str) -> Optional[Image.Image]:
+        """QR code laid over its sticker frame, or None if the sticker is unknown"""
+        self.load()
+        sticker = self._stickers.get(sticker_type)
+        if sticker is None:
+            return None
+
+        layout = sticker.layout
+        size = layout.frame_size(qr_img.width)
+        canvas = self._frame(sticker_type, sticker, size).copy()
+        qr_rgba = qr_img if qr_img.mode == "RGBA" else qr_img.convert("RGBA")
+        canvas.paste(qr_rgba, layout.qr_position(size, qr_img.size), qr_rgba)
+        return canvas
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "stickers": len(self._stickers),
+                "entries": len(self._frames),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+sticker_frames = StickerFrames(
+    directory=Path(settings.sticker_dir),
+    max_bytes=settings.sticker_cache_max_bytes,
+)
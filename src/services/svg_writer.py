@@ -0,0 +1,161 @@
+import base64
+from functools import lru_cache
+from io import BytesIO
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.services.matrix_cache import ModuleMatrix
+from src.services.raster import padded_grid
+from src.services.stamp_atlas import _eye_mask
+from src.services.vector_shapes import Outline, shape_groups
+
+# Subpaths start on whole modules plus a fixed offset of tenths, so moves
+# between them are short exact decimals
+MOVE = "m%.6g %.6g"
+
+
+def _num(value: float) -> str:
+    text = f"{value:.4g}"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+
+@lru_cache(maxsize=1024)
+def _relative(shape: Outline) -> Tuple[Tuple[float, float], str]:
+    """
+    Start point of an outline and the rest of its path in relative commands,
+    which are the same wherever the shape is placed. Corner curves are exact
+    elliptical arcs in SVG; two consecutive quarter arcs become one half arc.
+    """
+    _, *start = shape.segments[0]
+    x, y = start
+    commands: List[list] = []
+    for op, *values in shape.segments[1:]:
+        if op == "Z":
+            commands.append(["z"])
+            continue
+        dx, dy = values[-2] - x, values[-1] - y
+        x, y = values[-2:]
+        if op == "C":
+            radii = (abs(dx), abs(dy))
+            previous = commands[-1] if commands else None
+            if previous and previous[0] == "a" and previous[1] == radii and not previous[4]:
+                previous[2] += dx
+                previous[3] += dy
+                previous[4] = True
+            else:
+                commands.append(["a", radii, dx, dy, False])
+        elif dy == 0:
+            commands.append(["h", dx])
+        elif dx == 0:
+            commands.append(["v", dy])
+        else:
+            commands.append(["l", dx, dy])
+
+    path = []
+    for command in commands:
+        op = command[0]
+        if op == "a":
+            (rx, ry), dx, dy, _ = command[1:]
+            # Clockwise on screen, the direction outlines are traced in
+            path.append(f"a{_num(rx)} {_num(ry)} 0 0 1 {_num(dx)} {_num(dy)}")
+        else:
+            path.append(op + " ".join(_num(value) for value in command[1:]))
+    return (start[0], start[1]), "".join(path)
+
+
+def _path_data(groups: List[dict]) -> Iterator[str]:
+    """
+    Path data of every placed outline. Each subpath starts with a move
+    relative to the previous subpath's start, where "z" leaves the current
+    point, so one shape is one constant string plus its move.
+    """
+    placements = []
+    for shapes in groups:
+        for shape, origins in shapes.items():
+            start, commands = _relative(shape)
+            placements.append((commands, origins + start))
+    if not placements:
+        return
+
+    starts = np.concatenate([points for _, points in placements])
+    moves = np.diff(starts, axis=0, prepend=[[0, 0]])
+    offset = 0
+    for commands, points in placements:
+        chunk = moves[offset : offset + len(points)]
+        offset += len(points)
+        # The first move of a path is absolute even when written as "m"
+        yield ((MOVE + commands) * len(chunk)) % tuple(chunk.ravel().tolist())
+
+
+def _logo_data_uri(logo: Image.Image) -> str:
+    buffer = BytesIO()
+    logo.save(buffer, format="PNG", optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def iter_svg(
+    matrix: ModuleMatrix,
+    size: int,
+    fill: str,
+    back: str,
+    body_style: str = "square",
+    eye_style: str = "square",
+    logo: Optional[Image.Image] = None,
+) -> Iterator[str]:
+    """SVG document of the symbol in chunks, drawn in module units"""
+    grid = padded_grid(matrix)
+    modules = grid.shape[0]
+    eyes = _eye_mask(matrix)
+
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {modules} {modules}">'
+    )
+    yield f'<rect width="{modules}" height="{modules}" fill="{back}"/>'
+    yield f'<path fill="{fill}" d="'
+    yield from _path_data(
+        [
+            shape_groups(grid, grid & ~eyes, body_style),
+            shape_groups(grid, grid & eyes, eye_style),
+        ],
+    )
+    yield '"/>'
+    if logo is not None:
+        # Same placement as the raster renderers: 20% of the width, centered
+        logo_px = int(size * 0.2)
+        scale = modules / size
+        position = (size - logo_px) // 2 * scale
+        yield (
+            f'<image x="{position:.6g}" y="{position:.6g}" '
+            f'width="{logo_px * scale:.6g}" height="{logo_px * scale:.6g}" '
+            f'href="{_logo_data_uri(logo)}"/>'
+        )
+    yield "</svg>"
+
+
+def write_svg(
+    matrix: ModuleMatrix,
+    size: int,
+    fill: str,
+    back: str,
+    body_style: str = "square",
+    eye_style: str = "square",
+    logo: Optional[Image.Image] = None,
+) -> bytes:
+    """
+    SVG of the symbol at `size` x `size` pixels, written straight from the
+    module matrix without any bitmap. Square modules merge into one rectangle
+    per horizontal run and bars into one shape per run; other styles repeat
+    one relative subpath per neighbour context. Everything is a single path,
+    so touching shapes render without seams. The logo, if any, is embedded
+    once as a PNG data URI.
+    """
+    return "".join(
+        iter_svg(matrix, size, fill, back, body_style, eye_style, logo)
+    ).encode("ascii")
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.services.raster import row_runs
+from src.services.stamp_atlas import DRAWER_NEIGHBOURS, _context_codes
+
+# Control point distance of a quarter-ellipse drawn as one cubic Bézier
+KAPPA = 0.5522847498
+
+# Inset of the gapped / bar drawers, as a fraction of a module
+INSET = 0.1
+
+# Styles whose runs of modules merge into single shapes; the others are drawn
+# module by module from one outline per neighbour context
+MERGED_STYLES = ("square", "vertical", "horizontal")
+
+Box = Tuple[float, float, float, float]
+Corners = Tuple[bool, bool, bool, bool]
+
+
+@dataclass(frozen=True)
+class Outline:
+    """
+    Closed shape in module units, drawn from a local origin.
+
+    `segments` are ("M", x, y), ("L", x, y), ("C", x1, y1, x2, y2, x, y) and
+    ("Z",) in absolute local coordinates; `box` and `rounded` keep the
+    rectangle they were derived from so writers can special-case plain boxes.
+    """
+
+    box: Box
+    rounded: Corners
+    segments: Tuple[tuple, ...]
+
+    @property
+    def is_rectangle(self) -> bool:
+        return not any(self.rounded)
+
+
+@lru_cache(maxsize=1024)
+def outline(box: Box, rounded: Corners, radii: Tuple[float, float]) -> Outline:
+    """
+    Path around `box` whose NE, SE, SW, NW corners are either square or
+    quarter-ellipse arcs of the given radii. All four corners rounded on a
+    square box is a circle, which covers every drawer shape.
+    """
+    x0, y0, x1, y1 = box
+    rx, ry = radii
+    kx, ky = rx * KAPPA, ry * KAPPA
+    start = (x0 + rx, y0) if any(rounded) else (x0, y0)
+    # Per corner: where its straight edge ends, its curve, and its square point
+    corners = [
+        ((x1 - rx, y0), (x1 - rx + kx, y0, x1, y0 + ry - ky, x1, y0 + ry), (x1, y0)),
+        ((x1, y1 - ry), (x1, y1 - ry + ky, x1 - rx + kx, y1, x1 - rx, y1), (x1, y1)),
+        ((x0 + rx, y1), (x0 + rx - kx, y1, x0, y1 - ry + ky, x0, y1 - ry), (x0, y1)),
+        ((x0, y0 + ry), (x0, y0 + ry - ky, x0 + rx - kx, y0, x0 + rx, y0), (x0, y0)),
+    ]
+
+    segments = [("M", *start)]
+    current = start
+    for is_rounded, (edge, curve, square) in zip(rounded, corners):
+        if not is_rounded:
+            if square != start:
+                segments.append(("L", *square))
+            current = square
+            continue
+        if edge != current:
+            segments.append(("L", *edge))
+        segments.append(("C", *curve))
+        current = curve[-2:]
+    segments.append(("Z",))
+    return Outline(box=box, rounded=rounded, segments=tuple(segments))
+
+
+def module_outline(style: str, context: int) -> Outline:
+    """One module at the origin, for a neighbour context of a per-module style"""
+    if style == "gapped":
+        return outline((INSET, INSET, 1 - INSET, 1 - INSET), (False,) * 4, (0, 0))
+    if style == "rounded":
+        # A corner is rounded when both neighbours touching it are inactive
+        n, e, s, w = (bool(context >> bit & 1) for bit in range(4))
+        corners = (not (n or e), not (s or e), not (s or w), not (n or w))
+        return outline((0, 0, 1, 1), corners, (0.5, 0.5))
+    if style == "circle":
+        return outline((0, 0, 1, 1), (True,) * 4, (0.5, 0.5))
+    return outline((0, 0, 1, 1), (False,) * 4, (0, 0))
+
+
+def _run_ends(mask: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    (runs x 5) array of (row, start, end, head, tail) for the horizontal runs
+    of `mask`, where head / tail tell whether the run's ends are free, i.e.
+    not continued by another dark module of `grid`
+    """
+    runs = row_runs(mask)
+    rows, starts, ends = runs.T
+    padded = np.pad(grid, ((0, 0), (1, 1)), constant_values=False)
+    head = ~padded[rows, starts]
+    tail = ~padded[rows, ends + 1]
+    return np.column_stack([runs, head, tail]).astype(np.int64)
+
+
+def _group_runs(runs: np.ndarray, make_outline, transpose: bool) -> Dict[Outline, list]:
+    """Group runs by (length, head, tail), the only things their outline depends on"""
+    groups: Dict[Outline, list] = {}
+    if not len(runs):
+        return groups
+    rows, starts, ends, head, tail = runs.T
+    keys = (ends - starts) << 2 | head << 1 | tail
+    order = np.argsort(keys, kind="stable")
+    unique, first = np.unique(keys[order], return_index=True)
+    origins = np.stack([rows, starts] if transpose else [starts, rows], axis=1)[order]
+    for key, chunk in zip(unique.tolist(), np.split(origins, first[1:])):
+        shape = make_outline(key >> 2, bool(key >> 1 & 1), bool(key & 1))
+        groups.setdefault(shape, []).append(chunk)
+    return groups
+
+
+def shape_groups(grid: np.ndarray, mask: np.ndarray, style: str) -> Dict[Outline, np.ndarray]:
+    """
+    Shapes covering the modules of `mask` drawn with `style`, as a mapping
+    from each distinct outline to the (n x 2) module origins (x, y) it is
+    placed at. Square modules merge into one rectangle per horizontal run and
+    bars into one shape per run; other styles get one shape per module.
+    Unknown styles are drawn square, as in raster renders.
+    """
+    if style not in DRAWER_NEIGHBOURS:
+        style = "square"
+    if style == "vertical":
+        # Columns of modules merge into one bar rounded at both free ends
+        groups = _group_runs(
+            _run_ends(mask.T, grid.T),
+            lambda length, head, tail: outline(
+                (INSET, 0, 1 - INSET, length), (head, tail, tail, head), (0.5 - INSET, 0.5)
+            ),
+            transpose=True,
+        )
+    elif style == "horizontal":
+        groups = _group_runs(
+            _run_ends(mask, grid),
+            lambda length, head, tail: outline(
+                (0, INSET, length, 1 - INSET), (tail, tail, head, head), (0.5, 0.5 - INSET)
+            ),
+            transpose=False,
+        )
+    elif style in MERGED_STYLES:
+        groups = _group_runs(
+            _run_ends(mask, grid),
+            lambda length, head, tail: outline((0, 0, length, 1), (False,) * 4, (0, 0)),
+            transpose=False,
+        )
+    else:
+        groups = {}
+        codes = _context_codes(grid, style)
+        ys, xs = np.nonzero(mask)
+        contexts = codes[ys, xs]
+        for context in np.unique(contexts).tolist():
+            # Several contexts can share an outline (e.g. every fully joined one)
+            chosen = contexts == context
+            origins = np.stack([xs[chosen], ys[chosen]], axis=1)
+            groups.setdefault(module_outline(style, context), []).append(origins)
+    return {
+        shape: np.concatenate(chunks).astype(np.int64, copy=False)
+        for shape, chunks in groups.items()
+    }
@@ -0,0 +1,85 @@
+import pytest
+from httpx import AsyncClient
+
+from src.core import profiler as profiler_module
+from src.core.config import settings
+from src.core.security import create_access_token
+from src.main import app
+from src.services.render_executor import render_executor
+
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    monkeypatch.setattr(settings, "admin_users", "developer")
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'developer'})}"}
+
+
+@pytest.fixture
+def profiler(monkeypatch, tmp_path):
+    instance = profiler_module.SamplingProfiler(200, tmp_path)
+    monkeypatch.setattr("src.api.endpoints.admin.profiler", instance)
+    monkeypatch.setattr(settings, "profiler_dir", str(tmp_path))
+    yield instance
+    instance.stop()
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_require_an_admin(monkeypatch, profiler):
+    monkeypatch.setattr(settings, "admin_users", "")
+    token = create_access_token({"sub": "developer"})
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        anonymous = await client.get("/api/v1/admin/profiler")
+        user = await client.get(
+            "/api/v1/admin/profiler", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert anonymous.status_code == 403  # HTTPBearer without credentials
+    assert user.status_code == 403
+    assert not profiler.running
+
+
+@pytest.mark.asyncio
+async def test_profiler_start_stop_and_download(admin_headers, profiler):
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        started = await client.post("/api/v1/admin/profiler/start", headers=admin_headers)
+        again = await client.post("/api/v1/admin/profiler/start", headers=admin_headers)
+        await client.post(
+            "/api/v1/qrcode/generate", json={"content": "https://windsurf.dev/profile"}
+        )
+        stopped = await client.post("/api/v1/admin/profiler/stop", headers=admin_headers)
+        name = stopped.json()["file"]
+        profile = await client.get(f"/api/v1/admin/profiler/profiles/{name}", headers=admin_headers)
+        missing = await client.get(
+            "/api/v1/admin/profiler/profiles/..%2Fdatabase.db", headers=admin_headers
+        )
+
+    assert started.status_code == 200 and started.json()["running"]
+    assert again.status_code == 409
+    assert stopped.status_code == 200 and not stopped.json()["running"]
+    assert name.endswith(".collapsed")
+    assert profile.status_code == 200
+    assert profile.text == (profiler.directory / name).read_text()
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_generate_profiles_a_single_request(admin_headers, profiler, monkeypatch):
+    monkeypatch.setattr(render_executor, "mode", "process")
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post(
+            "/api/v1/qrcode/generate",
+            json={"content": "https://windsurf.dev/one", "format": "jpeg", "size": 1000},
+            headers={**admin_headers, "X-QRCode-Profile": "1"},
+        )
+        ignored = await client.post(
+            "/api/v1/qrcode/generate",
+            json={"content": "https://windsurf.dev/one", "format": "jpeg", "size": 1000},
+            headers={"X-QRCode-Profile": "1"},
+        )
+
+    assert response.status_code == 200
+    name = response.headers["x-qrcode-profile"]
+    assert name == f"request-{response.headers['x-qrcode-request-id']}.collapsed"
+    assert "render_qr (qrcode_service.py:" in (profiler.directory / name).read_text()
+    assert "render" in response.headers["server-timing"]
+    assert "x-qrcode-profile" not in ignored.headers
@@ -0,0 +1,80 @@
+import io
+import json
+import zipfile
+
+import pytest
+from httpx import AsyncClient
+
+from src.main import app
+from src.schemas.qrcode import QRCodeRequest
+from src.services import qrcode_service
+from src.services.batch_service import stream_batch_zip
+from src.services.render_executor import RenderExecutor, render_executor
+
+
+@pytest.fixture
+def inline_renders(monkeypatch):
+    monkeypatch.setattr(render_executor, "mode", "inline")
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_streams_zip_with_manifest(inline_renders):
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post(
+            "/api/v1/qrcode/batch",
+            json={
+                "style": {"format": "svg", "body_style": "circle"},
+                "contents": ["sku-1", "sku-2", "sku-1"],
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["total"] == 3
+    assert manifest["rendered"] == 2
+    assert [item["file"] for item in manifest["items"]] == ["00001.svg", "00002.svg", "00003.svg"]
+    assert manifest["items"][2]["duplicate_of"] == 0
+    assert archive.read("00001.svg") == archive.read("00003.svg")
+    assert archive.read("00001.svg").startswith(b"<")
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_empty_request():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post("/api/v1/qrcode/batch", json={"contents": []})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_item_failures_in_manifest(monkeypatch):
+    render_qr = qrcode_service.render_qr
+
+    def flaky_render(payload: QRCodeRequest, logo=None):
+        if payload.content == "broken":
+            raise RuntimeError("boom")
+        return render_qr(payload, logo)
+
+    monkeypatch.setattr(qrcode_service, "render_qr", flaky_render)
+    qrcode_service.render_cache.clear()
+    payloads = [QRCodeRequest(content=content) for content in ("ok", "broken", "ok-2")]
+
+    data = await _collect(stream_batch_zip(payloads, RenderExecutor(mode="inline"), concurrency=2))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["failed"] == 1
+    assert manifest["items"][1] == {
+        "index": 1,
+        "content": "broken",
+        "format": "png",
+        "status": "error",
+        "error": "boom",
+    }
+    assert sorted(archive.namelist()) == ["00001.png", "00003.png", "manifest.json"]
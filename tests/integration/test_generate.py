@@ -0,0 +1,95 @@
+import pytest
+from httpx import AsyncClient
+
+from src.main import app
+from src.services import qrcode_service
+
+
+@pytest.mark.asyncio
+async def test_pinned_version_renders_with_requested_mask():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post(
+            "/api/v1/qrcode/generate",
+            json={"content": "SKU-000417", "format": "svg", "version": 2, "mask_pattern": 3},
+        )
+
+    assert response.status_code == 200
+    assert b'viewBox="0 0 33 33"' in response.content
+
+
+@pytest.mark.asyncio
+async def test_content_overflowing_pinned_version_fails_before_rendering(monkeypatch):
+    def unexpected_render(*args, **kwargs):
+        raise AssertionError("rendered")
+
+    monkeypatch.setattr(qrcode_service, "render_qr", unexpected_render)
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post(
+            "/api/v1/qrcode/generate",
+            json={"content": "https://windsurf.dev/" + "x" * 40, "version": 1},
+        )
+
+    assert response.status_code == 422
+    assert "version 1" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_get_render_is_cacheable_and_revalidates(monkeypatch):
+    params = {"content": "https://windsurf.dev/mail", "color": "1a2b3c", "body_style": "circle"}
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        first = await client.get("/api/v1/qrcode/png", params=params)
+        qrcode_service.render_cache.clear()
+        second = await client.get("/api/v1/qrcode/png", params=params)
+
+        monkeypatch.setattr(qrcode_service, "render_qr", None)  # must not render
+        revalidated = await client.get(
+            "/api/v1/qrcode/png",
+            params=params,
+            headers={"If-None-Match": f'"other", W/{first.headers["etag"]}'},
+        )
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/png"
+    assert first.headers["cache-control"].startswith("public, max-age=31536000")
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_missing_sticker_fallback_is_never_cached():
+    params = {"content": "x", "sticker_type": "nonexistent-frame"}
+    hits = qrcode_service.render_cache.stats()["hits"]
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        first = await client.get("/api/v1/qrcode/png", params=params)
+        second = await client.get("/api/v1/qrcode/png", params=params)
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-store"
+    assert "etag" not in first.headers
+    assert second.content == first.content
+    assert qrcode_service.render_cache.stats()["hits"] == hits
+
+
+@pytest.mark.asyncio
+async def test_get_render_etag_follows_normalized_request():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        lower = await client.get("/api/v1/qrcode/svg", params={"content": "a", "color": "#abcdef"})
+        upper = await client.get("/api/v1/qrcode/svg", params={"content": "a", "color": "ABCDEF"})
+        other = await client.get("/api/v1/qrcode/svg", params={"content": "a", "size": 400})
+
+    assert lower.headers["etag"] == upper.headers["etag"]
+    assert other.headers["etag"] != lower.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_get_render_rejects_invalid_query():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        bad_color = await client.get("/api/v1/qrcode/png", params={"content": "a", "color": "zz"})
+        bad_format = await client.get("/api/v1/qrcode/gif", params={"content": "a"})
+
+    assert bad_color.status_code == 422
+    assert bad_color.json()["detail"][0]["loc"] == ["query", "color"]
+    assert bad_format.status_code == 422
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from src.core import timing
+from src.main import app
+from src.services.qrcode_service import render_cache
+from src.services.render_executor import render_executor
+
+
+@pytest.fixture
+def inline_renders(monkeypatch):
+    monkeypatch.setattr(render_executor, "mode", "inline")
+
+
+@pytest.mark.asyncio
+async def test_generate_returns_server_timing_and_logs_span(inline_renders, monkeypatch, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(timing, "span_log", timing.SpanLog(str(path), sample_rate=1.0))
+    monkeypatch.setattr("src.api.endpoints.qrcode.span_log", timing.span_log)
+    render_cache.clear()
+
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post(
+            "/api/v1/qrcode/generate",
+            json={"content": "https://windsurf.dev/timing", "format": "jpeg"},
+        )
+    timing.span_log.close()
+
+    assert response.status_code == 200
+    metrics = [item.split(";")[0] for item in response.headers["server-timing"].split(", ")]
+    assert {"matrix", "render", "encode"} <= set(metrics)
+    assert metrics[-1] == "total"
+
+    span = json.loads(path.read_text())
+    assert span["request_id"] == response.headers["x-qrcode-request-id"]
+    assert span["format"] == "jpeg"
+    assert "render" in span["stages"]
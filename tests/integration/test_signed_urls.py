@@ -0,0 +1,81 @@
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.config import settings
+from src.core.security import create_access_token
+from src.main import app
+from src.services import qrcode_service
+
+
+@pytest.fixture
+def auth_headers():
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'developer'})}"}
+
+
+async def _sign(client: AsyncClient, headers: dict, **body) -> str:
+    response = await client.post("/api/v1/qrcode/sign", json=body, headers=headers)
+    assert response.status_code == 200
+    url = urlsplit(response.json()["url"])
+    return f"{url.path}?{url.query}"
+
+
+@pytest.mark.asyncio
+async def test_signed_url_renders_and_tampering_is_rejected(auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "render_require_signature", True)
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        path = await _sign(
+            client, auth_headers, content="https://windsurf.dev/mail", format="svg", color="#1A2B3C"
+        )
+        signed = await client.get(path)
+        query = parse_qs(urlsplit(path).query)
+        query["content"] = ["https://attacker.example"]
+        tampered = await client.get(f"/api/v1/qrcode/svg?{urlencode(query, doseq=True)}")
+
+        monkeypatch.setattr(qrcode_service, "render_qr", None)  # must not render
+        unsigned = await client.get("/api/v1/qrcode/svg", params={"content": "anything"})
+
+    assert path.startswith("/api/v1/qrcode/svg?")
+    assert "format" not in query and "size" not in query
+    assert signed.status_code == 200
+    assert signed.headers["cache-control"].endswith("immutable")
+    assert tampered.status_code == 403
+    assert tampered.json()["detail"] == "Signature invalide"
+    assert unsigned.status_code == 403
+    assert unsigned.json()["detail"] == "Signature requise"
+
+
+@pytest.mark.asyncio
+async def test_non_ascii_signature_is_rejected():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.get("/api/v1/qrcode/png", params={"content": "hi", "sig": "é"})
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Signature invalide"
+
+
+@pytest.mark.asyncio
+async def test_expiring_url_caps_max_age_and_expires(auth_headers, monkeypatch):
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        path = await _sign(client, auth_headers, content="short-lived", expires_in=60)
+        fresh = await client.get(path)
+
+        now = time.time()
+        monkeypatch.setattr("src.api.endpoints.qrcode.time.time", lambda: now + 120)
+        expired = await client.get(path)
+
+    assert fresh.status_code == 200
+    assert 0 < int(fresh.headers["cache-control"].split("max-age=")[1]) <= 60
+    assert "immutable" not in fresh.headers["cache-control"]
+    assert expired.status_code == 403
+    assert expired.json()["detail"] == "Lien expiré"
+
+
+@pytest.mark.asyncio
+async def test_signing_requires_authentication():
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        response = await client.post("/api/v1/qrcode/sign", json={"content": "x"})
+
+    assert response.status_code == 403
@@ -0,0 +1,205 @@
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+
+from src.schemas.qrcode import QRCodeRequest
+from src.services import disk_cache as disk_cache_module
+from src.services import qrcode_service
+from src.services import render_executor as render_executor_module
+from src.services.disk_cache import INDEX_NAME, SCHEMA, DiskRenderCache
+from src.services.render_cache import RenderCache, render_key
+from src.services.render_executor import RenderExecutor
+
+KEY = "ab" + "0" * 62
+
+
+def test_disabled_without_directory():
+    cache = DiskRenderCache("", 1024)
+
+    assert not cache.enabled
+    assert cache.get(KEY) is None
+    assert not cache.put(KEY, b"x", "image/png")
+    assert cache.stats() == {"enabled": False}
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 1024)
+
+    assert cache.get(KEY) is None
+    assert cache.put(KEY, b"png-bytes", "image/png")
+    entry = cache.get(KEY)
+
+    assert entry is not None
+    assert entry.data == b"png-bytes" and entry.content_type == "image/png"
+    assert (tmp_path / "ab" / "00" / KEY).read_bytes() == b"png-bytes"
+    assert not list(tmp_path.rglob(".tmp-*"))
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (1, 9, 1, 1)
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    DiskRenderCache(str(tmp_path), 1024).put(KEY, b"kept", "image/svg+xml")
+
+    entry = DiskRenderCache(str(tmp_path), 1024).get(KEY)
+
+    assert entry is not None and entry.data == b"kept"
+
+
+def test_replacing_an_entry_keeps_the_total(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 1024)
+    cache.put(KEY, b"x" * 10, "image/png")
+    cache.put(KEY, b"x" * 30, "image/png")
+
+    assert cache.stats()["bytes"] == 30
+    assert cache.get(KEY).data == b"x" * 30
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache_module, "TOUCH_INTERVAL", 0.0)
+    cache = DiskRenderCache(str(tmp_path), 100)
+    for name in ("a", "b"):
+        cache.put(name * 64, b"x" * 40, "image/png")
+    cache.get("a" * 64)
+    cache.put("c" * 64, b"x" * 40, "image/png")
+
+    stats = cache.stats()
+    assert stats["bytes"] == 80 and stats["evictions"] == 1
+    assert cache.get("b" * 64) is None
+    assert not (tmp_path / "bb" / "bb" / ("b" * 64)).exists()
+    assert cache.get("a" * 64) is not None
+    assert cache.get("c" * 64) is not None
+
+
+def test_oversized_outputs_are_not_stored(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 10)
+
+    assert not cache.put(KEY, b"x" * 11, "image/png")
+    assert cache.stats()["entries"] == 0
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 1024)
+    cache.put(KEY, b"gone", "image/png")
+    (tmp_path / "ab" / "00" / KEY).unlink()
+
+    assert cache.get(KEY) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"]) == (0, 0)
+
+
+def test_clear_removes_files(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 1024)
+    cache.put(KEY, b"x", "image/png")
+    cache.clear()
+
+    assert cache.get(KEY) is None
+    assert not (tmp_path / "ab" / "00" / KEY).exists()
+
+
+def test_index_errors_roll_back_and_are_counted(tmp_path):
+    cache = DiskRenderCache(str(tmp_path), 1024)
+    cache.put(KEY, b"x", "image/png")
+    (tmp_path / "ab" / "00" / KEY).unlink()
+    other = sqlite3.connect(tmp_path / INDEX_NAME)
+    other.execute("DROP TABLE totals")
+    other.commit()
+
+    # Forgetting the entry fails half-way through its transaction
+    assert cache.get(KEY) is None
+    stats = cache.stats()
+    assert stats["bytes"] is None and stats["errors"] == 2
+
+    other.executescript(SCHEMA)
+    other.close()
+    assert cache.put("cd" * 32, b"y", "image/png")
+    assert cache.get("cd" * 32).data == b"y"
+
+
+def _fill(directory: str, worker: int) -> None:
+    cache = DiskRenderCache(directory, 2000)
+    for index in range(40):
+        cache.put(f"{worker:02x}{index:062x}", b"x" * 100, "image/png")
+        cache.get(f"{(worker + 1) % 4:02x}{index:062x}")
+
+
+def test_workers_share_one_consistent_index(tmp_path):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork start method unavailable")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_fill, args=(str(tmp_path), worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    stats = DiskRenderCache(str(tmp_path), 2000).stats()
+    files = [path for path in tmp_path.rglob("*") if path.is_file() and path.parent != tmp_path]
+    assert stats["bytes"] == stats["entries"] * 100 <= 2000
+    assert len(files) == stats["entries"]
+
+
+def test_generate_qr_reads_through_the_disk_cache(tmp_path, monkeypatch):
+    disk = DiskRenderCache(str(tmp_path), 1 << 20)
+    monkeypatch.setattr(qrcode_service, "disk_cache", disk)
+    monkeypatch.setattr(qrcode_service, "render_cache", RenderCache(max_bytes=1 << 20))
+    payload = QRCodeRequest(content="disk tier", format="svg")
+
+    _, first, _ = qrcode_service.generate_qr(payload)
+    assert disk.stats()["entries"] == 1
+
+    # A fresh process: empty memory cache, same directory
+    monkeypatch.setattr(qrcode_service, "render_cache", RenderCache(max_bytes=1 << 20))
+    _, second, content_type = qrcode_service.generate_qr(payload)
+
+    assert second == first and content_type == "image/svg+xml"
+    assert disk.stats()["hits"] == 1
+    assert qrcode_service.render_cache.get(render_key(payload)) is not None
+
+
+@pytest.mark.asyncio
+async def test_executor_reads_the_disk_cache_off_the_event_loop(tmp_path, monkeypatch):
+    disk = DiskRenderCache(str(tmp_path), 1 << 20)
+    monkeypatch.setattr(qrcode_service, "disk_cache", disk)
+    monkeypatch.setattr(qrcode_service, "render_cache", RenderCache(max_bytes=1 << 20))
+    payload = QRCodeRequest(content="disk lookup", format="svg")
+    qrcode_service.store_on_disk(render_key(payload), b"<svg/>", "image/svg+xml")
+    threads = []
+    original = disk.get
+
+    def recorded(key):
+        threads.append(threading.get_ident())
+        return original(key)
+
+    monkeypatch.setattr(disk, "get", recorded)
+    _, payload_bytes, _ = await RenderExecutor(mode="inline").render(payload)
+
+    assert payload_bytes == b"<svg/>"
+    assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_background_writes_are_bounded_and_drained_on_shutdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(qrcode_service, "disk_cache", DiskRenderCache(str(tmp_path), 1 << 20))
+    monkeypatch.setattr(qrcode_service, "render_cache", RenderCache(max_bytes=1 << 20))
+    monkeypatch.setattr(render_executor_module, "DISK_WRITE_BACKLOG", 2)
+    release = threading.Event()
+    written = []
+
+    def slow_store(key, payload_bytes, content_type):
+        release.wait(5)
+        written.append(key)
+
+    monkeypatch.setattr(qrcode_service, "store_on_disk", slow_store)
+    executor = RenderExecutor(mode="inline")
+    for index in range(4):
+        await executor.render(QRCodeRequest(content=f"backlog {index}", format="svg"))
+
+    assert len(executor._disk_writes) == 2
+    release.set()
+    executor.shutdown()
+
+    assert len(written) == 2
+    assert not executor._disk_writes
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.services import logo_fetcher as logo_fetcher_module
+from src.services.logo_cache import LogoCache
+from src.services.logo_fetcher import RemoteLogo
+
+
+def _png(color) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _FakeFetcher:
+    """Origin serving one ETag-versioned logo and counting requests"""
+
+    def __init__(self):
+        self.data = _png((255, 0, 0))
+        self.etag = '"v1"'
+        self.requests = []
+
+    def fetch_blocking(self, url, etag=None, last_modified=None):
+        self.requests.append(etag)
+        if etag == self.etag:
+            return RemoteLogo(data=None, etag=etag, not_modified=True)
+        return RemoteLogo(data=self.data, etag=self.etag)
+
+    async def fetch(self, url, etag=None, last_modified=None):
+        return self.fetch_blocking(url, etag, last_modified)
+
+
+@pytest.mark.asyncio
+async def test_repeat_lookups_skip_io_and_decoding():
+    fetcher = _FakeFetcher()
+    cache = LogoCache(fetcher, max_bytes=1 << 20, ttl=60)
+
+    first = await cache.get("https://cdn.test/logo.png", 60)
+    second = await cache.get("https://cdn.test/logo.png", 60)
+
+    assert first is second
+    assert first.size == (60, 60) and first.mode == "RGBA"
+    assert fetcher.requests == [None]
+    assert cache.stats()["hits"] == 1
+
+
+def test_each_target_size_is_decoded_once_from_one_download():
+    fetcher = _FakeFetcher()
+    cache = LogoCache(fetcher, max_bytes=1 << 20, ttl=60)
+
+    small = cache.get_blocking("https://cdn.test/logo.png", 20)
+    large = cache.get_blocking("https://cdn.test/logo.png", 40)
+
+    assert (small.size, large.size) == ((20, 20), (40, 40))
+    assert len(fetcher.requests) == 1
+
+
+def test_expired_entries_are_revalidated_with_etag():
+    fetcher = _FakeFetcher()
+    cache = LogoCache(fetcher, max_bytes=1 << 20, ttl=0)
+
+    first = cache.get_blocking("https://cdn.test/logo.png", 60)
+    still_valid = cache.get_blocking("https://cdn.test/logo.png", 60)
+    fetcher.data, fetcher.etag = _png((0, 0, 255)), '"v2"'
+    changed = cache.get_blocking("https://cdn.test/logo.png", 60)
+
+    assert fetcher.requests == [None, '"v1"', '"v1"']
+    assert still_valid is first
+    assert changed.getpixel((30, 30)) == (0, 0, 255, 255)
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_uploads_are_invalidated_by_mtime(tmp_path, monkeypatch):
+    monkeypatch.setattr(logo_fetcher_module, "UPLOAD_DIR", tmp_path)
+    logo_path = tmp_path / "logo.png"
+    logo_path.write_bytes(_png((255, 0, 0)))
+    cache = LogoCache(_FakeFetcher(), max_bytes=1 << 20, ttl=60)
+    url = "http://testserver/uploads/logo.png"
+
+    first = cache.get_blocking(url, 30)
+    assert cache.get_blocking(url, 30) is first
+
+    logo_path.write_bytes(_png((0, 255, 0)))
+    later = time.time() + 5
+    os.utime(logo_path, (later, later))
+    updated = cache.get_blocking(url, 30)
+
+    assert updated.getpixel((15, 15)) == (0, 255, 0, 255)
+
+
+@pytest.mark.asyncio
+async def test_file_reads_and_decoding_stay_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(logo_fetcher_module, "UPLOAD_DIR", tmp_path)
+    (tmp_path / "logo.png").write_bytes(_png((255, 0, 0)))
+    cache = LogoCache(_FakeFetcher(), max_bytes=1 << 20, ttl=60)
+    threads = []
+    for name in ("_local_source", "_decode"):
+        original = getattr(cache, name)
+
+        def recorded(*args, original=original):
+            threads.append(threading.get_ident())
+            return original(*args)
+
+        monkeypatch.setattr(cache, name, recorded)
+
+    for url in ("http://testserver/uploads/logo.png", "https://cdn.test/logo.png"):
+        assert (await cache.get(url, 30)).size == (30, 30)
+
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads
+
+
+def test_cache_respects_byte_budget():
+    fetcher = _FakeFetcher()
+    cache = LogoCache(fetcher, max_bytes=len(fetcher.data) + 40 * 40 * 4, ttl=60)
+
+    cache.get_blocking("https://cdn.test/logo.png", 40)
+    cache.get_blocking("https://cdn.test/logo.png", 30)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["evictions"] >= 1
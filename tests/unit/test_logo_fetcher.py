@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from prometheus_client import REGISTRY
+
+from src.services import logo_fetcher as logo_fetcher_module
+from src.services.logo_fetcher import LogoFetcher
+
+
+def _png_bytes() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), (255, 0, 0)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+LOGO = _png_bytes()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    hits: dict = {}
+
+    def do_GET(self):
+        type(self).hits[self.path] = type(self).hits.get(self.path, 0) + 1
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path.startswith("/etag") and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(LOGO)))
+        self.end_headers()
+        if self.path.startswith("/trickle"):
+            # Every read is quick, the whole body is not
+            for start in range(0, len(LOGO), 8):
+                self.wfile.write(LOGO[start : start + 8])
+                self.wfile.flush()
+                time.sleep(0.05)
+            return
+        self.wfile.write(LOGO)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_share_one_download(stub_server):
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=1 << 20)
+    url = f"{stub_server}/slow/shared.png"
+
+    results = await asyncio.gather(*[fetcher.fetch(url) for _ in range(10)])
+    await fetcher.aclose()
+
+    assert [result.data for result in results] == [LOGO] * 10
+    assert _StubHandler.hits["/slow/shared.png"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_gives_up_at_the_deadline(stub_server):
+    fetcher = LogoFetcher(deadline=0.1, negative_ttl=60, max_bytes=1 << 20)
+    started = time.monotonic()
+
+    result = await fetcher.fetch(f"{stub_server}/slow/deadline.png")
+    await fetcher.aclose()
+
+    assert result is None
+    assert time.monotonic() - started < 0.3
+
+
+@pytest.mark.asyncio
+async def test_failing_urls_are_negatively_cached(stub_server):
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=1 << 20, retries=0)
+    url = f"{stub_server}/missing/logo.png"
+    skipped = REGISTRY.get_sample_value("qrcode_logo_fetches_total", {"outcome": "skipped"}) or 0
+
+    assert await fetcher.fetch(url) is None
+    assert await fetcher.fetch(url) is None
+    assert fetcher.fetch_blocking(url) is None
+    await fetcher.aclose()
+
+    assert _StubHandler.hits["/missing/logo.png"] == 1
+    assert REGISTRY.get_sample_value("qrcode_logo_fetches_total", {"outcome": "skipped"}) == skipped + 2
+
+
+def test_negative_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(logo_fetcher_module, "NEGATIVE_CACHE_SIZE", 3)
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=1 << 20)
+    for index in range(5):
+        fetcher._remember_failure(f"https://cdn.test/{index}.png")
+
+    assert list(fetcher._failures) == [f"https://cdn.test/{index}.png" for index in (2, 3, 4)]
+
+
+def test_expired_failures_are_dropped_when_recording_new_ones():
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=0, max_bytes=1 << 20)
+    for index in range(5):
+        fetcher._remember_failure(f"https://cdn.test/{index}.png")
+
+    assert len(fetcher._failures) <= 1
+
+
+@pytest.mark.asyncio
+async def test_oversized_logos_are_rejected(stub_server):
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=16)
+
+    assert await fetcher.fetch(f"{stub_server}/big.png") is None
+    await fetcher.aclose()
+
+
+def test_blocking_fetch_reads_remote_logo(stub_server):
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=1 << 20)
+
+    assert fetcher.fetch_blocking(f"{stub_server}/blocking.png").data == LOGO
+
+
+def test_blocking_fetch_enforces_size_and_overall_deadline(stub_server):
+    small = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=16)
+    assert small.fetch_blocking(f"{stub_server}/blocking-big.png") is None
+
+    fetcher = LogoFetcher(deadline=0.2, negative_ttl=60, max_bytes=1 << 20)
+    started = time.monotonic()
+
+    assert fetcher.fetch_blocking(f"{stub_server}/trickle/logo.png") is None
+    assert time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_conditional_fetch_reports_not_modified(stub_server):
+    fetcher = LogoFetcher(deadline=2.0, negative_ttl=60, max_bytes=1 << 20)
+    url = f"{stub_server}/etag/logo.png"
+
+    first = await fetcher.fetch(url)
+    second = await fetcher.fetch(url, etag=first.etag)
+    await fetcher.aclose()
+
+    assert first.etag == '"v1"' and first.data == LOGO
+    assert second.not_modified and second.data is None
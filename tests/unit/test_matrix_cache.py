@@ -0,0 +1,54 @@
+import qrcode
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_M
+
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.matrix_cache import MatrixCache, encode_matrix
+from src.services.qrcode_service import generate_qr, matrix_cache, render_cache
+
+
+def test_packed_matrix_round_trips_library_modules():
+    content = "https://windsurf.dev/" + "x" * 200
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECT_H, border=2)
+    qr.add_data(content)
+    qr.make(fit=True)
+
+    matrix = encode_matrix(content, ERROR_CORRECT_H, 2)
+
+    assert matrix.version == qr.version
+    assert matrix.to_modules() == qr.modules
+    assert len(matrix.bits) == (qr.modules_count**2 + 7) // 8
+
+
+def test_hydrated_qr_skips_encoding():
+    matrix = encode_matrix("hello", ERROR_CORRECT_M, 4)
+    qr = matrix.to_qr()
+
+    assert qr.get_matrix()[4][4:11] == [True] * 7
+    assert qr.modules_count == matrix.modules_count
+
+
+def test_matrix_cache_is_lru_bounded():
+    cache = MatrixCache(max_entries=2)
+    for content in ("a", "b", "c"):
+        cache.put((content, ERROR_CORRECT_M, 4), encode_matrix(content, ERROR_CORRECT_M, 4))
+
+    assert cache.get(("a", ERROR_CORRECT_M, 4)) is None
+    assert cache.get(("c", ERROR_CORRECT_M, 4)) is not None
+
+
+def test_matrix_shared_across_formats_and_styles():
+    render_cache.clear()
+    matrix_cache.clear()
+    base = QRCodeRequest(content="https://windsurf.dev/matrix")
+    before = matrix_cache.stats()
+    for update in (
+        {},
+        {"format": QRCodeFormat.svg},
+        {"format": QRCodeFormat.pdf},
+        {"body_style": "circle", "size": 500},
+    ):
+        generate_qr(base.model_copy(update=update))
+
+    stats = matrix_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 3
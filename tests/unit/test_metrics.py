@@ -0,0 +1,71 @@
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from src.core.metrics import observe_stages, render_metrics
+from src.main import app
+from src.services.render_cache import RenderCache
+from src.services.render_executor import render_executor
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_cache_lookups_are_counted_by_result():
+    cache = RenderCache(max_bytes=1024)
+    hits = _sample("qrcode_cache_lookups_total", cache="render", result="hit")
+    misses = _sample("qrcode_cache_lookups_total", cache="render", result="miss")
+
+    cache.get("absent")
+    cache.put("present", b"data", "image/png")
+    cache.get("present")
+
+    assert _sample("qrcode_cache_lookups_total", cache="render", result="miss") == misses + 1
+    assert _sample("qrcode_cache_lookups_total", cache="render", result="hit") == hits + 1
+
+
+def test_stages_are_observed_in_seconds():
+    before = _sample("qrcode_render_stage_duration_seconds_sum", stage="encode")
+
+    observe_stages({"encode": 250.0})
+
+    assert _sample("qrcode_render_stage_duration_seconds_sum", stage="encode") == pytest.approx(before + 0.25)
+
+
+def test_render_metrics_is_prometheus_text():
+    data, content_type = render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE qrcode_renders_in_flight gauge" in data
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_and_renders(monkeypatch):
+    monkeypatch.setattr(render_executor, "mode", "inline")
+    route = "/api/v1/qrcode/generate"
+    before = _sample("qrcode_http_requests_total", route=route, method="POST", status="200")
+
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        await client.post(route, json={"content": "https://windsurf.dev/metrics", "format": "svg"})
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert _sample("qrcode_http_requests_total", route=route, method="POST", status="200") == before + 1
+    assert 'qrcode_render_duration_seconds_bucket{body_style="square"' in response.text
+
+
+@pytest.mark.asyncio
+async def test_unknown_styles_share_one_render_series(monkeypatch):
+    monkeypatch.setattr(render_executor, "mode", "inline")
+
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        for index in range(3):
+            await client.post(
+                "/api/v1/qrcode/generate",
+                json={"content": f"https://windsurf.dev/{index}", "body_style": f"junk{index}"},
+            )
+        response = await client.get("/metrics")
+
+    assert 'body_style="other"' in response.text
+    assert "junk" not in response.text
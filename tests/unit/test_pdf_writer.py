@@ -0,0 +1,100 @@
+import io
+import re
+
+import numpy as np
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+from qrcode.constants import ERROR_CORRECT_M
+
+from src.services.matrix_cache import encode_matrix
+from src.services.pdf_writer import UNITS, write_pdf
+from src.services.raster import padded_grid, render_square
+from src.services.stamp_atlas import DRAWER_NEIGHBOURS
+
+CONTENT = "https://windsurf.dev/" + "v" * 60
+WHITE, BLACK = (255, 255, 255), (0, 0, 0)
+
+
+def _page(pdf: bytes):
+    return PdfReader(io.BytesIO(pdf)).pages[0]
+
+
+def _content(pdf: bytes) -> str:
+    return _page(pdf).get_contents().get_data().decode("ascii")
+
+
+def test_square_runs_cover_exactly_the_dark_modules():
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+    grid = padded_grid(matrix)
+
+    content = _content(write_pdf(matrix, 300, "square", "square", BLACK, WHITE))
+
+    covered = np.zeros_like(grid)
+    rects = re.findall(r"^(\d+) (\d+) (\d+) (\d+) re$", content, re.M)
+    for x, y, w, h in (map(int, rect) for rect in rects):
+        assert h == UNITS
+        row, start = y // UNITS, x // UNITS
+        assert not covered[row, start : start + w // UNITS].any()
+        covered[row, start : start + w // UNITS] = True
+    assert (covered == grid).all()
+    # One rectangle per horizontal run, not per module
+    assert len(rects) < grid.sum() * 0.6
+
+
+@pytest.mark.parametrize("body_style", sorted(DRAWER_NEIGHBOURS))
+@pytest.mark.parametrize("eye_style", ["square", "circle", "rounded"])
+def test_every_style_is_a_single_vector_fill(body_style: str, eye_style: str):
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+    grid = padded_grid(matrix)
+
+    pdf = write_pdf(matrix, 300, body_style, eye_style, BLACK, WHITE)
+    page = _page(pdf)
+    operators = _content(pdf).split()
+
+    assert [float(v) for v in page.mediabox] == [0, 0, 72, 72]
+    assert "/XObject" not in page["/Resources"]
+    assert operators.count("f") == 2  # background, then every module at once
+    shapes = operators.count("re") + operators.count("m") - 1
+    assert 0 < shapes <= grid.sum()
+
+
+def test_unknown_styles_are_drawn_square():
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+
+    unknown = write_pdf(matrix, 300, "sparkles", "sparkles", BLACK, WHITE)
+
+    assert unknown == write_pdf(matrix, 300, "square", "square", BLACK, WHITE)
+
+
+def test_page_size_follows_the_requested_size_only():
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+
+    small = write_pdf(matrix, 100, "circle", "square", BLACK, WHITE)
+    large = write_pdf(matrix, 1000, "circle", "square", BLACK, WHITE)
+
+    assert [float(v) for v in _page(large).mediabox] == [0, 0, 240, 240]
+    assert abs(len(small) - len(large)) < 16
+
+
+def test_logo_is_embedded_once_as_an_image():
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+    logo = Image.new("RGBA", (60, 60), (255, 0, 0, 128))
+
+    pdf = write_pdf(matrix, 300, "rounded", "circle", BLACK, WHITE, logo=logo)
+    page = _page(pdf)
+    image = page["/Resources"]["/XObject"]["/Logo"].get_object()
+
+    assert _content(pdf).count("/Logo Do") == 1
+    assert (image["/Width"], image["/Height"]) == (60, 60)
+    assert image["/SMask"].get_object()["/ColorSpace"] == "/DeviceGray"
+
+
+def test_vector_pdf_is_smaller_than_the_raster_one():
+    matrix = encode_matrix(CONTENT, ERROR_CORRECT_M, 4)
+    raster = io.BytesIO()
+    render_square(matrix, 1000, BLACK, WHITE).save(raster, format="PDF", resolution=300)
+
+    vector = write_pdf(matrix, 1000, "square", "square", BLACK, WHITE)
+
+    assert len(vector) * 10 < len(raster.getvalue())
@@ -0,0 +1,76 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+from qrcode.constants import ERROR_CORRECT_M
+
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.matrix_cache import encode_matrix
+from src.services.png_writer import write_png
+from src.services.qrcode_service import render_qr
+from src.services.raster import render_square
+
+FILL = (10, 20, 200)
+BACK = (250, 240, 230)
+
+
+def _pixels(png_bytes: bytes) -> np.ndarray:
+    return np.asarray(Image.open(BytesIO(png_bytes)).convert("RGB")).astype(int)
+
+
+def _bit_depth(png_bytes: bytes) -> int:
+    # IHDR data starts after the signature, chunk length and type
+    return png_bytes[24]
+
+
+@pytest.mark.parametrize("filter_strategy", ["none", "sub", "up"])
+@pytest.mark.parametrize("size", [100, 290, 1000])
+def test_whole_pixel_codes_match_the_raster_exactly(size: int, filter_strategy: str):
+    matrix = encode_matrix("https://windsurf.dev/" + "a" * 120, ERROR_CORRECT_M, 4)
+
+    png_bytes = write_png(matrix, size, FILL, BACK, antialias=False, filter_strategy=filter_strategy)
+    expected = render_square(matrix, size, FILL, BACK, antialias=False)
+
+    assert _bit_depth(png_bytes) == 1
+    assert (_pixels(png_bytes) == np.asarray(expected)).all()
+
+
+@pytest.mark.parametrize("filter_strategy", ["none", "sub", "up"])
+def test_antialiased_edges_use_two_bit_levels(filter_strategy: str):
+    matrix = encode_matrix("https://windsurf.dev/" + "a" * 120, ERROR_CORRECT_M, 4)
+
+    png_bytes = write_png(matrix, 333, FILL, BACK, antialias=True, filter_strategy=filter_strategy)
+    expected = np.asarray(render_square(matrix, 333, FILL, BACK, antialias=True)).astype(int)
+
+    assert _bit_depth(png_bytes) == 2
+    # Quantized to 4 levels: at most half a step away from the exact blend
+    step = max(abs(f - b) for f, b in zip(FILL, BACK)) / 3
+    assert np.abs(_pixels(png_bytes) - expected).max() <= step / 2 + 1
+
+
+def test_png_is_smaller_than_pillow_rgb():
+    matrix = encode_matrix("https://windsurf.dev/" + "a" * 120, ERROR_CORRECT_M, 4)
+    buffer = BytesIO()
+    render_square(matrix, 1000, FILL, BACK, antialias=False).save(buffer, format="PNG")
+
+    png_bytes = write_png(matrix, 1000, FILL, BACK, antialias=False)
+
+    assert len(png_bytes) * 3 < len(buffer.getvalue())
+
+
+def test_unknown_filter_is_rejected():
+    matrix = encode_matrix("filters", ERROR_CORRECT_M, 4)
+    with pytest.raises(ValueError):
+        write_png(matrix, 100, FILL, BACK, filter_strategy="paeth")
+
+
+def test_render_qr_plain_png_is_indexed():
+    payload = QRCodeRequest(content="https://windsurf.dev", format=QRCodeFormat.png, size=300)
+
+    png_bytes, content_type = render_qr(payload)
+
+    assert content_type == "image/png"
+    image = Image.open(BytesIO(png_bytes))
+    assert image.mode in ("P", "1")
+    assert image.size == (300, 300)
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import Counter
+
+from src.core.profiler import SamplingProfiler, collapse, profile_call
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def _busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="busy")
+    thread.start()
+    return thread, stop
+
+
+def test_collapse_writes_one_line_per_stack():
+    stacks = Counter({("main", "a", "b"): 3, ("main", "a"): 1})
+    assert collapse(stacks) == "main;a 1\nmain;a;b 3\n"
+
+
+def test_profiler_samples_other_threads(tmp_path):
+    thread, stop = _busy_thread()
+    profiler = SamplingProfiler(500, tmp_path)
+    try:
+        assert profiler.start()
+        assert not profiler.start()
+        time.sleep(0.1)
+        stacks = profiler.stop()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not profiler.running
+    assert profiler.samples > 0
+    busy = [stack for stack in stacks if stack[0] == "busy"]
+    assert busy and any(frame.startswith("_spin (test_profiler.py:") for frame in busy[0])
+    assert not any("sampling-profiler" in stack[0] for stack in stacks)
+
+    path = profiler.dump("run")
+    assert path == tmp_path / "run.collapsed"
+    assert path.read_text() == collapse(stacks)
+
+
+def test_profiler_restricted_to_thread_ids(tmp_path):
+    thread, stop = _busy_thread()
+    profiler = SamplingProfiler(500, tmp_path, thread_ids=[threading.get_ident()])
+    try:
+        profiler.start()
+        time.sleep(0.05)
+        stacks = profiler.stop()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert stacks
+    assert {stack[0] for stack in stacks} == {threading.current_thread().name}
+
+
+def test_profile_call_returns_result_and_profile(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.core.profiler.settings.profiler_dir", str(tmp_path))
+
+    def work():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return 42
+
+    result, path = profile_call(work, name="request-1")
+
+    assert result == 42
+    assert path == tmp_path / "request-1.collapsed"
+    assert "work (test_profiler.py:" in path.read_text()
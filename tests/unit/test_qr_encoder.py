@@ -0,0 +1,107 @@
+import random
+import string
+
+import numpy as np
+import pytest
+import qrcode
+from qrcode import util
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+from qrcode.exceptions import DataOverflowError
+
+from src.services import qr_encoder
+from src.services.matrix_cache import encode_matrix
+
+EC_LEVELS = [ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H]
+ALPHABETS = [
+    string.digits,
+    util.ALPHA_NUM.decode(),
+    string.ascii_letters + string.digits + "/:.?=&-_",
+    "0123456789 HTTPS://WINDSURF.DEV/ héllo€",
+]
+
+
+def _library(content: str, error_correction: int):
+    qr = qrcode.QRCode(error_correction=error_correction, border=0)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return np.array(qr.modules, dtype=bool), qr.version
+
+
+def _byte_content(version: int, error_correction: int, seed: int) -> str:
+    """Byte-mode content that needs exactly `version`"""
+    count_bits = util.mode_sizes_for_version(version)[util.MODE_8BIT_BYTE]
+    capacity = (util.BIT_LIMIT_TABLE[error_correction][version] - 4 - count_bits) // 8
+    rng = random.Random(seed)
+    return "".join(rng.choice(string.ascii_lowercase + "/.") for _ in range(capacity))
+
+
+@pytest.mark.parametrize("error_correction", EC_LEVELS)
+@pytest.mark.parametrize("version", range(1, 41))
+def test_matches_library_for_every_version(version, error_correction):
+    content = _byte_content(version, error_correction, seed=version)
+    expected, expected_version = _library(content, error_correction)
+
+    modules, encoded_version = qr_encoder.encode(content, error_correction)
+
+    assert encoded_version == expected_version == version
+    np.testing.assert_array_equal(modules, expected)
+
+
+@pytest.mark.parametrize("error_correction", EC_LEVELS)
+@pytest.mark.parametrize("alphabet", ALPHABETS)
+@pytest.mark.parametrize("length", [1, 7, 20, 21, 45, 160, 700])
+def test_matches_library_across_segment_modes(alphabet, length, error_correction):
+    rng = random.Random(length)
+    content = "".join(rng.choice(alphabet) for _ in range(length))
+    expected, expected_version = _library(content, error_correction)
+
+    modules, version = qr_encoder.encode(content, error_correction)
+
+    assert version == expected_version
+    np.testing.assert_array_equal(modules, expected)
+
+
+def test_segments_follow_library_chunking():
+    content = "https://windsurf.dev/?id=" + "1234567890" * 3 + "ABCDEFGHIJKLMNOPQRSTUV" + "é"
+    expected = [(chunk.mode, chunk.data) for chunk in util.optimal_data_chunks(content, minimum=20)]
+
+    assert qr_encoder.segments(content) == expected
+
+
+def test_overflow_raises():
+    with pytest.raises(DataOverflowError):
+        qr_encoder.encode("é" * 1000, ERROR_CORRECT_H)
+
+
+def test_encode_matrix_uses_configured_encoder(monkeypatch):
+    content = "https://windsurf.dev/" + "x" * 300
+    monkeypatch.setattr("src.services.matrix_cache.settings.qr_encoder", "qrcode")
+    library = encode_matrix(content, ERROR_CORRECT_Q, 4)
+    monkeypatch.setattr("src.services.matrix_cache.settings.qr_encoder", "numpy")
+    vectorized = encode_matrix(content, ERROR_CORRECT_Q, 4)
+
+    assert vectorized == library
+
+
+@pytest.mark.parametrize("encoder", ["numpy", "qrcode"])
+@pytest.mark.parametrize("version, mask_pattern", [(3, None), (None, 5), (12, 0), (7, 7)])
+def test_pinned_version_and_mask_match_library(monkeypatch, encoder, version, mask_pattern):
+    monkeypatch.setattr("src.services.matrix_cache.settings.qr_encoder", encoder)
+    content = "INV-2024-000417"
+    qr = qrcode.QRCode(
+        version=version, error_correction=ERROR_CORRECT_M, border=0, mask_pattern=mask_pattern
+    )
+    qr.add_data(content)
+    qr.make(fit=version is None)
+
+    matrix = encode_matrix(content, ERROR_CORRECT_M, 0, version, mask_pattern)
+
+    assert matrix.version == qr.version
+    assert matrix.to_modules() == qr.modules
+
+
+@pytest.mark.parametrize("encoder", ["numpy", "qrcode"])
+def test_pinned_version_overflow_fails_fast(monkeypatch, encoder):
+    monkeypatch.setattr("src.services.matrix_cache.settings.qr_encoder", encoder)
+    with pytest.raises(DataOverflowError, match="version 1 .* 212 bits pour 128"):
+        encode_matrix("https://windsurf.dev/" + "x" * 4, ERROR_CORRECT_M, 4, version=1)
@@ -1,10 +1,14 @@
+from io import BytesIO
+
+import numpy as np
 import pytest
+from PIL import Image
 
 from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
-from src.services.qrcode_service import generate_qr
+from src.services.qrcode_service import _render_pil, generate_qr, render_qr
 
 
-@pytest.mark.parametrize("format", [QRCodeFormat.png, QRCodeFormat.jpeg, QRCodeFormat.svg, QRCodeFormat.pdf])
+@pytest.mark.parametrize("format", list(QRCodeFormat))
 def test_generate_all_formats(format: QRCodeFormat):
     payload = QRCodeRequest(content="https://windsurf.dev", format=format)
     request_id, payload_bytes, content_type = generate_qr(payload)
@@ -18,3 +22,63 @@ def test_generate_all_formats(format: QRCodeFormat):
 def test_generate_invalid_error_correction():
     with pytest.raises(ValueError):
         QRCodeRequest(content="text", error_correction="Z")
+
+
+def test_generate_qr_serves_repeats_from_render_cache():
+    from src.services.qrcode_service import render_cache
+
+    render_cache.clear()
+    payload = QRCodeRequest(content="https://windsurf.dev/cached", color="#ABCDEF")
+    first_id, first_bytes, _ = generate_qr(payload)
+    hits_before = render_cache.stats()["hits"]
+    second_id, second_bytes, _ = generate_qr(payload.model_copy(update={"color": "#abcdef"}))
+
+    assert first_bytes == second_bytes
+    assert first_id != second_id
+    assert render_cache.stats()["hits"] == hits_before + 1
+
+
+def test_webp_is_lossless_for_plain_codes():
+    payload = QRCodeRequest(content="https://windsurf.dev/webp", format=QRCodeFormat.webp, body_style="rounded")
+    webp_bytes, content_type = render_qr(payload)
+
+    decoded = Image.open(BytesIO(webp_bytes)).convert("RGB")
+    assert content_type == "image/webp"
+    assert (np.asarray(decoded) == np.asarray(_render_pil(payload).convert("RGB"))).all()
+
+
+def test_webp_composites_are_lossy_and_smaller_than_png():
+    logo = Image.radial_gradient("L").convert("RGBA").resize((200, 200))
+    style = dict(content="https://windsurf.dev/webp", size=1000, logo_url="https://example.com/logo.png")
+    png_bytes, _ = render_qr(QRCodeRequest(format=QRCodeFormat.png, **style), logo)
+    webp_bytes, _ = render_qr(QRCodeRequest(format=QRCodeFormat.webp, **style), logo)
+
+    # Lossy WebP is a VP8 bitstream, lossless one VP8L
+    assert webp_bytes[12:16] == b"VP8 "
+    assert len(webp_bytes) * 2 < len(png_bytes)
+
+
+def test_pinned_version_and_mask_are_part_of_matrix_key():
+    fitted = QRCodeRequest(content="sku-1", format=QRCodeFormat.svg)
+    pinned = fitted.model_copy(update={"version": 4, "mask_pattern": 2})
+
+    assert generate_qr(fitted)[1] != generate_qr(pinned)[1]
+    assert b'viewBox="0 0 41 41"' in generate_qr(pinned)[1]
+
+
+def test_pinned_version_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        QRCodeRequest(content="text", version=41)
+    with pytest.raises(ValueError):
+        QRCodeRequest(content="text", mask_pattern=8)
+
+
+def test_render_etag_depends_on_output_settings(monkeypatch):
+    from src.services.qrcode_service import render_etag
+
+    payload = QRCodeRequest(content="etag", format=QRCodeFormat.webp)
+    before = render_etag(payload)
+    monkeypatch.setattr("src.services.qrcode_service.settings.webp_quality", 50)
+
+    assert render_etag(payload) != before
+    assert render_etag(payload.model_copy(update={"logo_url": "https://example.com/l.png"})) is None
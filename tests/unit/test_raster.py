@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from qrcode.constants import ERROR_CORRECT_M
+
+from src.services.matrix_cache import encode_matrix
+from src.services.raster import padded_grid, render_square
+
+
+def _sample_module_centres(image, modules: int) -> np.ndarray:
+    pixels = np.asarray(image.convert("L"))
+    centres = ((np.arange(modules) + 0.5) * image.width / modules).astype(int)
+    return pixels[np.ix_(centres, centres)] < 128
+
+
+@pytest.mark.parametrize("size", [100, 300, 333, 1000])
+@pytest.mark.parametrize("antialias", [True, False])
+def test_render_square_decodes_to_module_grid(size: int, antialias: bool):
+    matrix = encode_matrix("https://windsurf.dev/" + "a" * 120, ERROR_CORRECT_M, 4)
+    grid = padded_grid(matrix)
+
+    image = render_square(matrix, size, (0, 0, 0), (255, 255, 255), antialias=antialias)
+
+    assert image.size == (size, size)
+    assert image.mode == "RGB"
+    assert (_sample_module_centres(image, grid.shape[0]) == grid).all()
+
+
+def test_render_square_uses_requested_colors():
+    matrix = encode_matrix("colors", ERROR_CORRECT_M, 4)
+    image = render_square(matrix, 290, (255, 0, 0), (0, 0, 255))
+    colors = {color for _, color in image.getcolors(maxcolors=1 << 16)}
+
+    assert colors == {(255, 0, 0), (0, 0, 255)}
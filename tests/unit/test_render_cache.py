@@ -0,0 +1,56 @@
+from src.schemas.qrcode import QRCodeRequest
+from src.services.render_cache import RenderCache, render_key
+
+
+def test_render_key_normalizes_colors_and_defaults():
+    explicit = QRCodeRequest(content="shop", color="#AABBCC", size=300, margin=4)
+    implicit = QRCodeRequest(content="shop", color="#aabbcc")
+
+    assert render_key(explicit) == render_key(implicit)
+    assert render_key(implicit) != render_key(QRCodeRequest(content="shop", size=400))
+
+
+def test_cache_hits_and_misses_are_counted():
+    cache = RenderCache(max_bytes=1024)
+
+    assert cache.get("a") is None
+    assert cache.put("a", b"x" * 10, "image/png")
+    entry = cache.get("a")
+
+    assert entry is not None and entry.data == b"x" * 10
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes"] == 10
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = RenderCache(max_bytes=100)
+    for key, popularity in (("a", 2), ("b", 2), ("c", 4)):
+        for _ in range(popularity):
+            cache.get(key)
+        cache.put(key, b"x" * 40, "image/png")
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 100
+    assert stats["evictions"] == 1
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+
+def test_one_off_request_does_not_evict_hot_entry():
+    cache = RenderCache(max_bytes=100)
+    for _ in range(5):
+        cache.get("hot")
+    cache.put("hot", b"x" * 80, "image/png")
+
+    cache.get("cold")
+    assert not cache.put("cold", b"y" * 80, "image/png")
+    assert cache.get("hot") is not None
+    assert cache.stats()["rejections"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RenderCache(max_bytes=0)
+    assert not cache.put("a", b"x", "image/png")
+    assert cache.get("a") is None
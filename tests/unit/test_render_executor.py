@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+import pytest
+
+from src.core.timing import record_stages
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.qrcode_service import render_cache, render_qr
+from src.services.render_executor import RenderExecutor
+
+
+@pytest.fixture(scope="module")
+def process_executor():
+    executor = RenderExecutor(mode="process", workers=2)
+    executor.start()
+    yield executor
+    executor.shutdown()
+
+
+def _shm_segments() -> set[str]:
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("format", [QRCodeFormat.png, QRCodeFormat.svg, QRCodeFormat.pdf])
+async def test_process_executor_matches_inline_render(process_executor, format):
+    render_cache.clear()
+    payload = QRCodeRequest(content="https://windsurf.dev/pool", format=format, body_style="rounded")
+    before = _shm_segments()
+
+    request_id, payload_bytes, content_type = await process_executor.render(payload)
+
+    assert request_id
+    assert (payload_bytes, content_type) == render_qr(payload)
+    assert _shm_segments() <= before
+
+
+@pytest.mark.asyncio
+async def test_executor_serves_cache_hits_without_rendering():
+    render_cache.clear()
+    executor = RenderExecutor(mode="inline")
+    payload = QRCodeRequest(content="https://windsurf.dev/inline")
+
+    _, first, _ = await executor.render(payload)
+    hits = render_cache.stats()["hits"]
+    _, second, _ = await executor.render(payload)
+
+    assert first == second
+    assert render_cache.stats()["hits"] == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_process_executor_reports_worker_stages(process_executor):
+    render_cache.clear()
+    payload = QRCodeRequest(content="https://windsurf.dev/stages", format=QRCodeFormat.jpeg)
+
+    with record_stages() as timings:
+        await process_executor.render(payload)
+
+    assert {"cache", "matrix", "render", "encode", "dispatch"} <= timings.keys()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_process_render_does_not_leak_shared_memory(process_executor):
+    await process_executor.render(QRCodeRequest(content="https://windsurf.dev/warm"))
+    render_cache.clear()
+    payload = QRCodeRequest(content="x" * 1000, format=QRCodeFormat.webp, size=1000, body_style="rounded")
+    before = _shm_segments()
+
+    task = asyncio.create_task(process_executor.render(payload))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The worker finishes the render (a few hundred ms) after we gave up on it
+    await asyncio.sleep(1.0)
+    for _ in range(80):
+        if _shm_segments() <= before:
+            break
+        await asyncio.sleep(0.05)
+    assert _shm_segments() <= before
@@ -0,0 +1,74 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.core.config import settings
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.qrcode_service import MODULE_DRAWERS, EYE_DRAWERS, _get_drawer, render_qr
+from src.services.render_executor import RenderExecutor
+
+STRESS_RENDERS = {"numpy": 2000, "pil": 1000}
+
+
+def _mixed_payloads() -> list[QRCodeRequest]:
+    return [
+        QRCodeRequest(
+            content=content,
+            format=format,
+            size=size,
+            body_style=body_style,
+            eye_style=eye_style,
+        )
+        for content, format, size, body_style, eye_style in itertools.product(
+            ["https://windsurf.dev", "https://windsurf.dev/" + "p" * 80],
+            [QRCodeFormat.png, QRCodeFormat.jpeg],
+            [100, 157],
+            sorted(MODULE_DRAWERS),
+            sorted(EYE_DRAWERS),
+        )
+    ]
+
+
+def test_drawers_are_private_to_each_thread():
+    drawers = []
+
+    def grab():
+        drawers.append(_get_drawer("module", "rounded"))
+
+    threads = [threading.Thread(target=grab) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(drawer) for drawer in drawers}) == 4
+    assert _get_drawer("module", "rounded") is _get_drawer("module", "rounded")
+    assert _get_drawer("module", "square") is not _get_drawer("eye", "square")
+
+
+@pytest.mark.parametrize("engine", sorted(STRESS_RENDERS))
+def test_concurrent_renders_match_serial_output(monkeypatch, engine: str):
+    monkeypatch.setattr(settings, "render_engine", engine)
+    payloads = _mixed_payloads()
+    expected = [render_qr(payload) for payload in payloads]
+
+    jobs = [i % len(payloads) for i in range(STRESS_RENDERS[engine])]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: render_qr(payloads[i]), jobs))
+
+    mismatches = [i for i, result in zip(jobs, results) if result != expected[i]]
+    assert not mismatches
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_renders_off_the_event_loop():
+    executor = RenderExecutor(mode="thread", workers=2)
+    payload = QRCodeRequest(content="https://windsurf.dev/thread", body_style="circle")
+    try:
+        _, payload_bytes, content_type = await executor.render(payload)
+    finally:
+        executor.shutdown()
+
+    assert (payload_bytes, content_type) == render_qr(payload)
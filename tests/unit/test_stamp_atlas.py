@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from PIL import Image
+from qrcode.constants import ERROR_CORRECT_M
+
+from src.services.matrix_cache import encode_matrix
+from src.services.raster import padded_grid
+from src.services.stamp_atlas import DRAWER_NEIGHBOURS, render_styled, stamp_set
+
+
+@pytest.mark.parametrize("drawer", sorted(DRAWER_NEIGHBOURS))
+def test_stamp_set_has_one_stamp_per_context(drawer: str):
+    stamps = stamp_set(drawer, 12)
+
+    assert stamps.shape == (1 << len(DRAWER_NEIGHBOURS[drawer]), 12, 12)
+    assert stamps.dtype == np.uint8
+    # The centre of a module is always inked
+    assert (stamps[:, 6, 6] > 128).all()
+
+
+def test_rounded_stamp_is_square_when_fully_surrounded():
+    stamps = stamp_set("rounded", 16)
+
+    assert (stamps[0b1111] == 255).all()
+    assert stamps[0][0, 0] == 0
+
+
+@pytest.mark.parametrize("body_style", sorted(DRAWER_NEIGHBOURS))
+@pytest.mark.parametrize("eye_style", ["square", "circle", "rounded"])
+def test_render_styled_keeps_module_centres(body_style: str, eye_style: str):
+    matrix = encode_matrix("https://windsurf.dev/styled", ERROR_CORRECT_M, 4)
+    grid = padded_grid(matrix)
+
+    image = render_styled(
+        matrix, 330, body_style, eye_style, (0, 0, 0), (255, 255, 255)
+    )
+
+    assert image.size == (330, 330)
+    centres = ((np.arange(grid.shape[0]) + 0.5) * 330 / grid.shape[0]).astype(int)
+    dark = np.asarray(image.convert("L"))[np.ix_(centres, centres)] < 128
+    assert (dark == grid).all()
+
+
+def test_render_styled_pastes_logo_in_the_centre():
+    matrix = encode_matrix("logo", ERROR_CORRECT_M, 4)
+    logo = Image.new("RGB", (64, 64), (255, 0, 0))
+
+    image = render_styled(
+        matrix, 300, "circle", "circle", (0, 0, 0), (255, 255, 255), logo=logo
+    )
+
+    assert image.getpixel((150, 150)) == (255, 0, 0)
@@ -0,0 +1,134 @@
+import json
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.services import sticker_frames as sticker_frames_module
+from src.services.sticker_frames import StickerFrames, StickerLayout
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+
+
+class _FakeTree:
+    parsed = 0
+
+    def __init__(self, bytestring: bytes):
+        type(self).parsed += 1
+        self.bytestring = bytestring
+
+
+@pytest.fixture
+def frames(tmp_path, monkeypatch):
+    # Parsing and drawing need libcairo; the cache and layout logic do not
+    _FakeTree.parsed = 0
+    monkeypatch.setattr(sticker_frames_module, "Tree", _FakeTree)
+    rasterized = []
+
+    def fake_rasterize(self, sticker, width, height):
+        rasterized.append((width, height))
+        return Image.new("RGB", (width, height), (0, 128, 0))
+
+    monkeypatch.setattr(StickerFrames, "_rasterize", fake_rasterize)
+    for name in ("grid", "beer", "custom"):
+        (tmp_path / f"{name}.svg").write_bytes(SVG)
+    (tmp_path / "layouts.json").write_text(json.dumps({"beer": {"qr_y": 0.5}}))
+
+    store = StickerFrames(tmp_path, max_bytes=1 << 24)
+    store.rasterized = rasterized
+    return store
+
+
+def test_stickers_are_parsed_once_with_their_layouts(frames):
+    frames.load()
+    frames.load()
+
+    assert _FakeTree.parsed == 3
+    assert frames.available() == ("beer", "custom", "grid")
+    assert frames._stickers["grid"].layout == StickerLayout(qr_x=0.08, qr_y=0.17)
+    assert frames._stickers["beer"].layout == StickerLayout(qr_x=0.33, qr_y=0.5)
+    assert frames._stickers["custom"].layout == StickerLayout()
+
+
+def test_frames_are_rasterized_once_per_size(frames):
+    qr = Image.new("RGB", (100, 100), (0, 0, 0))
+
+    first = frames.composite(qr, "grid")
+    second = frames.composite(qr, "grid")
+    frames.composite(Image.new("RGB", (200, 200)), "grid")
+
+    assert frames.rasterized == [(140, 161), (280, 322)]
+    assert first.tobytes() == second.tobytes()
+    assert frames.stats()["hits"] == 1
+
+
+def test_code_is_pasted_at_the_layout_position(frames):
+    qr = Image.new("RGB", (100, 100), (0, 0, 0))
+
+    grid = frames.composite(qr, "grid")
+    custom = frames.composite(qr, "custom")
+
+    assert grid.size == (140, 161)
+    assert grid.getpixel((int(140 * 0.08), int(161 * 0.17))) == (0, 0, 0)
+    assert grid.getpixel((0, 0)) == (0, 128, 0)
+    assert custom.getpixel((20, 30)) == (0, 0, 0)
+    assert custom.getpixel((19, 29)) == (0, 128, 0)
+
+
+def test_unknown_sticker_and_missing_directory(frames, tmp_path):
+    qr = Image.new("RGB", (100, 100))
+
+    assert frames.composite(qr, "nope") is None
+    assert StickerFrames(tmp_path / "missing", 1 << 20).composite(qr, "grid") is None
+
+
+def test_frame_cache_respects_byte_budget(frames):
+    frames.max_bytes = 140 * 161 * 3
+    frames.composite(Image.new("RGB", (100, 100)), "grid")
+    frames.composite(Image.new("RGB", (100, 100)), "beer")
+
+    stats = frames.stats()
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_fingerprint_follows_frame_files(frames, tmp_path):
+    before = frames.fingerprint()
+    (tmp_path / "grid.svg").write_bytes(SVG.replace(b'width="10"', b'width="12"'))
+
+    assert before
+    assert StickerFrames(tmp_path, max_bytes=1 << 24).fingerprint() != before
+    assert StickerFrames(tmp_path / "none", max_bytes=1 << 24).fingerprint() == ""
+
+
+FRAME_SVG = b"""<svg xmlns="http://www.w3.org/2000/svg" width="70" height="80" viewBox="0 0 70 80">
+  <rect x="2" y="2" width="66" height="76" rx="8" fill="#1a2b3c"/>
+  <rect x="8" y="14" width="54" height="54" fill="#ffffff" fill-opacity="0.5"/>
+  <circle cx="35" cy="8" r="5" fill="#e05a00" stroke="#000000" stroke-width="1.5"/>
+</svg>"""
+
+
+@pytest.mark.skipif(sticker_frames_module.Tree is None, reason="cairosvg / libcairo not installed")
+def test_rasterized_frames_match_cairosvg(tmp_path):
+    import cairosvg
+
+    (tmp_path / "frame.svg").write_bytes(FRAME_SVG)
+    frames = StickerFrames(tmp_path, max_bytes=1 << 24)
+    frames.load()
+    sticker = frames._stickers["frame"]
+
+    reference = Image.open(
+        BytesIO(cairosvg.svg2png(bytestring=FRAME_SVG, output_width=140, output_height=160))
+    ).convert("RGBA")
+    expected = Image.new("RGB", reference.size, (255, 255, 255))
+    expected.paste(reference, (0, 0), reference)
+
+    # Twice: drawing must not leave the shared parsed tree altered
+    for _ in range(2):
+        frame = frames._rasterize(sticker, 140, 160)
+        difference = np.abs(
+            np.asarray(frame, dtype=np.int16) - np.asarray(expected, dtype=np.int16)
+        )
+        assert frame.size == (140, 160)
+        assert difference.max() <= 2
@@ -0,0 +1,115 @@
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+from PIL import Image
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_M
+
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.matrix_cache import encode_matrix
+from src.services.qrcode_service import render_qr
+from src.services.raster import padded_grid
+from src.services.svg_writer import write_svg
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def _trace(path: str, modules: int) -> np.ndarray:
+    """Replay the run subpaths of a path and mark the modules they cover"""
+    covered = np.zeros((modules, modules), dtype=bool)
+    x = y = 0
+    for dx, dy, width, back in re.findall(r"m(-?\d+) (-?\d+)h(\d+)v1h-(\d+)z", path):
+        x, y = x + int(dx), y + int(dy)
+        assert int(width) == int(back)
+        assert not covered[y, x : x + int(width)].any()
+        covered[y, x : x + int(width)] = True
+    return covered
+
+
+@pytest.mark.parametrize(
+    "content, error_correction, border",
+    [("a", ERROR_CORRECT_M, 4), ("https://windsurf.dev/" + "x" * 300, ERROR_CORRECT_H, 0)],
+)
+def test_path_covers_exactly_the_dark_modules(content, error_correction, border):
+    matrix = encode_matrix(content, error_correction, border)
+    grid = padded_grid(matrix)
+
+    root = ET.fromstring(write_svg(matrix, 300, "#000000", "#FFFFFF"))
+    path = root.find(f"{SVG_NS}path").get("d")
+
+    assert (_trace(path, grid.shape[0]) == grid).all()
+    assert path.count("z") == len(re.findall(r"m", path)) < grid.sum()
+
+
+def test_size_and_colors_are_written_directly():
+    matrix = encode_matrix("colors", ERROR_CORRECT_M, 2)
+    modules = matrix.modules_count + 4
+
+    root = ET.fromstring(write_svg(matrix, 512, "#AB0000", "#00CDEF"))
+
+    assert (root.get("width"), root.get("height")) == ("512", "512")
+    assert root.get("viewBox") == f"0 0 {modules} {modules}"
+    assert root.find(f"{SVG_NS}rect").get("fill") == "#00CDEF"
+    assert root.find(f"{SVG_NS}path").get("fill") == "#AB0000"
+
+
+def test_render_qr_svg_uses_the_writer():
+    payload = QRCodeRequest(content="https://windsurf.dev", format=QRCodeFormat.svg, size=420)
+    svg_bytes, content_type = render_qr(payload)
+
+    assert content_type == "image/svg+xml"
+    assert svg_bytes.startswith(b'<svg xmlns="http://www.w3.org/2000/svg" width="420"')
+
+
+@pytest.mark.parametrize("body_style", ["circle", "rounded", "gapped", "vertical", "horizontal"])
+def test_styled_svg_is_one_path_without_bitmaps(body_style: str):
+    matrix = encode_matrix("https://windsurf.dev/styled", ERROR_CORRECT_M, 4)
+
+    svg = write_svg(matrix, 300, "#000000", "#FFFFFF", body_style, "rounded")
+    root = ET.fromstring(svg)
+
+    assert len(root.findall(f"{SVG_NS}path")) == 1
+    assert root.find(f"{SVG_NS}image") is None
+    if body_style != "gapped":
+        assert "a" in root.find(f"{SVG_NS}path").get("d")
+
+
+def test_unknown_styles_are_drawn_square():
+    matrix = encode_matrix("https://windsurf.dev/unknown", ERROR_CORRECT_M, 4)
+
+    unknown = write_svg(matrix, 300, "#000000", "#FFFFFF", "sparkles", "sparkles")
+
+    assert unknown == write_svg(matrix, 300, "#000000", "#FFFFFF", "square", "square")
+
+
+def test_logo_is_embedded_once():
+    matrix = encode_matrix("https://windsurf.dev/logo", ERROR_CORRECT_M, 4)
+    logo = Image.new("RGBA", (60, 60), (255, 0, 0, 255))
+    modules = matrix.modules_count + 8
+
+    root = ET.fromstring(write_svg(matrix, 300, "#000000", "#FFFFFF", "circle", "circle", logo))
+    images = root.findall(f"{SVG_NS}image")
+
+    assert len(images) == 1
+    assert images[0].get("href").startswith("data:image/png;base64,")
+    assert float(images[0].get("width")) == pytest.approx(60 * modules / 300)
+
+
+def test_styled_svg_requests_skip_the_raster_pipeline(monkeypatch):
+    from src.services import qrcode_service
+
+    def no_raster(*args, **kwargs):
+        raise AssertionError("SVG output must not rasterize")
+
+    monkeypatch.setattr(qrcode_service, "_render_pil", no_raster)
+    payload = QRCodeRequest(
+        content="https://windsurf.dev",
+        format=QRCodeFormat.svg,
+        body_style="rounded",
+        eye_style="circle",
+    )
+
+    svg_bytes, _ = render_qr(payload)
+
+    assert b"<path" in svg_bytes
@@ -0,0 +1,71 @@
+import json
+import time
+
+from src.core.timing import SpanLog, add_stages, record_stages, server_timing_header, stage
+from src.schemas.qrcode import QRCodeFormat, QRCodeRequest
+from src.services.qrcode_service import render_qr
+
+
+def test_stages_are_recorded_only_inside_record_stages():
+    with stage("outside"):
+        pass
+
+    with record_stages() as timings:
+        with stage("a"):
+            pass
+        with stage("a"):
+            pass
+        with stage("b"):
+            pass
+
+    assert list(timings) == ["a", "b"]
+    assert all(ms >= 0 for ms in timings.values())
+
+
+def test_render_qr_reports_its_stages():
+    payload = QRCodeRequest(content="https://windsurf.dev/timing", format=QRCodeFormat.jpeg)
+
+    with record_stages() as timings:
+        render_qr(payload)
+
+    assert {"matrix", "render", "encode"} <= timings.keys()
+
+
+def test_nested_stages_are_exclusive():
+    with record_stages() as timings:
+        with stage("outer"):
+            with stage("inner"):
+                time.sleep(0.02)
+
+    assert timings["inner"] >= 20
+    assert timings["outer"] < 10
+
+
+def test_disabled_recording_yields_none_and_ignores_merges():
+    with record_stages(False) as timings:
+        add_stages({"render": 1.0})
+        with stage("render"):
+            pass
+
+    assert timings is None
+
+
+def test_server_timing_header_lists_stages_then_total():
+    header = server_timing_header({"matrix": 0.5, "render": 3.25}, 4.0)
+
+    assert header == "matrix;dur=0.50, render;dur=3.25, total;dur=4.00"
+
+
+def test_span_log_writes_json_lines(tmp_path):
+    path = tmp_path / "spans" / "log.jsonl"
+    log = SpanLog(str(path), sample_rate=1.0)
+    assert log.sampled()
+
+    log.write({"request_id": "a", "stages": {"render": 1.5}})
+    log.write({"request_id": "b", "stages": {}})
+    log.close()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["request_id"] for span in spans] == ["a", "b"]
+    assert "timestamp" in spans[0]
+    assert not SpanLog("", sample_rate=1.0).sampled()
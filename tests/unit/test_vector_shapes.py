@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pytest
+from qrcode.constants import ERROR_CORRECT_M
+
+from src.services.matrix_cache import encode_matrix
+from src.services.raster import padded_grid
+from src.services.stamp_atlas import DRAWER_NEIGHBOURS, _eye_mask
+from src.services.vector_shapes import module_outline, outline, shape_groups
+
+
+def _grid_and_body():
+    matrix = encode_matrix("https://windsurf.dev/" + "s" * 80, ERROR_CORRECT_M, 4)
+    grid = padded_grid(matrix)
+    return grid, grid & ~_eye_mask(matrix)
+
+
+@pytest.mark.parametrize("style", sorted(DRAWER_NEIGHBOURS))
+def test_shapes_cover_every_module_once(style: str):
+    grid, body = _grid_and_body()
+    covered = np.zeros(grid.shape, dtype=np.int64)
+
+    for shape, origins in shape_groups(grid, body, style).items():
+        # Boxes start in their first module and end inside their last one
+        _, _, x1, y1 = shape.box
+        width, height = math.ceil(x1), math.ceil(y1)
+        for x, y in origins.tolist():
+            covered[y : y + height, x : x + width] += 1
+
+    assert (covered == body).all()
+
+
+def test_rounded_contexts_sharing_an_outline_are_all_placed():
+    grid, body = _grid_and_body()
+
+    groups = shape_groups(grid, body, "rounded")
+
+    assert sum(len(origins) for origins in groups.values()) == body.sum()
+    assert len(groups) <= 16
+
+
+def test_circle_outline_is_four_quarter_arcs():
+    circle = outline((0, 0, 1, 1), (True,) * 4, (0.5, 0.5))
+
+    assert [segment[0] for segment in circle.segments] == ["M", "C", "C", "C", "C", "Z"]
+    assert circle.segments[0][1:] == (0.5, 0)
+    assert not circle.is_rectangle
+
+
+def test_square_outline_skips_the_closing_edge():
+    square = outline((0, 0, 3, 1), (False,) * 4, (0, 0))
+
+    assert square.is_rectangle
+    assert [segment[1:] for segment in square.segments[1:-1]] == [(3, 0), (3, 1), (0, 1)]
+
+
+def test_only_the_circle_style_gets_a_circle_outline():
+    assert module_outline("circle", 0).rounded == (True,) * 4
+    assert module_outline("sparkles", 0).is_rectangle